@@ -0,0 +1,148 @@
+# 作者：AleOsh
+# 复制顺序基准：生成文件写入顺序被打乱的目录树，每次运行前清掉源文件的页缓存，
+# 用 scan_first 模式分别按各种顺序复制，对比冷读时的耗时和吞吐
+#
+#   python benchmarks/ordering.py                                   # 在系统临时目录生成目录树
+#   python benchmarks/ordering.py --workdir /mnt/hdd/tmp --sizes mixed
+#   python benchmarks/ordering.py --source /mnt/archive/photos --ext-mix jpg,png --orders scan,extent
+#
+# 效果取决于磁盘：机械硬盘和阵列上差别明显，SSD 和内存文件系统上几乎没有差别。
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from run import run_case, summarize, print_table, git_commit  # noqa: E402
+from treegen import generate_tree, parse_ext_mix, SIZE_DISTRIBUTIONS, DEFAULT_EXT_MIX  # noqa: E402
+
+from organizer.ordering import ORDERS  # noqa: E402
+
+
+def evict_page_cache(root):
+    """把 root 下的文件从页缓存中清掉，模拟冷读；不支持时返回 False
+
+    只对已经写回磁盘的页有效，生成目录树后要先 os.sync()。
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            try:
+                fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+    return True
+
+
+def parse_orders(text):
+    orders = [item.strip() for item in text.split(',') if item.strip()]
+    unknown = [order for order in orders if order not in ORDERS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知的复制顺序: {', '.join(unknown)}")
+    return orders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="复制顺序基准测试")
+    tree = parser.add_argument_group("合成目录树")
+    tree.add_argument("--depth", type=int, default=3, help="目录深度（默认 3）")
+    tree.add_argument("--fanout", type=int, default=4, help="每个目录的子目录数（默认 4）")
+    tree.add_argument("--files-per-dir", type=int, default=20, help="每个目录的文件数（默认 20）")
+    tree.add_argument("--sizes", choices=sorted(SIZE_DISTRIBUTIONS), default="small",
+                      help="文件大小分布（默认 small）")
+    tree.add_argument("--ext-mix", type=parse_ext_mix, default=DEFAULT_EXT_MIX,
+                      metavar="EXT=WEIGHT,...", help="扩展名比例，如 jpg=5,png=2")
+    tree.add_argument("--seed", type=int, default=0, help="随机种子（默认 0）")
+    tree.add_argument("--source", help="不生成合成树，直接测试已有文件夹")
+
+    parser.add_argument("--orders", type=parse_orders, default=list(ORDERS), metavar="ORDER,...",
+                        help=f"要比较的复制顺序（默认全部：{','.join(ORDERS)}）")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="每种顺序运行次数（默认 3）")
+    parser.add_argument("--no-evict", action="store_true", help="不清页缓存（测热读）")
+    parser.add_argument("--workdir", help="生成目录树和输出的位置，应在要测试的磁盘上（默认系统临时目录）")
+    parser.add_argument("-o", "--output", default="ordering_results.json",
+                        help="结果 JSON 文件（默认 ordering_results.json）")
+    parser.add_argument("--compare", metavar="JSON", help="与之前的结果文件对比")
+    parser.add_argument("--keep", action="store_true", help="保留生成的目录树")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fo_order_", dir=args.workdir)
+    evicted = False
+    try:
+        if args.source:
+            source = os.path.abspath(args.source)
+            tree_stats = None
+            types = sorted(args.ext_mix)
+        else:
+            source = os.path.join(workdir, "src")
+            print(f"生成目录树（打乱写入顺序）: {source}")
+            tree_stats = generate_tree(source, depth=args.depth, fanout=args.fanout,
+                                       files_per_dir=args.files_per_dir, sizes=args.sizes,
+                                       ext_mix=args.ext_mix, seed=args.seed, shuffle_writes=True)
+            types = sorted(tree_stats["by_ext"])
+            print(f"  {tree_stats['dirs']} 个目录，{tree_stats['files']} 个文件，"
+                  f"{tree_stats['bytes'] / 1024 / 1024:.1f} MiB")
+            # 写回磁盘后才能从页缓存中清掉
+            os.sync()
+
+        results = []
+        for order in args.orders:
+            runs = []
+            for i in range(args.repeat):
+                dest = tempfile.mkdtemp(prefix=f"dest_{order}_", dir=workdir)
+                if not args.no_evict:
+                    evicted = evict_page_cache(source)
+                spec = {"source": source, "dest": dest, "types": types, "log_level": "info",
+                        "options": {"mode": "scan_first", "order": order}}
+                try:
+                    runs.append(run_case(spec, False))
+                finally:
+                    shutil.rmtree(dest, ignore_errors=True)
+                print(f"  {order} #{i + 1}: {runs[-1]['wall_seconds']:.3f}s")
+            case = {"name": order, "options": {"mode": "scan_first", "order": order}, "runs": runs}
+            case.update(summarize(runs))
+            results.append(case)
+    finally:
+        if args.keep:
+            print(f"目录树保留在: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_evict and not evicted:
+        print("注意：无法清除页缓存，结果为热读")
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cold_cache": evicted,
+        "tree": {"source": args.source, "stats": tree_stats},
+        "cases": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    print()
+    print_table(results, previous)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
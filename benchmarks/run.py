@@ -0,0 +1,309 @@
+# 作者：AleOsh
+# 基准测试：生成合成目录树，用各处理模式分别整理，记录墙钟时间、吞吐、峰值内存和系统调用次数
+#
+#   python benchmarks/run.py                                  # 默认树，跑 direct / scan_first / pipeline
+#   python benchmarks/run.py --fanout 6 --sizes tiny -o after.json --compare before.json
+#   python benchmarks/run.py --case pipeline8:mode=pipeline,workers=8 --case link:transfer=hardlink
+#
+# 每次运行都在单独的子进程里进行，峰值内存互不影响；结果写成 JSON，便于不同提交之间对比。
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from treegen import generate_tree, parse_ext_mix, SIZE_DISTRIBUTIONS, DEFAULT_EXT_MIX  # noqa: E402
+
+RESULT_VERSION = 1
+
+# 默认测试的用例：名称 -> OrganizeEngine 参数
+DEFAULT_CASES = {
+    "direct": {"mode": "direct"},
+    "scan_first": {"mode": "scan_first"},
+    "pipeline": {"mode": "pipeline"},
+}
+
+
+def parse_case(text):
+    """解析 'name:key=value,key=value'，值按整数、布尔、字符串依次尝试"""
+    name, _, options = text.partition(':')
+    kwargs = {}
+    for item in options.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        kwargs[key.strip()] = _parse_value(value.strip())
+    kwargs.setdefault("mode", name if name in DEFAULT_CASES else "direct")
+    return name, kwargs
+
+
+def _parse_value(value):
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+# ---- 子进程：执行一次整理并输出测量结果 ----
+
+def read_proc_io():
+    """读取 /proc/self/io 中的读写系统调用次数和字节数（仅 Linux）"""
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in
+                    (line.split(":") for line in f if ":" in line)}
+    except OSError:
+        return None
+
+
+def peak_rss_kib():
+    """本进程的峰值常驻内存（KiB），不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位是字节，Linux 上是 KiB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_child(spec):
+    from organizer import OrganizeEngine, parse_level
+
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    engine = OrganizeEngine(spec["source"], spec["dest"], spec["types"],
+                            log_level=parse_level(spec["log_level"]), **spec["options"])
+    summary = engine.run()
+    wall = time.perf_counter() - start
+    io_after = read_proc_io()
+
+    syscalls = {"stat_calls": engine.metrics.stat_calls}
+    if io_before is not None and io_after is not None:
+        for key in ("syscr", "syscw", "rchar", "wchar"):
+            if key in io_after:
+                syscalls[key] = io_after[key] - io_before.get(key, 0)
+
+    result = {
+        "wall_seconds": wall,
+        "files": summary["processed"],
+        "bytes": engine.bytes_done,
+        "files_per_sec": summary["processed"] / wall if wall > 0 else 0.0,
+        "bytes_per_sec": engine.bytes_done / wall if wall > 0 else 0.0,
+        "peak_rss_kib": peak_rss_kib(),
+        "syscalls": syscalls,
+        "failed": summary["failed"],
+        "error": summary["error"],
+        "stages": engine.metrics.snapshot(include_slowest=False)["stages"],
+    }
+    json.dump(result, sys.stdout)
+
+
+# ---- 父进程 ----
+
+def parse_strace_summary(path):
+    """解析 strace -c 的汇总表，返回 {系统调用: 次数}，含 'total'"""
+    counts = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            # % time  seconds  usecs/call  calls  [errors]  syscall
+            if len(parts) >= 5 and parts[0].replace('.', '', 1).isdigit():
+                try:
+                    counts[parts[-1]] = int(parts[3])
+                except ValueError:
+                    continue
+    return counts
+
+
+def run_case(spec, use_strace):
+    """在子进程中执行一次整理，返回测量结果"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)]
+    strace_out = None
+    if use_strace:
+        fd, strace_out = tempfile.mkstemp(prefix="fo_strace_", suffix=".txt")
+        os.close(fd)
+        cmd = ["strace", "-f", "-c", "-o", strace_out] + cmd
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, cwd=REPO_DIR)
+        result = json.loads(proc.stdout)
+        if strace_out is not None:
+            result["syscalls"]["strace"] = parse_strace_summary(strace_out)
+        return result
+    finally:
+        if strace_out is not None:
+            os.remove(strace_out)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(runs):
+    walls = [run["wall_seconds"] for run in runs]
+    best = min(runs, key=lambda run: run["wall_seconds"])
+    return {
+        "median_wall_seconds": statistics.median(walls),
+        "min_wall_seconds": min(walls),
+        "files_per_sec": best["files_per_sec"],
+        "bytes_per_sec": best["bytes_per_sec"],
+        "peak_rss_kib": max((run["peak_rss_kib"] or 0) for run in runs) or None,
+    }
+
+
+def format_rate(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}/s"
+        value /= 1024
+
+
+def _pad(text, width):
+    # 中文字符占两列，按显示宽度右对齐
+    shown = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    return " " * max(0, width - shown) + text
+
+
+def print_table(cases, previous=None):
+    old = {case["name"]: case for case in previous["cases"]} if previous else {}
+    header = [_pad("中位耗时(s)", 12), _pad("文件/秒", 12), _pad("吞吐", 14), _pad("峰值内存(MiB)", 16)]
+    if old:
+        header.append(_pad("对比", 12))
+    print("用例" + " " * 12 + "".join(header))
+    for case in cases:
+        rss = case["peak_rss_kib"]
+        line = (f"{case['name']:<16}{case['median_wall_seconds']:>12.3f}"
+                f"{case['files_per_sec']:>12.1f}{format_rate(case['bytes_per_sec']):>14}"
+                f"{(rss / 1024 if rss else 0):>16.1f}")
+        if case["name"] in old:
+            # 大于 1 表示比上次快
+            ratio = old[case["name"]]["median_wall_seconds"] / case["median_wall_seconds"]
+            line += f"{ratio:>11.2f}x"
+        print(line)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="文件整理基准测试")
+    tree = parser.add_argument_group("合成目录树")
+    tree.add_argument("--depth", type=int, default=3, help="目录深度（默认 3）")
+    tree.add_argument("--fanout", type=int, default=4, help="每个目录的子目录数（默认 4）")
+    tree.add_argument("--files-per-dir", type=int, default=20, help="每个目录的文件数（默认 20）")
+    tree.add_argument("--sizes", choices=sorted(SIZE_DISTRIBUTIONS), default="small",
+                      help="文件大小分布（默认 small）")
+    tree.add_argument("--ext-mix", type=parse_ext_mix,
+                      default=DEFAULT_EXT_MIX, metavar="EXT=WEIGHT,...",
+                      help="扩展名比例，如 jpg=5,png=2,txt=2")
+    tree.add_argument("--collision-rate", type=float, default=0.1,
+                      help="与其他目录中文件重名的比例（默认 0.1）")
+    tree.add_argument("--seed", type=int, default=0, help="随机种子（默认 0）")
+    tree.add_argument("--source", help="不生成合成树，直接测试已有文件夹")
+
+    parser.add_argument("--case", action="append", type=parse_case, metavar="NAME:KEY=VALUE,...",
+                        help="测试用例及引擎参数，可多次指定；默认测试 direct、scan_first、pipeline")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="每个用例运行次数（默认 3）")
+    parser.add_argument("--log-level", default="info",
+                        help="引擎日志级别，debug 时包含每个文件的明细（默认 info）")
+    parser.add_argument("--strace", action="store_true",
+                        help="用 strace -f -c 统计全部系统调用（需要安装 strace，会明显变慢）")
+    parser.add_argument("--workdir", help="生成目录树和输出的位置（默认系统临时目录）")
+    parser.add_argument("-o", "--output", default="benchmark_results.json",
+                        help="结果 JSON 文件（默认 benchmark_results.json）")
+    parser.add_argument("--compare", metavar="JSON", help="与之前的结果文件对比")
+    parser.add_argument("--keep", action="store_true", help="保留生成的目录树")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.child:
+        run_child(json.loads(args.child))
+        return 0
+    if args.strace and shutil.which("strace") is None:
+        parser.error("找不到 strace")
+
+    cases = args.case or list(DEFAULT_CASES.items())
+    workdir = tempfile.mkdtemp(prefix="fo_bench_", dir=args.workdir)
+    try:
+        tree_params = {
+            "depth": args.depth, "fanout": args.fanout, "files_per_dir": args.files_per_dir,
+            "sizes": args.sizes, "ext_mix": args.ext_mix,
+            "collision_rate": args.collision_rate, "seed": args.seed,
+        }
+        if args.source:
+            source = os.path.abspath(args.source)
+            tree_stats = None
+            types = sorted(args.ext_mix)
+        else:
+            source = os.path.join(workdir, "src")
+            print(f"生成目录树: {source}")
+            tree_stats = generate_tree(source, **tree_params)
+            types = sorted(tree_stats["by_ext"])
+            print(f"  {tree_stats['dirs']} 个目录，{tree_stats['files']} 个文件，"
+                  f"{tree_stats['bytes'] / 1024 / 1024:.1f} MiB")
+
+        results = []
+        for name, options in cases:
+            runs = []
+            for i in range(args.repeat):
+                dest = tempfile.mkdtemp(prefix=f"dest_{name}_", dir=workdir)
+                spec = {"source": source, "dest": dest, "types": types,
+                        "options": options, "log_level": args.log_level}
+                try:
+                    runs.append(run_case(spec, args.strace))
+                finally:
+                    shutil.rmtree(dest, ignore_errors=True)
+                print(f"  {name} #{i + 1}: {runs[-1]['wall_seconds']:.3f}s")
+            case = {"name": name, "options": options, "runs": runs}
+            case.update(summarize(runs))
+            results.append(case)
+    finally:
+        if args.keep:
+            print(f"目录树保留在: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "version": RESULT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "tree": {"params": tree_params, "source": args.source, "stats": tree_stats},
+        "cases": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    print()
+    print_table(results, previous)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
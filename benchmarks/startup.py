@@ -0,0 +1,142 @@
+# 作者：AleOsh
+# 启动时间回归检查：在新进程中测量导入图形界面模块、命令行 --help、（有显示器时）首次绘制窗口的耗时，
+# 超出预算或启动时加载了不该加载的模块时以非零状态退出，可直接放进 CI。
+#
+#   python benchmarks/startup.py
+#   python benchmarks/startup.py --repeat 20 -o startup.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# 各项在解释器本身启动时间之外允许的耗时（毫秒）
+DEFAULT_BUDGETS_MS = {
+    "import_gui": 60,
+    "cli_help": 120,
+    "first_paint": 250,
+}
+
+# 启动图形界面时不应加载的模块：用不到或只在处理时才需要
+FORBIDDEN_AT_STARTUP = (
+    "requests", "webbrowser", "sqlite3", "concurrent.futures", "ctypes",
+    "hashlib", "gzip", "json", "tempfile", "shutil",
+    "organizer.engine", "organizer.dedupe", "organizer.manifest", "organizer.watch",
+)
+
+_FIRST_PAINT = """
+import time
+start = time.perf_counter()
+import file_organizer
+app = file_organizer.FileOrganizer()
+app.window.update()
+print(time.perf_counter() - start)
+app.window.destroy()
+"""
+
+_LOADED_MODULES = "import sys, file_organizer; print('\\n'.join(sorted(sys.modules)))"
+
+
+def time_command(args, repeat):
+    """多次运行命令，返回每次的墙钟时间（秒）列表；命令失败时返回 None"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(args, cwd=REPO_DIR, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None
+        times.append(elapsed)
+    return times
+
+
+def time_first_paint(repeat):
+    """创建主窗口到第一次绘制完成的耗时；没有显示器时返回 None"""
+    times = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _FIRST_PAINT], cwd=REPO_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        if proc.returncode != 0:
+            return None
+        times.append(float(proc.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def loaded_modules():
+    proc = subprocess.run([sys.executable, "-c", _LOADED_MODULES], cwd=REPO_DIR,
+                          stdout=subprocess.PIPE, text=True, check=True)
+    return set(proc.stdout.split())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动时间回归检查")
+    parser.add_argument("-r", "--repeat", type=int, default=10, help="每项运行次数，取中位数（默认 10）")
+    for name, budget in DEFAULT_BUDGETS_MS.items():
+        parser.add_argument(f"--budget-{name.replace('_', '-')}", type=float, default=budget,
+                            metavar="MS", help=f"{name} 的预算（默认 {budget} 毫秒）")
+    parser.add_argument("-o", "--output", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    baseline = time_command([sys.executable, "-c", "pass"], args.repeat)
+    baseline_ms = statistics.median(baseline) * 1000
+
+    measured = {
+        "import_gui": time_command([sys.executable, "-c", "import file_organizer"], args.repeat),
+        "cli_help": time_command([sys.executable, "-m", "file_organizer", "--help"], args.repeat),
+    }
+    results = {}
+    failed = False
+    for name, times in measured.items():
+        if times is None:
+            print(f"{name}: 运行失败")
+            failed = True
+            continue
+        results[name] = statistics.median(times) * 1000 - baseline_ms
+
+    paint = time_first_paint(max(1, args.repeat // 2))
+    if paint is None:
+        print("first_paint: 无法打开窗口（没有显示器？），跳过")
+    else:
+        # 子进程内部计时，不含解释器启动
+        results["first_paint"] = statistics.median(paint) * 1000
+
+    print(f"解释器启动: {baseline_ms:.1f} ms（以下数值已扣除）")
+    for name, value in results.items():
+        budget = getattr(args, f"budget_{name}")
+        ok = value <= budget
+        failed = failed or not ok
+        print(f"{name:<12} {value:8.1f} ms   预算 {budget:.0f} ms   {'通过' if ok else '超出预算'}")
+
+    loaded = loaded_modules()
+    unexpected = sorted(name for name in FORBIDDEN_AT_STARTUP if name in loaded)
+    if unexpected:
+        failed = True
+        print(f"启动时加载了不该加载的模块: {', '.join(unexpected)}")
+
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "baseline_ms": baseline_ms,
+            "results_ms": results,
+            "budgets_ms": {name: getattr(args, f"budget_{name}") for name in DEFAULT_BUDGETS_MS},
+            "unexpected_modules": unexpected,
+            "passed": not failed,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# 作者：AleOsh
+# 基准测试用的合成目录树：深度、分支数、文件大小分布、扩展名比例、重名比例都可调，同一种子结果相同
+
+import os
+import random
+
+# 文件大小分布：名称 -> 函数(rng) -> 字节数
+SIZE_DISTRIBUTIONS = {
+    # 全是很小的文件，主要考验遍历和元数据操作
+    "tiny": lambda rng: rng.randint(0, 4 * 1024),
+    # 1 KB ~ 256 KB 对数均匀分布，类似照片缩略图、文档
+    "small": lambda rng: int(2 ** rng.uniform(10, 18)),
+    # 大部分是小文件，约 1% 是 1 MB ~ 64 MB 的大文件
+    "mixed": lambda rng: (int(2 ** rng.uniform(20, 26)) if rng.random() < 0.01
+                          else int(2 ** rng.uniform(10, 18))),
+    # 少量大文件，考验复制吞吐
+    "large": lambda rng: int(2 ** rng.uniform(22, 27)),
+}
+
+DEFAULT_EXT_MIX = {".jpg": 5, ".png": 2, ".txt": 2, ".mp4": 1}
+
+# 每个文件开头写入的随机字节数，其余部分重复填充，保证内容各不相同又写得快
+_UNIQUE_HEAD = 4096
+
+
+def parse_ext_mix(text):
+    """解析 'jpg=5,png=2,txt' 形式的扩展名比例，未写权重的按 1 计"""
+    mix = {}
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition('=')
+        ext = name.strip().lower()
+        if not ext.startswith('.'):
+            ext = '.' + ext
+        mix[ext] = float(weight) if weight else 1.0
+    if not mix:
+        raise ValueError("扩展名比例不能为空")
+    return mix
+
+
+def generate_tree(root, depth=3, fanout=4, files_per_dir=20, sizes="small",
+                  ext_mix=None, collision_rate=0.1, seed=0, shuffle_writes=False):
+    """在 root 下生成目录树，返回 {'dirs', 'files', 'bytes', 'by_ext'} 统计
+
+    collision_rate 是从一个共用名字池里取名的文件比例，这些文件在不同目录
+    中同名，复制到同一个扩展名文件夹时需要分配 _N 后缀。
+
+    shuffle_writes 为真时先建好全部目录，再按随机顺序写文件，文件在磁盘上
+    的位置与目录遍历顺序无关，模拟长期使用后的存档盘。
+    """
+    if sizes not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"未知的文件大小分布: {sizes}")
+    size_of = SIZE_DISTRIBUTIONS[sizes]
+    ext_mix = ext_mix or DEFAULT_EXT_MIX
+    exts = list(ext_mix)
+    weights = [ext_mix[ext] for ext in exts]
+    rng = random.Random(seed)
+    shared_names = [f"IMG_{i:04d}" for i in range(max(1, files_per_dir))]
+
+    stats = {"dirs": 0, "files": 0, "bytes": 0, "by_ext": {}}
+    deferred = []
+    serial = 0
+    pending = [(root, 0)]
+    while pending:
+        path, level = pending.pop()
+        os.makedirs(path, exist_ok=True)
+        stats["dirs"] += 1
+
+        used = set()
+        for _ in range(files_per_dir):
+            ext = rng.choices(exts, weights)[0]
+            if rng.random() < collision_rate:
+                base = rng.choice(shared_names)
+            else:
+                base = f"file_{serial:08d}"
+                serial += 1
+            name = base + ext
+            if name in used:
+                continue
+            used.add(name)
+
+            size = size_of(rng)
+            if shuffle_writes:
+                deferred.append((os.path.join(path, name), size))
+            else:
+                _write_file(os.path.join(path, name), size, rng)
+            stats["files"] += 1
+            stats["bytes"] += size
+            by_ext = stats["by_ext"].setdefault(ext, {"files": 0, "bytes": 0})
+            by_ext["files"] += 1
+            by_ext["bytes"] += size
+
+        if level < depth:
+            for i in range(fanout):
+                pending.append((os.path.join(path, f"dir_{level + 1}_{i}"), level + 1))
+
+    rng.shuffle(deferred)
+    for file_path, size in deferred:
+        _write_file(file_path, size, rng)
+    return stats
+
+
+def _write_file(path, size, rng):
+    head = rng.randbytes(min(size, _UNIQUE_HEAD))
+    with open(path, 'wb') as f:
+        f.write(head)
+        remaining = size - len(head)
+        if remaining > 0:
+            block = (head or b'\0') * (1024 * 1024 // max(1, len(head)) + 1)
+            block = block[:1024 * 1024]
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= min(remaining, len(block))
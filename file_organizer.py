@@ -2,24 +2,30 @@
 # 日期：2025年1月5日
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, messagebox
 import os
-import shutil
-import threading
+import sys
 import time
-from datetime import datetime
-import webbrowser
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue, Empty
-import requests
+
+# 只导入启动界面需要的部分；引擎、文件对话框、浏览器等到用时再导入
+from organizer import (LogWriter, EventBridge, DEBUG, INFO,
+                       EVENT_LOG, EVENT_STATUS, EVENT_METRICS, EVENT_FINISHED, EVENT_JOB,
+                       STAGES, STAGE_LABELS,
+                       FRAME_INTERVAL_MS, TERMINAL_MAX_LINES,
+                       format_size, format_eta)
 
 class FileTypeSelector:
+    """文件类型选择对话框：第一次打开时创建，之后隐藏复用，不再重建"""
+
     def __init__(self, parent, initial_types=None):
         self.window = tk.Toplevel(parent)
+        self.window.withdraw()
         self.window.title("选择文件类型")
         self.window.geometry("600x600")  
         self.window.transient(parent)
-        self.window.grab_set()
+        # 关闭窗口只是隐藏，等同于取消
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self._closed = tk.BooleanVar(value=False)
         
         # 设置整体样式
         style = ttk.Style()
@@ -177,9 +183,24 @@ class FileTypeSelector:
                 self.update_selection()
                 self.custom_type.set("")
     
+    def show(self):
+        """显示对话框并等待关闭，返回选择的类型，取消时返回 None"""
+        self.result = None
+        self._closed.set(False)
+        self.window.deiconify()
+        self.window.grab_set()
+        self.window.focus_set()
+        self.window.wait_variable(self._closed)
+        return self.result
+    
+    def hide(self):
+        self.window.grab_release()
+        self.window.withdraw()
+        self._closed.set(True)
+    
     def confirm(self):
         self.result = [ext for ext, var in self.selected_types.items() if var.get()]
-        self.window.destroy()
+        self.hide()
 
 class FileOrganizer:
     def __init__(self):
@@ -243,6 +264,68 @@ class FileOrganizer:
         ttk.Radiobutton(self.mode_frame, text="模式2：先搜索后复制（可显示准确进度）", 
                        variable=self.process_mode, value="scan_first",
                        command=self.on_mode_change).pack(anchor='w', pady=5)
+        ttk.Radiobutton(self.mode_frame, text="模式3：边搜索边多线程复制（适合SSD，大量小文件）", 
+                       variable=self.process_mode, value="pipeline",
+                       command=self.on_mode_change).pack(anchor='w', pady=5)
+        
+        # 输出方式：复制 / 移动 / 硬链接 / reflink
+        self.transfer = tk.StringVar(value="copy")
+        self.transfer_frame = ttk.Frame(self.mode_frame)
+        self.transfer_frame.pack(anchor='w', pady=5)
+        ttk.Label(self.transfer_frame, text="输出方式：").pack(side='left')
+        for text, value in (("复制", "copy"), ("移动", "move"),
+                            ("硬链接", "hardlink"), ("写时复制(reflink)", "reflink")):
+            ttk.Radiobutton(self.transfer_frame, text=text, variable=self.transfer,
+                           value=value).pack(side='left', padx=(0, 10))
+        
+        # 打包输出：写入输出位置下的一个归档，而不是单独的文件
+        self.archive = tk.StringVar(value="")
+        self.archive_frame = ttk.Frame(self.mode_frame)
+        self.archive_frame.pack(anchor='w', pady=5)
+        ttk.Label(self.archive_frame, text="打包输出：").pack(side='left')
+        for text, value in (("不打包", ""), ("tar", "tar"), ("tar.gz", "tar.gz"), ("zip", "zip")):
+            ttk.Radiobutton(self.archive_frame, text=text, variable=self.archive,
+                           value=value).pack(side='left', padx=(0, 10))
+        
+        # 是否记录每个文件的明细日志（关闭后大量文件时更快）
+        self.detail_log = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.mode_frame, text="记录每个文件的详细日志（找到文件/源路径/已复制到）",
+                       variable=self.detail_log).pack(anchor='w', pady=5)
+        
+        # 按内容去重
+        self.dedupe = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="跳过输出位置中已存在的相同文件（按内容比较）",
+                       variable=self.dedupe).pack(anchor='w', pady=5)
+        
+        # 增量处理（断点续传）
+        self.incremental = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="增量处理：跳过上次已复制且未改动的文件，取消后可继续",
+                       variable=self.incremental).pack(anchor='w', pady=5)
+        
+        # 查找源文件夹中归档内的文件
+        self.scan_archives = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="也查找 zip / tar 归档内的文件（不解压整个归档，只取出匹配的文件）",
+                       variable=self.scan_archives).pack(anchor='w', pady=5)
+        
+        # 目录快照缓存
+        self.dir_cache = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="缓存目录快照：再次整理时跳过没有变化的目录（适合很大的源文件夹）",
+                       variable=self.dir_cache).pack(anchor='w', pady=5)
+        
+        # 复制校验
+        self.verify = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="复制后校验：计算 sha256 并重新读出目标文件比较，校验和保存在各类型文件夹中",
+                       variable=self.verify).pack(anchor='w', pady=5)
+        
+        # 监视模式
+        self.watch = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="处理完成后继续监视源文件夹，自动整理新出现的文件",
+                       variable=self.watch).pack(anchor='w', pady=5)
+        
+        # 演练：只生成计划（目标文件名、各类型数量和大小、所需空间），不复制
+        self.dry_run = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.mode_frame, text="演练：只统计将要复制的文件和所需空间，计划保存到日志文件夹，不复制",
+                       variable=self.dry_run).pack(anchor='w', pady=5)
         
         # 文件类型选择框架
         self.type_frame = ttk.LabelFrame(self.main_frame, text="文件类型", padding=10)
@@ -295,6 +378,14 @@ class FileOrganizer:
         self.terminal_frame = ttk.LabelFrame(self.main_frame, text="处理日志", padding=10)
         self.terminal_frame.pack(fill='both', expand=True, pady=(0, 10))
         
+        # 运行统计（速度、队列深度、各阶段耗时占比），处理时每秒刷新
+        self.metrics_label = ttk.Label(self.terminal_frame,
+                                     text="",
+                                     foreground='#00ff00',
+                                     background='black',
+                                     font=('Consolas', 9))
+        self.metrics_label.pack(side='bottom', fill='x', pady=(5, 0))
+        
         # 创建文本框和滚动条
         self.terminal = tk.Text(self.terminal_frame, height=15, wrap=tk.WORD)
         scrollbar = ttk.Scrollbar(self.terminal_frame, orient="vertical", command=self.terminal.yview)
@@ -329,19 +420,20 @@ class FileOrganizer:
         self.processing = False
         self.paused = False
         self.current_file_type = None
+        self.engine = None
+        self.job_id = None       # 当前任务的编号，之前被取消的任务发出的事件按编号忽略
+        self.scheduler = None
+        self.type_selector = None
+        self.contact_window = None
         
-        # 初始化日志目录和文件
+        # 日志目录和文件（由后台线程批量写入）在第一次开始处理时才创建
         self.log_dir = os.path.join(os.path.dirname(__file__), "file_organizer.log")
-        os.makedirs(self.log_dir, exist_ok=True)
+        self.log_writer = LogWriter(self.log_dir)
+        self.log_file = None
         
-        # 设置日志文件路径
-        current_time = time.strftime("%Y-%m-%d_%H-%M-%S")
-        self.log_file = os.path.join(self.log_dir, f"organize_{current_time}.log")
-        
-        # 创建日志文件
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            f.write(f"文件整理工具日志 - {current_time}\n")
-            f.write("-" * 50 + "\n\n")
+        # 工作线程通过事件桥把日志和进度交给界面线程，按固定帧率刷新
+        self.bridge = EventBridge()
+        self.window.after(FRAME_INTERVAL_MS, self._drain_events)
         
         # 绑定事件处理窗口大小变化
         self.main_frame.bind('<Configure>', self._on_frame_configure)
@@ -353,6 +445,11 @@ class FileOrganizer:
     def toggle_pause(self):
         """切换暂停状态"""
         self.paused = not self.paused
+        if self.engine is not None:
+            if self.paused:
+                self.engine.pause()
+            else:
+                self.engine.resume()
         if self.paused:
             self.pause_btn.configure(text="继续")
             self.log_message("处理已暂停")
@@ -364,6 +461,9 @@ class FileOrganizer:
         """停止处理"""
         self.processing = False
         self.paused = False
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = self.job_id = None
         self.terminal.configure(state='normal')
         self.terminal.delete(1.0, tk.END)
         self.terminal.configure(state='disabled')
@@ -380,22 +480,26 @@ class FileOrganizer:
         self.status_label['text'] = ""
         
     def select_source(self):
+        from tkinter import filedialog
         path = filedialog.askdirectory()
         if path:
             self.source_path.set(path.replace('/', '\\'))
             
     def select_dest(self):
+        from tkinter import filedialog
         path = filedialog.askdirectory()
         if path:
             self.dest_path.set(path.replace('/', '\\'))
             
     def select_type(self):
         """选择要处理的文件类型"""
-        selector = FileTypeSelector(self.window)
-        self.window.wait_window(selector.window)
-        if selector.result:
-            self.current_file_type = selector.result
-            self.file_types.set(f"已选择: {', '.join(selector.result)}")
+        # 对话框第一次使用时才创建，之后复用
+        if self.type_selector is None:
+            self.type_selector = FileTypeSelector(self.window)
+        result = self.type_selector.show()
+        if result:
+            self.current_file_type = result
+            self.file_types.set(f"已选择: {', '.join(result)}")
             
     def start_organize(self):
         """开始整理文件"""
@@ -409,6 +513,14 @@ class FileOrganizer:
         if not hasattr(self, 'current_file_type') or not self.current_file_type:
             messagebox.showwarning("警告", "请选择要处理的文件类型！")
             return
+        
+        archive = self.archive.get() or None
+        if archive and (self.transfer.get() != "copy" or self.dedupe.get()):
+            messagebox.showwarning("警告", "打包输出时只能使用复制方式，且不能跳过相同文件！")
+            return
+        if archive and self.verify.get():
+            messagebox.showwarning("警告", "打包输出时不支持复制后校验！")
+            return
             
         self.processing = True
         self.paused = False
@@ -421,262 +533,124 @@ class FileOrganizer:
         # 重置进度条
         self.progress['value'] = 0
         
-        # 启动进度更新
-        self.window.after(100, self.update_progress)
-        
-        # 启动处理线程
-        threading.Thread(target=lambda: self.process_files(
-            source, dest, self.current_file_type)).start()
+        if self.log_file is None:
+            self.log_file = self.log_writer.open()
+        
+        # 任务交给调度器在后台线程中运行（调度器在第一次开始处理时才创建）
+        if self.scheduler is None:
+            from organizer.scheduler import JobScheduler
+            self.scheduler = JobScheduler(on_event=self._on_job_event)
+        started = time.strftime('%Y%m%d_%H%M%S')
+        plan_exports = ()
+        if self.dry_run.get():
+            plan_exports = (os.path.join(self.log_dir, f"plan_{started}.json"),
+                            os.path.join(self.log_dir, f"plan_{started}.csv"))
+        job = self.scheduler.submit(source, dest, self.current_file_type,
+                                    mode=self.process_mode.get(),
+                                    transfer=self.transfer.get(),
+                                    archive=archive,
+                                    log_level=DEBUG if self.detail_log.get() else INFO,
+                                    dedupe=self.dedupe.get(),
+                                    incremental=self.incremental.get(),
+                                    watch=self.watch.get(),
+                                    scan_archives=self.scan_archives.get(),
+                                    dir_cache=self.dir_cache.get(),
+                                    verify=self.verify.get(),
+                                    dry_run=self.dry_run.get(),
+                                    plan_exports=plan_exports,
+                                    metrics_path=os.path.join(
+                                        self.log_dir, f"metrics_{started}.json"),
+                                    profile_path=os.environ.get("FILE_ORGANIZER_PROFILE"))
+        self.engine, self.job_id = job.engine, job.id
 
-    def process_files(self, source, dest, file_types):
-        """处理文件的核心函数"""
-        if not os.path.exists(source) or not os.path.exists(dest):
-            self.log_message("源文件夹或目标文件夹不存在！")
-            self.processing = False
-            self.reset_ui()
-            return
+    def _on_job_event(self, job, event):
+        """调度器转发的事件（在工作线程中调用）；任务状态变化界面不需要处理
 
-        self.log_message(f"开始扫描文件夹: {source}")
-        self.log_message(f"文件类型: {', '.join(file_types)}")
-        
-        # 创建目标文件夹
-        for ext in file_types:
-            ext_folder = os.path.join(dest, ext.lstrip('.').upper())
-            os.makedirs(ext_folder, exist_ok=True)
+        事件带上任务编号再交给界面，取消后才结束的任务不会影响新开始的任务。
+        """
+        if event.kind != EVENT_JOB:
+            self._on_engine_event(event._replace(source=job.id))
 
-        if self.process_mode.get() == "direct":
-            # 模式1：直接搜索并复制
-            self.process_files_direct(source, dest, file_types)
-        else:
-            # 模式2：先搜索后复制
-            self.process_files_scan_first(source, dest, file_types)
+    def _on_engine_event(self, event):
+        """处理引擎发出的事件（在工作线程中调用，不直接操作界面）"""
+        if event.kind == EVENT_LOG:
+            # 日志文件由后台线程写入，线程安全
+            self.log_writer.write(event.data['message'], event.data['level'])
+        self.bridge.post(event)
 
-    def process_files_direct(self, source, dest, file_types):
-        """模式1：直接搜索并复制（边搜索边复制）"""
-        try:
-            self.log_message("开始搜索并处理文件...")
-            self.log_message(f"源文件夹: {source}")
-            self.log_message(f"目标文件夹: {dest}")
-            self.log_message(f"文件类型: {', '.join(file_types)}")
-            processed_count = 0
-            
-            for root, _, files in os.walk(source):
-                if not self.processing:
-                    return
-                    
-                for file in files:
-                    if not self.processing:
-                        return
-                        
-                    while self.paused:
-                        if not self.processing:
-                            return
-                        time.sleep(0.1)
-                        
-                    file_path = os.path.join(root, file)
-                    file_ext = os.path.splitext(file)[1].lower()
-                    
-                    # 检查文件扩展名是否在选定的类型中
-                    if any(file_ext.endswith(ft.lower()) for ft in file_types):
-                        try:
-                            relative_path = os.path.relpath(root, source)
-                            self.log_message(f"找到文件: {file}")
-                            self.log_message(f"源路径: {file_path}")
-                            
-                            # 立即复制文件
-                            ext_folder = os.path.join(dest, file_ext.lstrip('.').upper())
-                            os.makedirs(ext_folder, exist_ok=True)
-                            
-                            filename = os.path.basename(file_path)
-                            dst_path = os.path.join(ext_folder, filename)
-                            
-                            # 处理重名文件
-                            if os.path.exists(dst_path):
-                                base, ext = os.path.splitext(filename)
-                                counter = 1
-                                while os.path.exists(dst_path):
-                                    new_filename = f"{base}_{counter}{ext}"
-                                    dst_path = os.path.join(ext_folder, new_filename)
-                                    counter += 1
-                                filename = new_filename
-                            
-                            # 复制文件
-                            shutil.copy2(file_path, dst_path)
-                            processed_count += 1
-                            self.log_message(f"已复制到: {dst_path}")
-                            
-                        except Exception as e:
-                            self.log_message(f"处理文件失败: {file_path}")
-                            self.log_message(f"错误信息: {str(e)}")
-            
-            self.log_message(f"处理完成！共处理 {processed_count} 个文件")
-            self.log_message("=" * 50)
-            
-        except Exception as e:
-            self.log_message(f"处理过程出错: {str(e)}")
-        finally:
-            self.processing = False
-            self.reset_ui()
+    def log_message(self, message, level=INFO):
+        """记录日志消息到终端和文件（任意线程均可调用）"""
+        self.log_writer.write(message, level)
+        self.bridge.post_log(message, level)
 
-    def process_files_scan_first(self, source, dest, file_types):
-        """模式2：先搜索后复制（显示准确进度）"""
+    def _drain_events(self):
+        """按固定帧率批量处理工作线程投递的事件"""
         try:
-            self.total_files = 0
-            self.current_file_index = 0
-            self.files_to_copy = []  # 存储待复制的文件信息
-            
-            self.log_message("开始扫描文件...")
-            self.log_message(f"源文件夹: {source}")
-            self.log_message(f"目标文件夹: {dest}")
-            self.log_message(f"文件类型: {', '.join(file_types)}")
-            
-            # 第一阶段：扫描文件
-            for root, dirs, files in os.walk(source):
-                if not self.processing:
-                    return
-                
-                # 如果当前目录是输出目录或其子目录，跳过
-                if self.should_skip_directory(root, dest):
-                    self.log_message(f"跳过输出目录: {root}")
-                    dirs.clear()  # 清空目录列表，阻止继续遍历子目录
-                    continue
-                    
-                for file in files:
-                    if not self.processing:
-                        return
-                        
-                    while self.paused:
-                        if not self.processing:
-                            return
-                        time.sleep(0.1)
-                        
-                    file_path = os.path.join(root, file)
-                    file_ext = os.path.splitext(file)[1].lower()
-                    
-                    if any(file_ext.endswith(ft.lower()) for ft in file_types):
-                        self.total_files += 1
-                        self.log_message(f"找到文件: {file}")
-                        self.log_message(f"源路径: {file_path}")
-                        self.files_to_copy.append((file_path, file_ext))
-            
-            if not self.processing:
-                return
-                
-            self.log_message(f"扫描完成，共找到 {self.total_files} 个文件")
-            self.log_message("=" * 50)
-            
-            if self.total_files == 0:
-                self.log_message("未找到符合条件的文件")
-                return
-                
-            # 设置进度条最大值
-            self.progress['maximum'] = self.total_files
-            self.progress['value'] = 0
-            
-            # 第二阶段：复制文件
-            self.log_message("开始复制文件...")
-            
-            for src_path, ext in self.files_to_copy:
-                if not self.processing:
-                    break
-                    
-                while self.paused:
-                    if not self.processing:
-                        break
-                    time.sleep(0.1)
-                    
-                try:
-                    # 创建目标文件夹
-                    ext_folder = os.path.join(dest, ext.lstrip('.').upper())
-                    os.makedirs(ext_folder, exist_ok=True)
-                    
-                    # 准备目标路径
-                    filename = os.path.basename(src_path)
-                    dst_path = os.path.join(ext_folder, filename)
-                    
-                    # 处理重名文件
-                    if os.path.exists(dst_path):
-                        base, ext = os.path.splitext(filename)
-                        counter = 1
-                        while os.path.exists(dst_path):
-                            new_filename = f"{base}_{counter}{ext}"
-                            dst_path = os.path.join(ext_folder, new_filename)
-                            counter += 1
-                        filename = new_filename
-                    
-                    # 复制文件
-                    shutil.copy2(src_path, dst_path)
-                    self.current_file_index += 1
-                    
-                    # 更新进度（使用after方法避免闪烁）
-                    def update_progress():
-                        progress = int((self.current_file_index / self.total_files) * 100)
-                        self.progress['value'] = self.current_file_index
-                        self.progress_label['text'] = f"{progress}%"
-                        self.status_label['text'] = f"处理中... {self.current_file_index}/{self.total_files}"
-                    
-                    self.window.after(0, update_progress)
-                    self.log_message(f"已复制到: {dst_path}")
-                    
-                except Exception as e:
-                    self.log_message(f"处理文件失败: {src_path}")
-                    self.log_message(f"错误信息: {str(e)}")
-            
-            if self.current_file_index == self.total_files:
-                self.log_message("所有文件处理完成！")
-                self.status_label['text'] = "处理完成"
-            else:
-                self.log_message(f"处理完成 {self.current_file_index}/{self.total_files} 个文件")
-            
-            self.log_message("=" * 50)
-            
-        except Exception as e:
-            self.log_message(f"处理过程出错: {str(e)}")
-        finally:
-            self.processing = False
-            self.reset_ui()
+            lines, progress, events = self.bridge.drain()
 
-    def should_skip_directory(self, dir_path, dest_path):
-        """检查是否应该跳过该目录"""
-        # 转换为绝对路径进行比较
-        abs_dir = os.path.abspath(dir_path)
-        abs_dest = os.path.abspath(dest_path)
-        
-        # 检查是否是输出目录或其子目录
-        return abs_dir.startswith(abs_dest)
+            # 更新终端显示：一帧只插入一次，并只保留最后若干行
+            if lines:
+                self.terminal.configure(state='normal')
+                self.terminal.insert(tk.END, "".join(lines))
+                line_count = int(self.terminal.index('end-1c').split('.')[0])
+                if line_count > TERMINAL_MAX_LINES:
+                    self.terminal.delete('1.0', f"{line_count - TERMINAL_MAX_LINES}.0")
+                self.terminal.see(tk.END)
+                self.terminal.configure(state='disabled')
 
-    def log_message(self, message):
-        """记录日志消息到终端和文件"""
-        try:
-            # 获取当前时间
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            log_message = f"[{current_time}] {message}\n"
-            
-            # 更新终端显示
-            self.terminal.configure(state='normal')
-            self.terminal.insert(tk.END, log_message)
-            self.terminal.see(tk.END)
-            self.terminal.configure(state='disabled')
-            
-            # 写入日志文件
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_message)
-                
-        except Exception as e:
-            print(f"写入日志时出错: {str(e)}")
+            # 更新进度（多次进度合并为最新一次）
+            if progress is not None and progress.source == self.job_id:
+                # 按字节计算百分比，一个大文件也能看到进度
+                progress = progress.data
+                current, total = progress['current'], progress['total']
+                bytes_done, bytes_total = progress['bytes_done'], progress['bytes_total']
+                fraction = bytes_done / bytes_total if bytes_total else current / max(1, total)
+                self.progress['maximum'] = 1000
+                self.progress['value'] = int(fraction * 1000)
+                self.progress_label['text'] = f"{int(fraction * 100)}%"
+                if bytes_done or current:
+                    self.status_label['text'] = (
+                        f"处理中... {current}/{total}  "
+                        f"{format_size(bytes_done)}/{format_size(bytes_total)}  "
+                        f"{format_size(progress['rate'])}/s  剩余 {format_eta(progress['eta'])}")
 
-    def update_progress(self):
-        """更新进度条"""
-        if self.processing and self.process_mode.get() == "scan_first":
-            if hasattr(self, 'current_file_index') and hasattr(self, 'total_files'):
-                progress = int((self.current_file_index / max(1, self.total_files)) * 100)
-                self.progress['value'] = self.current_file_index
-                self.progress_label['text'] = f"{progress}%"
-            self.window.after(50, self.update_progress)  # 降低更新频率，减少闪烁
+            for event in events:
+                if event.source != self.job_id:
+                    continue
+                if event.kind == EVENT_STATUS:
+                    self.status_label['text'] = event.data['text']
+                elif event.kind == EVENT_METRICS:
+                    self.metrics_label['text'] = self.format_metrics(event.data)
+                elif event.kind == EVENT_FINISHED:
+                    self.processing = False
+                    self.reset_ui()
+
+        except Exception as e:
+            print(f"更新界面时出错: {str(e)}")
+        finally:
+            self.window.after(FRAME_INTERVAL_MS, self._drain_events)
     
+    def format_metrics(self, data):
+        """运行统计转为一行文字"""
+        shares = data['stage_shares']
+        stages = " ".join(f"{STAGE_LABELS[stage]}{shares[stage]:.0%}"
+                          for stage in STAGES if shares[stage] >= 0.01)
+        text = (f"{data['files_per_sec']:.1f} 个/秒  {format_size(data['bytes_per_sec'])}/s  "
+                f"stat {data['stat_calls']}  平均复制 {data['copy']['avg_seconds'] * 1000:.1f} ms")
+        if data['queue_depth']['max']:
+            text += f"  队列 {data['queue_depth']['avg']:.0f}/{data['queue_depth']['max']}"
+        if stages:
+            text += f"  |  {stages}"
+        return text
+
     def show_contact(self):
-        """显示作者联系信息窗口"""
-        contact_window = tk.Toplevel(self.window)
+        """显示作者联系信息窗口（只创建一次，关闭后隐藏复用）"""
+        if self.contact_window is not None:
+            self.contact_window.deiconify()
+            self.contact_window.lift()
+            return
+        contact_window = self.contact_window = tk.Toplevel(self.window)
+        contact_window.protocol("WM_DELETE_WINDOW", contact_window.withdraw)
         contact_window.title("联系作者")
         contact_window.geometry("302x289")  # 修改窗口大小
         
@@ -700,9 +674,11 @@ class FileOrganizer:
         button_frame.pack(fill='x', pady=20)
         
         def open_github():
+            import webbrowser
             webbrowser.open("https://github.com/AleOsh")
             
         def open_csdn():
+            import webbrowser
             webbrowser.open("https://blog.csdn.net/2301_76829730")
             
         def download_source_code():
@@ -775,8 +751,23 @@ class FileOrganizer:
         self.main_canvas.itemconfig(1, width=width)
     
     def run(self):
-        self.window.mainloop()
+        try:
+            self.window.mainloop()
+        finally:
+            if self.scheduler is not None:
+                # 取消正在运行的任务，等它删除未完成的文件后再退出
+                self.scheduler.shutdown(cancel=True)
+            self.log_writer.close()
 
-if __name__ == "__main__":
+def main(argv=None):
+    """程序入口：带参数时以命令行方式运行，否则启动图形界面"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from organizer.cli import main as cli_main
+        return cli_main(argv)
     app = FileOrganizer()
     app.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# 作者：AleOsh
+# 文件整理核心：不依赖 Tk 的引擎，可在无显示环境下运行
+#
+# 各名称在第一次访问时才导入所在模块，图形界面启动时只加载用到的部分
+# （事件类型、日志、事件桥），引擎、去重、监视等模块到开始处理时才加载。
+
+import importlib
+
+_EXPORTS = {
+    ".engine": ("OrganizeEngine", "MODE_DIRECT", "MODE_SCAN_FIRST", "MODE_PIPELINE",
+                "MODES", "DEFAULT_WORKERS", "DEFAULT_QUEUE_SIZE"),
+    ".events": ("EngineEvent", "EVENT_LOG", "EVENT_PROGRESS", "EVENT_STATUS",
+                "EVENT_METRICS", "EVENT_FINISHED", "EVENT_JOB"),
+    ".control": ("RunControl",),
+    ".archive": ("ArchiveWriter", "ARCHIVE_TAR", "ARCHIVE_TGZ", "ARCHIVE_ZIP", "ARCHIVE_FORMATS"),
+    ".checksum": ("ChecksumManifest", "ChecksumMismatch", "file_digest", "CHECKSUM_SHA256",
+                  "CHECKSUM_BLAKE2B", "CHECKSUM_ALGORITHMS"),
+    ".copier": ("copy_file", "CopyCancelled", "ThroughputMeter", "DEFAULT_CHUNK_SIZE"),
+    ".units": ("format_size", "format_eta"),
+    ".dircache": ("DirCache", "DIR_CACHE_NAME"),
+    ".dryrun": ("DryRunPlan",),
+    ".dedupe": ("Deduper", "HashCache"),
+    ".layout": ("DestinationLayout",),
+    ".logwriter": ("LogWriter", "DEBUG", "INFO", "WARNING", "ERROR", "LEVELS", "parse_level"),
+    ".manifest": ("Manifest",),
+    ".matcher": ("FileMatcher", "normalize_ext", "parse_size", "parse_time"),
+    ".metrics": ("RunMetrics", "STAGES", "STAGE_LABELS"),
+    ".ordering": ("order_files", "physical_offset", "ORDER_SCAN", "ORDER_INODE", "ORDER_EXTENT",
+                  "ORDER_DIRECTORY", "ORDER_SMALL_FIRST", "ORDERS"),
+    ".packed": ("PackedIndexCache", "PackedReader", "PackedFile", "index_archive", "packed_format"),
+    ".plan": ("ScanPlan", "DEFAULT_SPILL_BYTES"),
+    ".scheduler": ("JobScheduler", "Job", "JOB_QUEUED", "JOB_RUNNING", "JOB_DONE",
+                   "JOB_FAILED", "JOB_CANCELLED", "JOB_STATUS_LABELS"),
+    ".procscan": ("scan_processes", "DEFAULT_SCAN_PROCESSES"),
+    ".transfer": ("transfer_file", "TRANSFER_COPY", "TRANSFER_MOVE", "TRANSFER_HARDLINK",
+                  "TRANSFER_REFLINK", "TRANSFER_MODES"),
+    ".walker": ("TreeWalker", "DEFAULT_WALK_WORKERS", "SPLIT_MAX_DEPTH"),
+    ".watch": ("Debouncer", "InotifyWatcher", "PollingWatcher", "start_watcher"),
+    ".bridge": ("EventBridge", "FRAME_INTERVAL_MS", "TERMINAL_MAX_LINES"),
+}
+
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,398 @@
+# 作者：AleOsh
+# 归档输出：匹配到的文件直接顺序写入 tar / tar.gz / zip 归档，按扩展名分文件夹，可按大小分卷
+#
+# 每个文件只读一次、顺序写入归档，不在输出目录中创建单独的文件。复制到一半
+# 被取消或读取出错时，把归档截断回这个文件之前，已写入的其他文件不受影响。
+
+import os
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+
+from .copier import CopyCancelled, DEFAULT_CHUNK_SIZE
+
+ARCHIVE_TAR = "tar"
+ARCHIVE_TGZ = "tar.gz"
+ARCHIVE_ZIP = "zip"
+ARCHIVE_FORMATS = (ARCHIVE_TAR, ARCHIVE_TGZ, ARCHIVE_ZIP)
+
+_SUFFIXES = {ARCHIVE_TAR: ".tar", ARCHIVE_TGZ: ".tar.gz", ARCHIVE_ZIP: ".zip"}
+_BLOCK = tarfile.BLOCKSIZE
+# gzip 文件头：魔数、deflate、无标志、修改时间 0、无额外标志、未知系统
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+_GZIP_TRAILER_SIZE = 8
+# tar.gz 回退时最多重新压缩多少原始数据，超过后设新的检查点
+_REPLAY_LIMIT = 4 * 1024 * 1024
+# zip 本地文件头、中央目录项、ZIP64 额外字段（本地 / 中央目录）、结尾记录
+# （目录结束记录 + ZIP64 目录结束记录和定位记录）的大小
+_ZIP_LOCAL_HEADER = 30
+_ZIP_CENTRAL_HEADER = 46
+_ZIP64_LOCAL_EXTRA = 20
+_ZIP64_CENTRAL_EXTRA = 28
+_ZIP_END_RECORDS = 22 + 56 + 20
+
+
+def _deflate_bound(size):
+    """size 字节经 deflate 压缩（含一次同步刷新）后最多的字节数，与 zlib 的 deflateBound 相同再留些余量"""
+    return size + (size >> 12) + (size >> 14) + (size >> 25) + 32
+
+
+def _padded(size):
+    """tar 中数据按 512 字节块对齐后的大小"""
+    return -(-size // _BLOCK) * _BLOCK
+
+
+def archive_name():
+    """本次运行的归档名（不含扩展名），带时间以免覆盖之前的归档"""
+    return f"organized_{time.strftime('%Y%m%d_%H%M%S')}"
+
+
+class _FileSink:
+    """直接写入文件，回退时截断"""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+
+    @property
+    def offset(self):
+        """写完已写入的数据后文件最多有多大"""
+        return self._file.tell()
+
+    def write(self, data):
+        self._file.write(data)
+
+    def sync(self):
+        """让 offset 等于已写入数据的准确大小"""
+
+    def snapshot(self):
+        return self._file.tell()
+
+    def rollback(self, state):
+        self._file.seek(state)
+        self._file.truncate()
+
+    def close(self):
+        self._file.close()
+
+
+class _GzipSink(_FileSink):
+    """边写边压缩成 gzip，整个卷是一个连续的 deflate 流
+
+    回退时不能只截断文件：压缩器内部还缓存着数据。每隔一段（检查点）保存
+    一份压缩器状态和文件位置，之后写入的原始数据留在内存中；回退时恢复到
+    检查点、截断文件，再把检查点之后、回退位置之前的数据重新压缩一遍。
+    压缩器只在检查点复制、只在需要准确大小时（接近分卷大小）刷新，小文件
+    很多时压缩率与一次性压缩相同。
+    """
+
+    def __init__(self, path, level=9):
+        # 与 gzip 模块和 tarfile 的默认压缩级别相同
+        super().__init__(path)
+        self._file.write(_GZIP_HEADER)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._crc = 0
+        self._size = 0
+        self._pending = 0        # 上次刷新之后写入的原始字节数
+        self._replay = []        # 检查点之后写入的原始数据
+        self._replay_size = 0
+        self._complete = True    # _replay 是否包含检查点之后的全部数据
+        self._checkpoint()
+
+    @property
+    def offset(self):
+        # 压缩器缓存的数据还没写出，按压缩后大小的上限计算
+        return self._file.tell() + (_deflate_bound(self._pending) if self._pending else 0)
+
+    def _checkpoint(self):
+        self._saved = (self._compressor.copy(), self._file.tell(), self._crc, self._size,
+                       self._pending)
+        self._replay = []
+        self._replay_size = 0
+        self._complete = True
+
+    def _feed(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._pending += len(data)
+        self._file.write(self._compressor.compress(data))
+
+    def write(self, data):
+        self._feed(data)
+        if self._complete:
+            if self._replay_size + len(data) > _REPLAY_LIMIT:
+                # 大文件的数据不留在内存中，下一个文件开始前重新设检查点
+                self._complete = False
+            else:
+                self._replay.append(data)
+                self._replay_size += len(data)
+
+    def sync(self):
+        # 同步刷新：压缩器缓存的数据全部写出，不重置字典
+        self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._pending = 0
+        self._checkpoint()
+
+    def snapshot(self):
+        if not self._complete or self._replay_size >= _REPLAY_LIMIT:
+            self._checkpoint()
+        return len(self._replay)
+
+    def rollback(self, state):
+        compressor, offset, self._crc, self._size, self._pending = self._saved
+        self._compressor = compressor.copy()
+        super().rollback(offset)
+        replay = self._replay[:state]
+        self._replay = []
+        self._replay_size = 0
+        self._complete = True
+        for data in replay:
+            self.write(data)
+
+    def close(self):
+        self._file.write(self._compressor.flush())
+        self._file.write(struct.pack("<II", self._crc, self._size & 0xFFFFFFFF))
+        self._file.close()
+
+
+class _TarVolume:
+    """一个 tar / tar.gz 卷；成员头用 TarInfo.tobuf() 生成（PAX 格式，支持长文件名和大文件）"""
+
+    def __init__(self, path, compress):
+        self.path = path
+        self.compress = compress
+        self._sink = _GzipSink(path) if compress else _FileSink(path)
+        self.members = 0
+
+    @property
+    def size(self):
+        """已写入的成员最多占多少字节（压缩时含压缩器中还没写出的部分的上限）"""
+        return self._sink.offset
+
+    def sync(self):
+        """刷新压缩器，让 size 是准确的文件大小"""
+        self._sink.sync()
+
+    @property
+    def trailer(self):
+        """close() 最多还会写出的字节数"""
+        if self.compress:
+            return _deflate_bound(2 * _BLOCK) + _GZIP_TRAILER_SIZE
+        return 2 * _BLOCK
+
+    @staticmethod
+    def _header(arcname, st):
+        info = tarfile.TarInfo(arcname)
+        info.size = st.st_size
+        info.mtime = st.st_mtime
+        info.mode = st.st_mode & 0o7777
+        return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+    def cost(self, arcname, st):
+        """写入这个成员最多增加的字节数：成员头（含 PAX 扩展头）、数据和对齐填充"""
+        size = len(self._header(arcname, st)) + _padded(st.st_size)
+        return _deflate_bound(size) if self.compress else size
+
+    def begin(self, arcname, st):
+        state = self._sink.snapshot()
+        self._sink.write(self._header(arcname, st))
+        return state
+
+    def write(self, state, data):
+        self._sink.write(data)
+
+    def end(self, state, size):
+        remainder = size % _BLOCK
+        if remainder:
+            self._sink.write(b"\0" * (_BLOCK - remainder))
+        self.members += 1
+
+    def rollback(self, state):
+        self._sink.rollback(state)
+
+    def close(self):
+        # 归档结尾是两个全零块
+        self._sink.write(b"\0" * (2 * _BLOCK))
+        self._sink.close()
+
+
+class _ZipVolume:
+    """一个 zip 卷（deflate 压缩，超过 4 GB 时自动使用 ZIP64）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.members = 0
+        self._central = 0       # 已写入成员的中央目录项共多少字节
+
+    @property
+    def size(self):
+        return self._zip.fp.tell()
+
+    def sync(self):
+        """每个成员写完时已全部写出，不需要刷新"""
+
+    @property
+    def trailer(self):
+        """close() 最多还会写出的字节数：中央目录和结尾记录"""
+        return self._central + _ZIP_END_RECORDS
+
+    @staticmethod
+    def _central_size(arcname):
+        return _ZIP_CENTRAL_HEADER + len(arcname.encode("utf-8")) + _ZIP64_CENTRAL_EXTRA
+
+    def cost(self, arcname, st):
+        """写入这个成员最多增加的字节数：本地文件头、压缩后的数据和它的中央目录项"""
+        return (_ZIP_LOCAL_HEADER + len(arcname.encode("utf-8")) + _ZIP64_LOCAL_EXTRA
+                + _deflate_bound(st.st_size) + self._central_size(arcname))
+
+    def begin(self, arcname, st):
+        info = zipfile.ZipInfo(arcname, time.localtime(max(st.st_mtime, 315532800))[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = (st.st_mode & 0xFFFF) << 16
+        info.file_size = st.st_size
+        start = self._zip.fp.tell()
+        handle = self._zip.open(info, 'w', force_zip64=st.st_size >= zipfile.ZIP64_LIMIT)
+        return start, info, handle
+
+    def write(self, state, data):
+        state[2].write(data)
+
+    def end(self, state, size):
+        state[2].close()
+        self._central += self._central_size(state[1].filename)
+        self.members += 1
+
+    def rollback(self, state):
+        start, info, handle = state
+        # zipfile 没有撤销成员的接口：先正常结束这个成员，再删掉它的目录项并截断
+        handle.close()
+        self._zip.filelist.remove(info)
+        self._zip.NameToInfo.pop(info.filename, None)
+        self._zip.fp.seek(start)
+        self._zip.fp.truncate()
+        self._zip.start_dir = start
+
+    def close(self):
+        self._zip.close()
+
+
+class ArchiveWriter:
+    """把文件依次写入 dest 下的归档
+
+    不分卷时只有一个 <name>.tar；给出 volume_size 时写入 <name>_001.tar、
+    <name>_002.tar……，当前卷加上下一个文件会超过 volume_size 时换新卷。
+    计算时包括成员头、对齐填充、归档结尾和 zip 的中央目录；压缩的数据按
+    压缩后大小的上限计算，所以压缩格式的卷通常比 volume_size 小一些。
+    单个文件本身就超过 volume_size 时单独成卷。add() 可在多个线程中调用，
+    写入按顺序进行。
+    """
+
+    def __init__(self, dest, fmt=ARCHIVE_TAR, volume_size=None, name=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"未知的归档格式: {fmt}")
+        if volume_size is not None and volume_size < 1:
+            raise ValueError("分卷大小必须大于 0")
+        self.dest = dest
+        self.format = fmt
+        self.volume_size = volume_size
+        self.name = name or archive_name()
+        self.chunk_size = chunk_size
+        self.volumes = []        # 已创建的卷路径
+        self._volume = None
+        self._lock = threading.Lock()
+
+    def _volume_path(self):
+        suffix = _SUFFIXES[self.format]
+        if self.volume_size is None:
+            return os.path.join(self.dest, self.name + suffix)
+        return os.path.join(self.dest, f"{self.name}_{len(self.volumes) + 1:03d}{suffix}")
+
+    def _open_volume(self):
+        path = self._volume_path()
+        if self.format == ARCHIVE_ZIP:
+            self._volume = _ZipVolume(path)
+        else:
+            self._volume = _TarVolume(path, compress=self.format == ARCHIVE_TGZ)
+        self.volumes.append(path)
+
+    def add(self, src_path, arcname, on_progress=None, should_continue=None):
+        """写入一个文件，返回所在卷的路径
+
+        on_progress(字节数) 和 should_continue() 的用法与 copy_file 相同；
+        取消或出错时该文件不会留在归档中。
+        """
+        with open(src_path, 'rb') as f:
+            return self.add_fileobj(f, arcname, os.fstat(f.fileno()), on_progress, should_continue)
+
+    def add_fileobj(self, f, arcname, st, on_progress=None, should_continue=None):
+        """从已打开的文件对象写入 st.st_size 字节（如源文件夹中归档内的文件），返回所在卷的路径
+
+        st 需要有 st_size、st_mtime、st_mode。
+        """
+        arcname = arcname.replace(os.sep, "/")
+        small = st.st_size <= self.chunk_size
+        # 小文件先整个读进内存再写，读取失败时归档里什么都还没写
+        data = f.read(st.st_size) if small else None
+
+        with self._lock:
+            if should_continue is not None and not should_continue():
+                raise CopyCancelled()
+            volume = self._select_volume(arcname, st)
+            state = volume.begin(arcname, st)
+            try:
+                if small:
+                    self._write(volume, state, data, st.st_size)
+                    if on_progress is not None:
+                        on_progress(len(data))
+                else:
+                    self._stream(volume, state, f, st.st_size, on_progress, should_continue)
+                volume.end(state, st.st_size)
+            except BaseException:
+                volume.rollback(state)
+                raise
+            return volume.path
+
+    def _select_volume(self, arcname, st):
+        volume = self._volume
+        if volume is not None and self.volume_size is not None and volume.members \
+                and not self._fits(volume, arcname, st):
+            # 按上限估计放不下时才刷新压缩器，用准确的大小再判断一次
+            volume.sync()
+            if not self._fits(volume, arcname, st):
+                volume.close()
+                volume = self._volume = None
+        if volume is None:
+            self._open_volume()
+        return self._volume
+
+    def _fits(self, volume, arcname, st):
+        return volume.size + volume.cost(arcname, st) + volume.trailer <= self.volume_size
+
+    def _write(self, volume, state, data, expected):
+        if len(data) != expected:
+            raise OSError("文件在写入归档时大小发生了变化")
+        volume.write(state, data)
+
+    def _stream(self, volume, state, f, size, on_progress, should_continue):
+        remaining = size
+        while remaining:
+            if should_continue is not None and not should_continue():
+                raise CopyCancelled()
+            data = f.read(min(self.chunk_size, remaining))
+            if not data:
+                raise OSError("文件在写入归档时大小发生了变化")
+            volume.write(state, data)
+            remaining -= len(data)
+            if on_progress is not None:
+                on_progress(len(data))
+
+    def close(self):
+        """结束当前卷"""
+        with self._lock:
+            if self._volume is not None:
+                self._volume.close()
+                self._volume = None
@@ -0,0 +1,74 @@
+# 作者：AleOsh
+# 工作线程到界面线程的事件桥：工作线程只投递事件，界面线程按固定帧率批量取出
+
+import threading
+import time
+from collections import deque
+from queue import Queue, Empty
+
+from .events import EngineEvent, EVENT_LOG, EVENT_PROGRESS
+from .logwriter import INFO
+
+# 界面每帧间隔（约 30 帧/秒）、每帧最多处理的事件数、终端最多保留的行数
+FRAME_INTERVAL_MS = 33
+MAX_EVENTS_PER_FRAME = 20000
+TERMINAL_MAX_LINES = 2000
+
+
+class EventBridge:
+    """线程安全的事件桥，不依赖 Tk
+
+    post() 可在任意线程调用；进度事件只保留最新一条（合并），其余事件按顺序
+    排队。界面线程定时调用 drain() 一次性取出一批，再统一刷新界面，避免
+    每个文件都往 Tk 事件队列里塞一个回调。事件的 source 原样保留，界面据此
+    忽略已被取消的任务发出的事件。
+    """
+
+    def __init__(self, max_lines=TERMINAL_MAX_LINES):
+        self.max_lines = max_lines
+        self._queue = Queue()
+        self._progress = None
+        self._progress_lock = threading.Lock()
+        self._time_cache = (None, "")
+
+    def post(self, event):
+        """投递引擎事件（任意线程）"""
+        if event.kind == EVENT_PROGRESS:
+            # 界面线程只关心最新进度，直接覆盖
+            with self._progress_lock:
+                self._progress = event
+        else:
+            self._queue.put((time.time(), event))
+
+    def post_log(self, message, level=INFO):
+        """投递一条日志（任意线程）"""
+        self.post(EngineEvent(EVENT_LOG, {"message": message, "level": level}))
+
+    def drain(self, max_events=MAX_EVENTS_PER_FRAME):
+        """取出当前积压的事件（界面线程）
+
+        返回 (日志行列表, 最新的进度事件或 None, 其他事件列表)。日志行已带时间
+        前缀，且只保留最后 max_lines 行，更早的行反正会被终端丢弃。
+        """
+        lines = deque(maxlen=self.max_lines)
+        events = []
+        for _ in range(max_events):
+            try:
+                timestamp, event = self._queue.get_nowait()
+            except Empty:
+                break
+            if event.kind == EVENT_LOG:
+                lines.append(f"[{self._format_time(timestamp)}] {event.data['message']}\n")
+            else:
+                events.append(event)
+
+        with self._progress_lock:
+            progress, self._progress = self._progress, None
+        return list(lines), progress, events
+
+    def _format_time(self, timestamp):
+        # 同一秒内的消息复用格式化结果
+        second = int(timestamp)
+        if self._time_cache[0] != second:
+            self._time_cache = (second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)))
+        return self._time_cache[1]
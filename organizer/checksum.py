@@ -0,0 +1,155 @@
+# 作者：AleOsh
+# 复制校验：复制时顺带计算校验和（数据只读一遍），可选重新读出目标文件比较；
+# 校验和按扩展名文件夹写入 SHA256SUMS / B2SUMS，格式与 sha256sum、b2sum 相同，可用 -c 检查
+
+import hashlib
+import os
+import threading
+
+from .copier import CopyCancelled, DEFAULT_CHUNK_SIZE
+
+CHECKSUM_SHA256 = "sha256"
+CHECKSUM_BLAKE2B = "blake2b"
+CHECKSUM_ALGORITHMS = (CHECKSUM_SHA256, CHECKSUM_BLAKE2B)
+DEFAULT_CHECKSUM = CHECKSUM_SHA256
+
+# 各扩展名文件夹中的校验和清单文件名
+SUMS_NAMES = {CHECKSUM_SHA256: "SHA256SUMS", CHECKSUM_BLAKE2B: "B2SUMS"}
+# 重新读出的内容与复制时不一致时最多再复制几次
+VERIFY_RETRIES = 2
+
+
+class ChecksumMismatch(OSError):
+    """重新复制后目标文件的校验和仍与复制时不一致"""
+
+
+def new_hasher(algorithm):
+    """创建计算校验和的 hashlib 对象"""
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"未知的校验算法: {algorithm}")
+    return hashlib.new(algorithm)
+
+
+def file_digest(path, algorithm, chunk_size=DEFAULT_CHUNK_SIZE, should_continue=None):
+    """重新读出刚写完的文件，返回校验和（十六进制）
+
+    文件只以只读方式打开（Windows 上只读的文件不能 fsync），写入磁盘由
+    复制时的 sync=True 完成。支持时先让系统丢弃这个文件的页缓存，读到的
+    是磁盘上的内容，而不是刚写入的缓存。should_continue() 为假时抛出 CopyCancelled。
+    """
+    hasher = new_hasher(algorithm)
+    with open(path, 'rb') as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        while True:
+            if should_continue is not None and not should_continue():
+                raise CopyCancelled()
+            data = f.read(chunk_size)
+            if not data:
+                return hasher.hexdigest()
+            hasher.update(data)
+
+
+def _escape(name):
+    # 与 coreutils 相同：文件名含反斜杠或换行时转义，并在行首加反斜杠
+    if b"\\" not in name and b"\n" not in name:
+        return b"", name
+    return b"\\", name.replace(b"\\", b"\\\\").replace(b"\n", b"\\n")
+
+
+def _unescape(name):
+    return name.replace(b"\\\\", b"\0").replace(b"\\n", b"\n").replace(b"\0", b"\\")
+
+
+def _parse_line(line):
+    """解析清单中的一行，返回 (文件名, 校验和)，无法识别时返回 None"""
+    escaped = line.startswith(b"\\")
+    if escaped:
+        line = line[1:]
+    digest, sep, name = line.partition(b" ")
+    if not sep or not name or name[:1] not in (b" ", b"*"):
+        return None
+    name = name[1:]
+    return (_unescape(name) if escaped else name), digest.decode("ascii", "replace")
+
+
+class ChecksumManifest:
+    """按扩展名文件夹保存的校验和清单
+
+    每个文件夹的清单第一次用到时读入已有内容，新记录立即追加写入，中途
+    中断也不会丢失已记下的校验和；同一文件名重新复制后清单中会有两行，
+    close() 时整理为每个文件一行。add() 可在多个线程中调用。
+    """
+
+    def __init__(self, algorithm=DEFAULT_CHECKSUM):
+        new_hasher(algorithm)
+        self.algorithm = algorithm
+        self.sums_name = SUMS_NAMES[algorithm]
+        self._lock = threading.Lock()
+        # 文件夹 -> [{文件名: 校验和}, 追加写入的文件, 是否有重复的文件名]
+        self._folders = {}
+
+    def add(self, path, digest):
+        """记录 path 的校验和（写入 path 所在文件夹的清单）"""
+        with self._lock:
+            state, name = self._state(path)
+            entries, f, _replaced = state
+            if name in entries:
+                state[2] = True
+            entries[name] = digest
+            prefix, escaped = _escape(name)
+            f.write(prefix + digest.encode("ascii") + b"  " + escaped + b"\n")
+            f.flush()
+
+    def discard(self, path):
+        """删除 path 的旧校验和（文件被不经复制的方式替换时），close() 时从清单中去掉"""
+        folder = os.path.dirname(path)
+        with self._lock:
+            if folder not in self._folders \
+                    and not os.path.exists(os.path.join(folder, self.sums_name)):
+                return
+            state, name = self._state(path)
+            if state[0].pop(name, None) is not None:
+                state[2] = True
+
+    def _state(self, path):
+        folder, filename = os.path.split(path)
+        state = self._folders.get(folder)
+        if state is None:
+            state = self._folders[folder] = self._open(folder)
+        return state, os.fsencode(filename)
+
+    def _open(self, folder):
+        path = os.path.join(folder, self.sums_name)
+        entries = {}
+        replaced = False
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    parsed = _parse_line(line.rstrip(b"\n"))
+                    if parsed is not None:
+                        replaced = replaced or parsed[0] in entries
+                        entries[parsed[0]] = parsed[1]
+        except FileNotFoundError:
+            pass
+        return [entries, open(path, 'ab'), replaced]
+
+    @property
+    def folders(self):
+        """写过校验和的文件夹"""
+        return list(self._folders)
+
+    def close(self):
+        """关闭各清单，有重复或删除的文件名时重写为每个文件一行"""
+        with self._lock:
+            folders, self._folders = self._folders, {}
+            for folder, (entries, f, replaced) in folders.items():
+                f.close()
+                if replaced:
+                    path = os.path.join(folder, self.sums_name)
+                    tmp_path = path + ".tmp"
+                    with open(tmp_path, 'wb') as out:
+                        for name, digest in entries.items():
+                            prefix, escaped = _escape(name)
+                            out.write(prefix + digest.encode("ascii") + b"  " + escaped + b"\n")
+                    os.replace(tmp_path, path)
@@ -0,0 +1,329 @@
+# 作者：AleOsh
+# 命令行入口：python -m file_organizer 源文件夹 目标文件夹 -e jpg,png
+
+import argparse
+import re
+import signal
+import sys
+import threading
+import time
+
+from .archive import ARCHIVE_FORMATS
+from .checksum import CHECKSUM_ALGORITHMS
+from .copier import DEFAULT_CHUNK_SIZE
+from .dryrun import DryRunPlan
+from .engine import (OrganizeEngine, MODES, MODE_DIRECT,
+                     DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE)
+from .events import EVENT_LOG, EVENT_JOB
+from .logwriter import LogWriter, LEVELS, INFO, parse_level
+from .matcher import FileMatcher, parse_size, parse_time
+from .ordering import ORDERS, ORDER_SCAN
+from .procscan import DEFAULT_SCAN_PROCESSES
+from .transfer import TRANSFER_MODES, TRANSFER_COPY
+from .walker import DEFAULT_WALK_WORKERS
+from .watch import DEFAULT_SETTLE_SECONDS
+
+
+def parse_types(values):
+    """解析 -e 参数，支持逗号分隔和多次指定"""
+    types = []
+    for value in values:
+        for item in value.split(','):
+            item = item.strip()
+            if item and item not in types:
+                types.append(item)
+    return types
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m file_organizer",
+        description="查找指定文件夹中指定后缀名的文件，按后缀名复制到输出位置。"
+                    "不带参数运行时启动图形界面。")
+    parser.add_argument("source", nargs="?", help="源文件夹（使用 --run-plan 或 --jobs 时可省略）")
+    parser.add_argument("dest", nargs="?", help="输出文件夹（使用 --run-plan 或 --jobs 时可省略）")
+    parser.add_argument("-e", "--ext", action="append",
+                        metavar="EXT", help="文件类型，如 jpg,png；可多次指定")
+    parser.add_argument("-m", "--mode", choices=MODES, default=MODE_DIRECT,
+                        help="处理模式：direct 边搜索边复制，scan_first 先搜索后复制，"
+                             "pipeline 扫描与多线程复制并行")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"pipeline 模式的复制线程数（默认 {DEFAULT_WORKERS}）")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"pipeline 模式的待复制队列长度（默认 {DEFAULT_QUEUE_SIZE}）")
+    parser.add_argument("-t", "--transfer", choices=TRANSFER_MODES, default=TRANSFER_COPY,
+                        help="输出方式：copy 复制，move 移动（同一磁盘上只改名），hardlink 硬链接，"
+                             "reflink 写时复制；无法链接时自动改为复制")
+    parser.add_argument("--order", choices=ORDERS, default=ORDER_SCAN,
+                        help="scan_first 模式的复制顺序：scan 扫描顺序，inode 按 inode 号，"
+                             "extent 按数据在磁盘上的位置（FIEMAP），directory 逐个目录，"
+                             "small_first 小文件优先；机械硬盘上 extent / inode 可明显减少寻道")
+    parser.add_argument("--archive", choices=ARCHIVE_FORMATS,
+                        help="不复制成单独的文件，而是按扩展名文件夹写入输出文件夹下的一个归档"
+                             "（tar、tar.gz 或 zip），每个文件只读一次、顺序写入")
+    parser.add_argument("--volume-size", type=parse_size, metavar="SIZE",
+                        help="归档分卷大小，如 4G、700M；每卷（含归档结构）不超过这个大小，单个文件更大时单独成卷（默认不分卷）")
+    parser.add_argument("--checksum", choices=CHECKSUM_ALGORITHMS,
+                        help="复制时顺带计算校验和（不额外读取源文件），写入各扩展名文件夹的 "
+                             "SHA256SUMS / B2SUMS，可用 sha256sum -c / b2sum -c 检查")
+    parser.add_argument("--verify", action="store_true",
+                        help="复制后重新读出目标文件比较校验和，不一致时重新复制，仍失败时记为失败"
+                             "（未指定 --checksum 时用 sha256）")
+    parser.add_argument("--chunk-size", type=parse_size, default=DEFAULT_CHUNK_SIZE, metavar="SIZE",
+                        help="复制时每块的大小，如 1M、64M；块越小暂停和取消越及时（默认 8M）")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="结束时把运行统计（各阶段耗时、速度、最慢的文件等）写入 JSON 文件")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="用 cProfile 记录处理线程的性能数据并保存到 PATH（用 python -m pstats 查看）")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="演练：只列出将要复制的文件、目标文件名、各类型数量和大小并检查剩余空间，不写入任何文件")
+    parser.add_argument("--export-plan", action="append", default=[], metavar="PATH",
+                        help="把演练计划导出到 PATH，.csv 结尾为 CSV，否则为 JSON；可多次指定")
+    parser.add_argument("--run-plan", metavar="PLAN.json",
+                        help="按之前导出的 JSON 计划执行，不再扫描源文件夹")
+    parser.add_argument("--jobs", metavar="JOBS.json",
+                        help="批量运行任务列表（JSON 数组，每项含 source、dest、ext，可选 priority 和引擎参数），"
+                             "命令行上的其他选项作为各任务的默认值")
+    parser.add_argument("--per-device", type=int, default=1, metavar="N",
+                        help="--jobs 时每块磁盘上同时运行的任务数，不同磁盘上的任务并行（默认 1）")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="按内容去重：目标文件夹中已有相同内容的文件时不再复制")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量处理：在输出目录中记录清单，只复制新增或变化的文件，中断后可继续")
+    parser.add_argument("--watch", action="store_true",
+                        help="处理完已有文件后继续监视源文件夹，新文件写完后自动整理，Ctrl+C 停止")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS, metavar="SECONDS",
+                        help=f"监视模式下文件多久不再变化才算写完（默认 {DEFAULT_SETTLE_SECONDS} 秒）")
+    parser.add_argument("--walk-workers", type=int, default=DEFAULT_WALK_WORKERS,
+                        help="并行遍历目录的线程数，网络盘上可调大（默认 1，顺序与 os.walk 一致）")
+    parser.add_argument("--scan-processes", type=int, default=DEFAULT_SCAN_PROCESSES, metavar="N",
+                        help="scan_first 模式和演练时用 N 个进程按子目录树并行扫描，"
+                             "文件极多、匹配条件复杂时可加快扫描，结果与单进程相同（默认 1）")
+    parser.add_argument("--scan-archives", action="store_true",
+                        help="也查找源文件夹中 zip / tar 归档内的文件（只读目录，不解压），"
+                             "匹配的文件直接从归档中取出；归档索引缓存在输出文件夹中")
+    parser.add_argument("--dir-cache", action="store_true",
+                        help="在输出文件夹中缓存源文件夹的目录快照，再次扫描时修改时间没变的目录"
+                             "不再列出，适合反复整理变化不大的超大目录树")
+    parser.add_argument("--follow-symlinks", action="store_true",
+                        help="进入指向目录的符号链接（同一目录只遍历一次）")
+
+    filters = parser.add_argument_group("过滤条件（可选）")
+    filters.add_argument("--min-size", type=parse_size, metavar="SIZE",
+                         help="最小文件大小，如 100K、1.5M")
+    filters.add_argument("--max-size", type=parse_size, metavar="SIZE",
+                         help="最大文件大小，如 2G")
+    filters.add_argument("--newer-than", type=parse_time, metavar="TIME",
+                         help="只处理此时间之后修改的文件，如 2025-01-05")
+    filters.add_argument("--older-than", type=parse_time, metavar="TIME",
+                         help="只处理此时间之前修改的文件，如 \"2025-01-05 12:00:00\"")
+    filters.add_argument("--glob", action="append", metavar="PATTERN",
+                         help="文件名通配符，如 IMG_*；可多次指定，满足任一即可")
+    filters.add_argument("--exclude", action="append", metavar="PATTERN",
+                         help="排除匹配该通配符的文件名；可多次指定")
+    filters.add_argument("--regex", metavar="REGEX",
+                         help="文件名需包含该正则表达式的匹配")
+
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="不在终端输出日志")
+    parser.add_argument("--log-level", type=parse_level, default="debug",
+                        metavar="{" + ",".join(LEVELS) + "}",
+                        help="日志级别，info 及以上不再输出逐个文件的明细（默认 debug）")
+    parser.add_argument("--log-dir", metavar="DIR",
+                        help="同时把日志写入该目录，超过大小后自动压缩滚动")
+    return parser
+
+
+def build_matcher(parser, args, file_types):
+    """按命令行的过滤条件编译文件匹配器"""
+    try:
+        return FileMatcher(file_types,
+                           min_size=args.min_size, max_size=args.max_size,
+                           newer_than=args.newer_than, older_than=args.older_than,
+                           globs=args.glob, exclude_globs=args.exclude,
+                           regex=args.regex)
+    except (ValueError, re.error) as e:
+        parser.error(str(e))
+
+
+def engine_options(args):
+    """命令行参数中各任务共用的引擎参数"""
+    return {
+        "mode": args.mode, "transfer": args.transfer, "chunk_size": args.chunk_size,
+        "order": args.order, "archive": args.archive, "volume_size": args.volume_size,
+        "workers": args.workers, "queue_size": args.queue_size,
+        "walk_workers": args.walk_workers, "follow_symlinks": args.follow_symlinks,
+        "log_level": args.log_level, "dedupe": args.dedupe,
+        "incremental": args.incremental, "watch": args.watch,
+        "settle_seconds": args.settle, "scan_archives": args.scan_archives,
+        "scan_processes": args.scan_processes, "dir_cache": args.dir_cache,
+        "checksum": args.checksum, "verify": args.verify,
+    }
+
+
+def make_printer(args, log_writer):
+    """返回输出一条日志的函数：写日志文件，并在没有 -q 时打印到终端"""
+    # pipeline 模式和多任务时多个线程同时输出，加锁避免行交错
+    output_lock = threading.Lock()
+
+    def output(message, level):
+        if log_writer is not None:
+            log_writer.write(message, level)
+        if not args.quiet:
+            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+            with output_lock:
+                print(f"[{current_time}] {message}")
+    return output
+
+
+def handle_signals(stop):
+    """Ctrl+C / SIGTERM 时调用 stop()"""
+    def on_signal(signum, frame):
+        stop()
+    signal.signal(signal.SIGINT, on_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, on_signal)
+
+
+def main(argv=None):
+    """命令行主函数，返回退出码"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs:
+        return run_jobs(parser, args)
+    plan = None
+    if args.run_plan:
+        if args.dry_run:
+            parser.error("--run-plan 不能与 --dry-run 同时使用")
+        try:
+            plan = DryRunPlan.load(args.run_plan)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"无法读取计划文件: {e}")
+        args.source = args.source or plan.source
+        args.dest = args.dest or plan.dest
+        args.ext = args.ext or plan.file_types
+        args.transfer = plan.transfer
+        args.scan_archives = plan.scan_archives
+        args.archive = plan.archive
+        args.volume_size = plan.volume_size
+    elif args.source is None or args.dest is None or not args.ext:
+        parser.error("需要指定源文件夹、输出文件夹和 -e 文件类型，或用 --jobs 指定任务列表")
+    if args.export_plan and not args.dry_run:
+        parser.error("--export-plan 需要与 --dry-run 一起使用")
+    if args.volume_size is not None and args.archive is None:
+        parser.error("--volume-size 需要与 --archive 一起使用")
+    file_types = parse_types(args.ext)
+    matcher = build_matcher(parser, args, file_types)
+    # 参数全部检查完（包括引擎的检查）再打开日志，parser.error 退出时不会留下日志线程
+    try:
+        engine = OrganizeEngine(args.source, args.dest, file_types,
+                                matcher=matcher, metrics_path=args.metrics_json,
+                                profile_path=args.profile, dry_run=args.dry_run, plan=plan,
+                                plan_exports=args.export_plan, **engine_options(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    log_writer = None
+    if args.log_dir:
+        log_writer = LogWriter(args.log_dir, level=args.log_level)
+        log_writer.open()
+    output = make_printer(args, log_writer)
+
+    def on_event(event):
+        if event.kind == EVENT_LOG:
+            output(event.data['message'], event.data['level'])
+
+    engine.on_event = on_event
+
+    # Ctrl+C / SIGTERM 时立即停止，复制到一半的文件会被删除
+    handle_signals(engine.stop)
+
+    try:
+        summary = engine.run()
+    finally:
+        if log_writer is not None:
+            log_writer.close()
+    if summary["cancelled"]:
+        return 130
+    if summary["error"] or summary["failed"]:
+        return 1
+    if engine.dry_run_plan is not None and not engine.dry_run_plan.fits:
+        return 1
+    return 0
+
+
+def load_jobs(path):
+    """读取任务列表 JSON
+
+    格式为 [{"source": ..., "dest": ..., "ext": "jpg,png", "priority": 0, ...}, ...]，
+    其他键作为该任务的引擎参数（如 "mode"、"transfer"、"dedupe"），覆盖命令行上的设置。
+    """
+    import json
+    with open(path, encoding='utf-8') as f:
+        jobs = json.load(f)
+    if not isinstance(jobs, list):
+        raise ValueError("任务列表应为 JSON 数组")
+    for job in jobs:
+        if not isinstance(job, dict) or not {"source", "dest", "ext"} <= set(job):
+            raise ValueError("每个任务都需要 source、dest 和 ext")
+    return jobs
+
+
+def run_jobs(parser, args):
+    """按任务列表运行多个任务：按优先级排队，同一块磁盘上的任务数受 --per-device 限制"""
+    from .scheduler import JobScheduler, JOB_STATUS_LABELS, JOB_CANCELLED, JOB_FAILED
+
+    if args.source or args.dest or args.run_plan or args.dry_run:
+        parser.error("--jobs 不能与源文件夹、输出文件夹、--run-plan 或 --dry-run 同时使用")
+    try:
+        jobs = load_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        parser.error(f"无法读取任务列表: {e}")
+
+    log_writer = None
+    if args.log_dir:
+        log_writer = LogWriter(args.log_dir, level=args.log_level)
+        log_writer.open()
+    output = make_printer(args, log_writer)
+
+    def on_event(job, event):
+        if event.kind == EVENT_LOG:
+            output(f"[任务 {job.id}] {event.data['message']}", event.data['level'])
+        elif event.kind == EVENT_JOB:
+            output(f"[任务 {job.id}] {job.name}: {JOB_STATUS_LABELS[event.data['status']]}", INFO)
+
+    # 全部提交后再开始调度，优先级在整批任务中生效
+    scheduler = JobScheduler(per_device=args.per_device, on_event=on_event, autostart=False)
+    try:
+        for spec in jobs:
+            spec = dict(spec)
+            options = engine_options(args)
+            ext = spec.pop("ext")
+            file_types = parse_types(ext if isinstance(ext, list) else [ext])
+            source, dest = spec.pop("source"), spec.pop("dest")
+            priority, name = spec.pop("priority", 0), spec.pop("name", None)
+            options.update(spec)
+            options.setdefault("matcher", build_matcher(parser, args, file_types))
+            try:
+                scheduler.submit(source, dest, file_types, priority=priority, name=name, **options)
+            except (TypeError, ValueError) as e:
+                scheduler.shutdown(cancel=True)
+                parser.error(f"任务 {source} 参数有误: {e}")
+
+        handle_signals(lambda: scheduler.shutdown(cancel=True, wait=False))
+        scheduler.start()
+        scheduler.wait()
+    finally:
+        if log_writer is not None:
+            log_writer.close()
+
+    statuses = [job.status for job in scheduler.jobs()]
+    if JOB_CANCELLED in statuses:
+        return 130
+    if JOB_FAILED in statuses:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# 作者：AleOsh
+# 暂停与取消控制：基于 threading.Event，扫描线程和所有复制线程共享同一个对象
+
+import threading
+
+
+class RunControl:
+    """线程安全的暂停、取消开关
+
+    暂停时 wait() 阻塞在 Event 上，不占用 CPU；cancel() 立即唤醒所有等待
+    中的线程。复制线程每复制一块调用一次 wait()，取消在当前块写完后生效。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumed = threading.Event()     # 置位表示没有暂停
+        self._cancelled = threading.Event()
+        self._resumed.set()
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        """暂停；已取消时不再暂停，避免等待的线程永远醒不过来"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._resumed.clear()
+
+    def resume(self):
+        """继续"""
+        self._resumed.set()
+
+    def cancel(self):
+        """取消，并唤醒暂停中的线程让它们退出"""
+        with self._lock:
+            self._cancelled.set()
+            self._resumed.set()
+
+    def reset(self):
+        """清除暂停和取消状态，供同一个引擎再次运行"""
+        with self._lock:
+            self._cancelled.clear()
+            self._resumed.set()
+
+    def wait(self):
+        """暂停时阻塞到继续或取消，返回是否仍应继续处理"""
+        self._resumed.wait()
+        return not self._cancelled.is_set()
+
+    def sleep(self, seconds):
+        """最多等待 seconds 秒，被取消时立即返回；返回是否仍应继续处理"""
+        return not self._cancelled.wait(seconds)
@@ -0,0 +1,207 @@
+# 作者：AleOsh
+# 分块复制：优先让内核直接复制（copy_file_range / sendfile），每块之间报告进度并检查暂停、取消
+
+import errno
+import os
+import shutil
+import sys
+import time
+from collections import deque
+
+# 每块大小：越大系统调用越少，越小暂停、取消和进度越及时
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+# 覆盖已有文件时先写入的临时文件后缀
+PARTIAL_SUFFIX = ".partial"
+
+# 内核不支持或文件系统不支持时返回的错误，遇到后换下一种方法
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                errno.ENOTSUP, errno.EBADF, errno.EPERM}
+
+
+class CopyCancelled(Exception):
+    """复制在两个块之间被取消"""
+
+
+def partial_path(dst):
+    """覆盖已有文件时先写入的临时文件，写完后再用 os.replace 换上"""
+    return dst + PARTIAL_SUFFIX
+
+
+def write_target(dst):
+    """实际要打开写入的路径
+
+    dst 已存在时（增量处理覆盖上次的副本）不能原地截断：它可能是源文件的
+    硬链接，截断后源文件的内容也没了；另外写到一半失败时上次的副本也会
+    丢失。这时先写到 partial_path(dst)，完成后再替换。
+    """
+    return partial_path(dst) if os.path.lexists(dst) else dst
+
+
+def finish_target(target, dst):
+    """write_target() 的文件写完后换到 dst"""
+    if target != dst:
+        os.replace(target, dst)
+
+
+def _copy_range(infd, outfd, offset, count):
+    # 不指定偏移时使用并推进两个文件的当前位置
+    return os.copy_file_range(infd, outfd, count)
+
+
+def _sendfile(infd, outfd, offset, count):
+    return os.sendfile(outfd, infd, offset, count)
+
+
+def _read_write(infd, outfd, offset, count):
+    data = os.pread(infd, count, offset) if hasattr(os, "pread") else _read_at(infd, offset, count)
+    view = memoryview(data)
+    while view:
+        written = os.write(outfd, view)
+        view = view[written:]
+    return len(data)
+
+
+def _read_at(infd, offset, count):
+    os.lseek(infd, offset, os.SEEK_SET)
+    return os.read(infd, count)
+
+
+def _strategies():
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(_copy_range)
+    # 只有 Linux 的 sendfile 支持输出到普通文件
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        methods.append(_sendfile)
+    methods.append(_read_write)
+    return methods
+
+
+_STRATEGIES = _strategies()
+
+
+def copy_file(src, dst, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None, should_continue=None,
+              hasher=None, sync=False):
+    """分块复制文件内容和元数据（相当于 shutil.copy2），返回复制的字节数
+
+    每复制一块调用 on_progress(本块字节数)；每块开始前调用 should_continue()，
+    返回 False 时删除未完成的目标文件并抛出 CopyCancelled。给出 hasher
+    （hashlib 对象）时边复制边计算校验和。sync=True 时关闭前把目标文件
+    写入磁盘（之后要重新读出校验）。dst 已存在时见 write_target()。
+    """
+    target = write_target(dst)
+    with open(src, 'rb') as fsrc:
+        try:
+            with open(target, 'wb') as fdst:
+                if hasher is None:
+                    copied = _copy_fds(fsrc.fileno(), fdst.fileno(), chunk_size,
+                                       on_progress, should_continue)
+                else:
+                    copied = _copy_hashed(fsrc.fileno(), fdst.fileno(), chunk_size, hasher,
+                                          on_progress, should_continue)
+                if sync:
+                    os.fsync(fdst.fileno())
+            shutil.copystat(src, target)
+            finish_target(target, dst)
+        except BaseException:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
+    return copied
+
+
+def copy_stream(fsrc, dst, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None, should_continue=None,
+                hasher=None, sync=False):
+    """把已打开的文件对象（如归档内的文件）分块写到 dst，返回写入的字节数
+
+    进度、取消、hasher 和 sync 与 copy_file 相同；失败或取消时删除未完成的目标文件。
+    """
+    target = write_target(dst)
+    copied = 0
+    try:
+        with open(target, 'wb') as fdst:
+            while True:
+                if should_continue is not None and not should_continue():
+                    raise CopyCancelled()
+                data = fsrc.read(chunk_size)
+                if not data:
+                    break
+                if hasher is not None:
+                    hasher.update(data)
+                fdst.write(data)
+                copied += len(data)
+                if on_progress is not None:
+                    on_progress(len(data))
+            if sync:
+                fdst.flush()
+                os.fsync(fdst.fileno())
+        finish_target(target, dst)
+        return copied
+    except BaseException:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_fds(infd, outfd, chunk_size, on_progress, should_continue):
+    strategies = list(_STRATEGIES)
+    copy_chunk = strategies.pop(0)
+    offset = 0
+    while True:
+        if should_continue is not None and not should_continue():
+            raise CopyCancelled()
+        try:
+            n = copy_chunk(infd, outfd, offset, chunk_size)
+        except OSError as e:
+            # 只在还没写出任何内容时换方法，避免两种方法的文件位置不一致
+            if offset == 0 and strategies and e.errno in _UNSUPPORTED:
+                copy_chunk = strategies.pop(0)
+                continue
+            raise
+        if not n:
+            return offset
+        offset += n
+        if on_progress is not None:
+            on_progress(n)
+
+
+def _copy_hashed(infd, outfd, chunk_size, hasher, on_progress, should_continue):
+    # 内核内复制的数据不经过用户态，要算校验和只能自己读写：每块读一次、算一次、写一次
+    copied = 0
+    while True:
+        if should_continue is not None and not should_continue():
+            raise CopyCancelled()
+        data = os.read(infd, chunk_size)
+        if not data:
+            return copied
+        hasher.update(data)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(outfd, view):]
+        copied += len(data)
+        if on_progress is not None:
+            on_progress(len(data))
+
+
+class ThroughputMeter:
+    """最近 window 秒内的平均速度，暂停期间速度会自然降到 0"""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self._samples = deque()
+
+    def update(self, done, now=None):
+        """记录当前已完成量，返回每秒速度"""
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+        start, start_done = self._samples[0]
+        if now <= start:
+            return 0.0
+        return (done - start_done) / (now - start)
+
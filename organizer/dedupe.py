@@ -0,0 +1,241 @@
+# 作者：AleOsh
+# 按内容去重：先比大小，再比首尾块哈希，最后才比全文哈希；哈希结果持久缓存
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+# 首尾块大小，以及计算全文哈希时每次读取的大小
+BLOCK_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+HASH_CACHE_NAME = "hash_cache.db"
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+def quick_hash(path, size):
+    """文件首块 + 尾块的哈希；小文件即为全文哈希"""
+    h = _new_hash()
+    with open(path, 'rb') as f:
+        h.update(f.read(BLOCK_SIZE))
+        if size > 2 * BLOCK_SIZE:
+            f.seek(-BLOCK_SIZE, os.SEEK_END)
+            h.update(f.read(BLOCK_SIZE))
+        elif size > BLOCK_SIZE:
+            h.update(f.read())
+    return h.digest()
+
+
+def full_hash(path):
+    """全文哈希"""
+    h = _new_hash()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+class HashCache:
+    """哈希结果的磁盘缓存，以 (路径, 大小, 修改时间, inode) 判断文件是否变化"""
+
+    def __init__(self, db_path, commit_every=500):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER,"
+            " quick BLOB, full BLOB)")
+        self._conn.commit()
+
+    def get(self, path, st):
+        """返回 (首尾块哈希, 全文哈希)，缓存不存在或文件已变化时为 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, quick, full FROM hashes WHERE path = ?",
+                (path,)).fetchone()
+        if row is None or tuple(row[:3]) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None, None
+        return row[3], row[4]
+
+    def put(self, path, st, quick, full):
+        """保存文件的哈希"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, inode, quick, full)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, st.st_ino, quick, full))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class _Candidate:
+    """参与比较的一个文件：read_path 是读取内容的位置，dest 是它在输出目录中的路径"""
+
+    __slots__ = ("read_path", "dest", "st", "quick", "full")
+
+    def __init__(self, read_path, dest, st):
+        self.read_path = read_path
+        self.dest = dest
+        self.st = st
+        self.quick = None
+        self.full = None
+
+
+class Deduper:
+    """输出目录内容索引，判断待复制的文件是否已有相同内容的副本
+
+    每个扩展名文件夹第一次用到时按文件大小建立索引。待复制文件只有在同一
+    文件夹中存在相同大小的文件时才读首尾块，首尾块也相同才读全文。刚分配
+    了目标路径的文件以源文件身份加入索引，同一批源文件之间也能去重。
+    """
+
+    def __init__(self, layout, cache=None, stripes=64):
+        self.layout = layout
+        self.cache = cache
+        self._indexes = {}      # 文件夹 -> {大小: [_Candidate]}
+        self._index_lock = threading.Lock()
+        # 按 (文件夹, 大小) 分段加锁：同样大小的文件串行比较，不同大小互不影响
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._claimed = {}      # 目标路径 -> (索引, 大小, _Candidate)，复制完成前保留
+
+    def _index(self, folder):
+        with self._index_lock:
+            index = self._indexes.get(folder)
+            if index is None:
+                index = {}
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                st = entry.stat()
+                                index.setdefault(st.st_size, []).append(
+                                    _Candidate(entry.path, entry.path, st))
+                        except OSError:
+                            pass
+                self._indexes[folder] = index
+            return index
+
+    def _quick(self, candidate):
+        if candidate.quick is None:
+            if self.cache is not None:
+                candidate.quick, candidate.full = self.cache.get(candidate.read_path, candidate.st)
+            if candidate.quick is None:
+                candidate.quick = quick_hash(candidate.read_path, candidate.st.st_size)
+                # 不超过两个块的文件，首尾块哈希就是全文哈希
+                if candidate.st.st_size <= 2 * BLOCK_SIZE:
+                    candidate.full = candidate.quick
+                self._save(candidate)
+        return candidate.quick
+
+    def _full(self, candidate):
+        self._quick(candidate)
+        if candidate.full is None:
+            candidate.full = full_hash(candidate.read_path)
+            self._save(candidate)
+        return candidate.full
+
+    def _save(self, candidate):
+        if self.cache is not None:
+            self.cache.put(candidate.read_path, candidate.st, candidate.quick, candidate.full)
+
+    def _same(self, a, b):
+        if self._quick(a) != self._quick(b):
+            return False
+        return self._full(a) == self._full(b)
+
+    def claim(self, src_path, file_ext, allocate):
+        """检查 src_path 是否已有相同内容的副本
+
+        有则返回 (已有副本路径, None)；没有则调用 allocate() 分配目标路径并
+        登记，返回 (None, 目标路径)，复制结束后需调用 done()。
+        """
+        folder = self.layout.folder(file_ext)
+        index = self._index(folder)
+        st = os.stat(src_path)
+        source = _Candidate(src_path, None, st)
+
+        stripe = self._stripes[hash((folder, st.st_size)) % len(self._stripes)]
+        with stripe:
+            for other in index.get(st.st_size, ()):
+                try:
+                    if self._same(source, other):
+                        return other.dest, None
+                except OSError:
+                    # 已有文件读不了就不算重复
+                    continue
+
+            source.dest = allocate()
+            index.setdefault(st.st_size, []).append(source)
+            with self._index_lock:
+                self._claimed[source.dest] = (index, st.st_size, source)
+            return None, source.dest
+
+    def done(self, dst_path, ok):
+        """复制结束；失败时把该文件从索引中移除"""
+        with self._index_lock:
+            claimed = self._claimed.pop(dst_path, None)
+        if claimed is None:
+            return
+        index, size, candidate = claimed
+        if ok:
+            # 之后改从副本读取内容（移动模式下源文件已不存在）；
+            # 副本内容与源文件相同，已算出的哈希直接记到副本名下，下次运行不必再读
+            try:
+                st = os.stat(dst_path)
+            except OSError:
+                return
+            with self._stripes[hash((os.path.dirname(dst_path), size)) % len(self._stripes)]:
+                candidate.read_path = dst_path
+                candidate.st = st
+            if self.cache is not None and candidate.quick is not None:
+                self.cache.put(dst_path, st, candidate.quick, candidate.full)
+            return
+        stripe = self._stripes[hash((os.path.dirname(dst_path), size)) % len(self._stripes)]
+        with stripe:
+            try:
+                index[size].remove(candidate)
+            except (KeyError, ValueError):
+                pass
+
+    def replaced(self, dst_path, old_size):
+        """dst_path 的内容被改写了（增量处理覆盖上次的副本）
+
+        索引中这个文件原来按 old_size 登记，已算出的哈希是旧内容的；去掉
+        旧的登记，按新的大小重新加入，哈希到需要时再算。
+        """
+        folder = os.path.dirname(dst_path)
+        with self._index_lock:
+            index = self._indexes.get(folder)
+        if index is None:
+            # 这个文件夹还没建立索引，之后建立时读到的就是新内容
+            return
+        with self._stripes[hash((folder, old_size)) % len(self._stripes)]:
+            candidates = index.get(old_size, [])
+            for candidate in candidates:
+                if candidate.dest == dst_path:
+                    candidates.remove(candidate)
+                    break
+        try:
+            st = os.stat(dst_path)
+        except OSError:
+            return
+        with self._stripes[hash((folder, st.st_size)) % len(self._stripes)]:
+            index.setdefault(st.st_size, []).append(_Candidate(dst_path, dst_path, st))
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
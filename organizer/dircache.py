@@ -0,0 +1,167 @@
+# 作者：AleOsh
+# 目录快照缓存：记录每个目录的修改时间、inode、子目录和按文件名匹配到的文件，
+# 下次扫描时修改时间没变的目录直接用缓存，不再列出（与 git 的 untracked cache 相同的思路）
+#
+# 在目录中新建、删除、改名文件或子目录都会改变该目录的修改时间；只修改文件内容
+# 不会，所以缓存的文件大小和修改时间可能过期。需要准确的 stat 时（增量清单、
+# 按大小或时间过滤），用 fresh_stat=True 让缓存的文件在 stat() 时重新读取。
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.request import pathname2url
+
+DIR_CACHE_NAME = "dir_cache.db"
+# 修改时间离扫描时刻不到这么久的目录不缓存：同一时间刻度内的后续修改看不出来
+RACY_NS = 2 * 10**9
+# 每写入这么多个目录提交一次
+COMMIT_EVERY = 1000
+
+
+class CachedStat(namedtuple("CachedStat", "st_size st_mtime_ns st_ino")):
+    """缓存的文件 stat 结果，只有过滤条件、清单和扫描计划用到的字段"""
+
+    __slots__ = ()
+
+    @property
+    def st_mtime(self):
+        return self.st_mtime_ns / 1e9
+
+
+class CachedEntry:
+    """缓存中的文件，提供扫描用到的 DirEntry 接口：name、path、stat()、inode()"""
+
+    __slots__ = ("name", "path", "_stat", "_inode")
+
+    def __init__(self, dir_path, name, st, inode):
+        self.name = name
+        self.path = os.path.join(dir_path, name)
+        self._stat = st
+        self._inode = inode
+
+    def stat(self, *, follow_symlinks=True):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def inode(self):
+        return self._inode
+
+    def __repr__(self):
+        return f"<CachedEntry {self.name!r}>"
+
+
+class DirCache:
+    """目录快照缓存
+
+    key 描述只按文件名判断的匹配条件，条件变化后旧的快照全部失效；
+    is_candidate(文件名) 为真的文件才记入快照。readonly=True 时以只读
+    方式打开已有的缓存（演练时使用），不写入。
+    """
+
+    def __init__(self, db_path, key, is_candidate, fresh_stat=False, readonly=False):
+        self.key = key
+        self.is_candidate = is_candidate
+        self.fresh_stat = fresh_stat
+        self.readonly = readonly
+        self.hits = 0            # 直接使用缓存的目录数
+        self.misses = 0          # 重新列出的目录数
+        self._lock = threading.Lock()
+        self._pending = 0
+        if readonly:
+            self._conn = sqlite3.connect(
+                f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro&immutable=1",
+                uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                " path BLOB PRIMARY KEY, mtime_ns INTEGER, ino INTEGER,"
+                " key TEXT, data TEXT)")
+            self._conn.commit()
+
+    def lookup(self, path):
+        """返回 (目录的 stat 结果, 快照)；目录变化或没有快照时快照为 None
+
+        快照为 (CachedEntry 列表, [(子目录名, 是否符号链接, (设备号, inode) 或 None)])。
+        stat 失败时返回 (None, None)。
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None
+        with self._lock:
+            row = self._conn.execute("SELECT mtime_ns, ino, key, data FROM dirs WHERE path = ?",
+                                     (os.fsencode(path),)).fetchone()
+            if row is None or row[0] != st.st_mtime_ns or row[1] != st.st_ino \
+                    or row[2] != self.key:
+                self.misses += 1
+                return st, None
+            self.hits += 1
+        children, files = json.loads(row[3])
+        entries = [CachedEntry(path, name,
+                               None if self.fresh_stat else CachedStat(size, mtime_ns, inode),
+                               inode)
+                   for name, size, mtime_ns, inode in files]
+        return st, (entries, [(name, symlink, tuple(key) if key else None)
+                              for name, symlink, key in children])
+
+    def store(self, path, st, files, children):
+        """保存刚列出的目录
+
+        files 为目录中文件的 DirEntry 列表，children 为 lookup() 格式的子目录列表。
+        目录刚修改过，或候选文件 stat 失败时只删除已经不存在的子目录的快照。
+        """
+        if self.readonly or st is None:
+            return
+        data = None
+        if time.time_ns() - st.st_mtime_ns >= RACY_NS:
+            records = []
+            for entry in files:
+                if not self.is_candidate(entry.name):
+                    continue
+                try:
+                    est = entry.stat()
+                    records.append((entry.name, est.st_size, est.st_mtime_ns, entry.inode()))
+                except OSError:
+                    break
+            else:
+                data = json.dumps([children, records])
+        key = os.fsencode(path)
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM dirs WHERE path = ?", (key,)).fetchone()
+            if row is not None:
+                # 已经不存在的子目录，连同其下所有目录的快照一起删除
+                names = {name for name, _symlink, _key in children}
+                for name, _symlink, _key in json.loads(row[0])[0]:
+                    if name not in names:
+                        self._forget(os.fsencode(os.path.join(path, name)))
+            if data is None:
+                self._conn.execute("DELETE FROM dirs WHERE path = ?", (key,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, mtime_ns, ino, key, data)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, st.st_mtime_ns, st.st_ino, self.key, data))
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def _forget(self, key):
+        prefix = key + os.fsencode(os.sep)
+        # 以 prefix 开头的 BLOB 恰好在 [prefix, prefix 最后一个字节加一) 之间
+        upper = prefix[:-1] + bytes([prefix[-1] + 1])
+        self._conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                           (key, prefix, upper))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                if not self.readonly:
+                    self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,139 @@
+# 作者：AleOsh
+# 演练计划：只扫描并分配目标文件名，统计各扩展名的数量和大小、检查目标磁盘剩余空间；
+# 计划可导出为 CSV / JSON，之后按 JSON 计划直接执行，不必重新扫描
+
+import os
+import shutil
+import time
+
+from .transfer import TRANSFER_COPY
+
+PLAN_VERSION = 1
+# 拿不到文件系统块大小时按 4 KiB 估算
+DEFAULT_BLOCK_SIZE = 4096
+
+
+def block_size(path):
+    """path 所在文件系统的分配单位"""
+    try:
+        return os.statvfs(path).f_frsize or DEFAULT_BLOCK_SIZE
+    except (OSError, AttributeError):
+        return DEFAULT_BLOCK_SIZE
+
+
+class DryRunPlan:
+    """演练得到的执行计划
+
+    entries 按复制顺序保存 (源路径, 目标路径, 扩展名, 大小)，目标路径中的
+    _N 已按输出目录中现有的文件解析好；by_ext 为 {扩展名: [文件数, 字节数]}。
+    required_bytes 按目标文件系统的块大小向上取整，移动和硬链接到同一磁盘
+    的文件不占新空间，不计入。scan_archives 为真时源路径可能是源文件夹中
+    归档内的文件，执行时需要同样打开归档读取。输出到归档（archive 为归档
+    格式）时目标路径是 archive_root 下的虚拟路径，执行时换到新归档的名字下。
+    """
+
+    def __init__(self, source, dest, file_types, transfer=TRANSFER_COPY, created=None,
+                 scan_archives=False, archive=None, volume_size=None, archive_root=None):
+        self.source = source
+        self.dest = dest
+        self.file_types = list(file_types)
+        self.transfer = transfer
+        self.scan_archives = scan_archives
+        self.archive = archive
+        self.volume_size = volume_size
+        self.archive_root = archive_root
+        self.created = created or time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.entries = []
+        self.by_ext = {}
+        self.total_bytes = 0
+        self.required_bytes = 0
+        self.free_bytes = None
+        self._block = block_size(dest)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, src, dst, file_ext, size, needs_space=True):
+        """追加一个文件；needs_space 为假表示不会占用目标磁盘的新空间"""
+        self.entries.append((src, dst, file_ext, size))
+        stats = self.by_ext.setdefault(file_ext, [0, 0])
+        stats[0] += 1
+        stats[1] += size
+        self.total_bytes += size
+        if needs_space:
+            self.required_bytes += -(-size // self._block) * self._block
+
+    @property
+    def fits(self):
+        """目标磁盘空间是否够用（还没检查时视为够用）"""
+        return self.free_bytes is None or self.required_bytes <= self.free_bytes
+
+    def check_space(self):
+        """读取目标磁盘当前的剩余空间，返回是否够用"""
+        self.free_bytes = shutil.disk_usage(self.dest).free
+        return self.fits
+
+    def write_csv(self, path):
+        """导出为 CSV：源路径、目标路径、扩展名、大小，便于用表格软件查看"""
+        import csv
+        _make_parent(path)
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["source", "dest", "ext", "size"])
+            writer.writerows(self.entries)
+
+    def write_json(self, path):
+        """导出为 JSON，可用 load() 读回后执行"""
+        import json
+        _make_parent(path)
+        data = {
+            "version": PLAN_VERSION,
+            "created": self.created,
+            "source": self.source,
+            "dest": self.dest,
+            "file_types": self.file_types,
+            "transfer": self.transfer,
+            "scan_archives": self.scan_archives,
+            "archive": self.archive,
+            "volume_size": self.volume_size,
+            "archive_root": self.archive_root,
+            "files": len(self.entries),
+            "total_bytes": self.total_bytes,
+            "required_bytes": self.required_bytes,
+            "free_bytes": self.free_bytes,
+            "by_ext": self.by_ext,
+            "entries": self.entries,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def export(self, path):
+        """按扩展名选择格式导出：.csv 为 CSV，其他为 JSON"""
+        if path.lower().endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
+
+    @classmethod
+    def load(cls, path):
+        """读取 write_json() 导出的计划"""
+        import json
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"不支持的计划文件版本: {data.get('version')}")
+        plan = cls(data["source"], data["dest"], data["file_types"],
+                   data.get("transfer", TRANSFER_COPY), created=data.get("created"),
+                   scan_archives=data.get("scan_archives", False),
+                   archive=data.get("archive"), volume_size=data.get("volume_size"),
+                   archive_root=data.get("archive_root"))
+        # 执行时目标磁盘的块大小与剩余空间可能已经不同，所需空间按记录值
+        plan.entries = [tuple(entry) for entry in data["entries"]]
+        plan.by_ext = data["by_ext"]
+        plan.total_bytes = data["total_bytes"]
+        plan.required_bytes = data["required_bytes"]
+        return plan
+
+
+def _make_parent(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
@@ -0,0 +1,1342 @@
+# 作者：AleOsh
+# 文件整理核心引擎：不依赖 Tk，GUI 与命令行共用
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from queue import Queue
+
+from .control import RunControl
+from .copier import copy_file, copy_stream, CopyCancelled, ThroughputMeter, DEFAULT_CHUNK_SIZE
+from .events import (EngineEvent, EVENT_LOG, EVENT_PROGRESS, EVENT_STATUS,
+                     EVENT_METRICS, EVENT_FINISHED)
+from .layout import DestinationLayout, state_path, STATE_DIR_NAME
+from .logwriter import DEBUG, INFO, ERROR
+from .matcher import FileMatcher
+from .metrics import (RunMetrics, STAGE_MATCH, STAGE_ALLOCATE, STAGE_DEDUPE,
+                      STAGE_LOG, STAGE_WALK)
+from .ordering import order_files, ORDER_SCAN, ORDERS
+from .plan import ScanPlan, DEFAULT_SPILL_BYTES
+from .procscan import DEFAULT_SCAN_PROCESSES
+from .transfer import (transfer_file, TRANSFER_COPY, TRANSFER_MOVE, TRANSFER_HARDLINK,
+                       TRANSFER_MODES, METHOD_LABELS, METHOD_ARCHIVE, METHOD_EXTRACT,
+                       METHOD_RENAME, METHOD_LINK, METHOD_REFLINK)
+from .units import format_size
+from .walker import TreeWalker, DEFAULT_WALK_WORKERS
+from .watch import (Debouncer, start_watcher,
+                    DEFAULT_SETTLE_SECONDS, DEFAULT_POLL_INTERVAL)
+
+# 处理模式
+MODE_DIRECT = "direct"
+MODE_SCAN_FIRST = "scan_first"
+MODE_PIPELINE = "pipeline"
+MODES = (MODE_DIRECT, MODE_SCAN_FIRST, MODE_PIPELINE)
+
+# 流水线模式默认参数：复制线程数与待复制队列长度
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+DEFAULT_QUEUE_SIZE = 1024
+
+# 进度事件最短间隔（秒），大文件逐块复制时避免事件过多
+PROGRESS_INTERVAL = 0.05
+# 运行统计事件间隔（秒）
+METRICS_INTERVAL = 1.0
+
+
+class OrganizeEngine:
+    """按扩展名查找文件并复制到目标文件夹的引擎
+
+    引擎本身不做任何界面操作，所有输出都通过 on_event 回调以 EngineEvent
+    的形式发出，回调在工作线程中被调用。暂停和取消通过 control（RunControl）
+    通知扫描线程和所有复制线程。
+    """
+
+    def __init__(self, source, dest, file_types, mode=MODE_DIRECT, on_event=None,
+                 workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 walk_workers=DEFAULT_WALK_WORKERS, follow_symlinks=False,
+                 matcher=None, log_level=DEBUG, dedupe=False, incremental=False,
+                 watch=False, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, transfer=TRANSFER_COPY,
+                 chunk_size=DEFAULT_CHUNK_SIZE, spill_bytes=DEFAULT_SPILL_BYTES,
+                 metrics_path=None, profile_path=None, control=None,
+                 dry_run=False, plan=None, plan_exports=(), order=ORDER_SCAN,
+                 archive=None, volume_size=None, scan_archives=False,
+                 scan_processes=DEFAULT_SCAN_PROCESSES, dir_cache=False,
+                 checksum=None, verify=False):
+        if mode not in MODES:
+            raise ValueError(f"未知的处理模式: {mode}")
+        if transfer not in TRANSFER_MODES:
+            raise ValueError(f"未知的输出方式: {transfer}")
+        if order not in ORDERS:
+            raise ValueError(f"未知的复制顺序: {order}")
+        if workers < 1:
+            raise ValueError("复制线程数必须大于 0")
+        if chunk_size < 1:
+            raise ValueError("复制块大小必须大于 0")
+        if scan_processes < 1:
+            raise ValueError("扫描进程数必须大于 0")
+        if archive is not None:
+            from .archive import ARCHIVE_FORMATS
+            if archive not in ARCHIVE_FORMATS:
+                raise ValueError(f"未知的归档格式: {archive}")
+            if transfer != TRANSFER_COPY:
+                raise ValueError("输出到归档时只能使用复制方式")
+            if dedupe:
+                raise ValueError("输出到归档时不支持重复文件检查")
+        if volume_size is not None and volume_size < 1:
+            raise ValueError("分卷大小必须大于 0")
+        if plan is not None and (plan.archive is None) != (archive is None):
+            raise ValueError("按计划执行时是否输出到归档需要与演练时相同")
+        if verify and checksum is None:
+            from .checksum import DEFAULT_CHECKSUM
+            checksum = DEFAULT_CHECKSUM
+        if checksum is not None:
+            from .checksum import CHECKSUM_ALGORITHMS
+            if checksum not in CHECKSUM_ALGORITHMS:
+                raise ValueError(f"未知的校验算法: {checksum}")
+            if archive is not None:
+                raise ValueError("输出到归档时不支持校验和")
+        self.source = source
+        self.dest = dest
+        self.file_types = list(file_types)
+        # 文件类型与过滤条件只编译一次
+        self.matcher = matcher if matcher is not None else FileMatcher(self.file_types)
+        self.mode = mode
+        self.transfer = transfer
+        self.chunk_size = chunk_size
+        self.spill_bytes = spill_bytes
+        # 先搜索后复制（及演练）时的复制顺序，见 ordering.py
+        self.order = order
+        # 结束时保存运行统计 JSON、cProfile 结果的位置，None 表示不保存
+        self.metrics_path = metrics_path
+        self.profile_path = profile_path
+        # 演练：只生成计划（结果在 dry_run_plan 中，并导出到 plan_exports 中的每个路径）；
+        # 给出 plan（DryRunPlan）时按计划执行，不再扫描
+        self.dry_run = dry_run
+        self.plan = plan
+        self.plan_exports = list(plan_exports)
+        self.dry_run_plan = None
+        # 归档输出：匹配的文件写入 dest 下的 tar / tar.gz / zip 归档（见 archive.py），
+        # 按 volume_size 字节分卷；None 表示照常复制到扩展名文件夹
+        self.archive = archive
+        self.volume_size = volume_size
+        self.archive_writer = None
+        # 扫描源文件夹中 zip / tar 归档内的文件（见 packed.py），匹配的文件从归档中直接读出
+        self.scan_archives = scan_archives
+        self.packed_index = None
+        self.on_event = on_event
+        self.log_level = log_level
+        self.workers = workers
+        self.queue_size = queue_size
+        self.dedupe = dedupe
+        self.incremental = incremental
+        self.watch = watch
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.walk_workers = walk_workers
+        self.follow_symlinks = follow_symlinks
+        # 先搜索后复制（及演练）时用多少个进程扫描，见 procscan.py
+        self.scan_processes = scan_processes
+        # 目录快照缓存（见 dircache.py）：修改时间没变的目录不再列出
+        self.dir_cache = dir_cache
+        self.dir_snapshot = None
+        # 复制时计算校验和（算法名，见 checksum.py），写入各扩展名文件夹的清单；
+        # verify 为真时还要重新读出目标文件比较，不一致时重新复制
+        self.checksum = checksum
+        self.verify = verify
+        self.checksums = None
+
+        # 多个复制线程共享：保护计数器
+        self._lock = threading.Lock()
+        self.layout = None
+        self.archive_root = None
+        self.deduper = None
+        self.manifest = None
+
+        # 处理状态变量；暂停、取消状态由多个线程共享，统一放在 control 中
+        self.control = control if control is not None else RunControl()
+        self.processing = False
+        self.error = None
+        self.total_files = 0
+        self.current_file_index = 0
+        self.processed_count = 0
+        self.failed_count = 0
+        self.duplicate_count = 0
+        self.skipped_count = 0
+        self.verified_count = 0
+        self.recopied_count = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self._meter = ThroughputMeter()
+        self._last_progress = 0.0
+        self.metrics = RunMetrics()
+        self._last_metrics = 0.0
+
+    # ---- 控制接口 ----
+
+    @property
+    def paused(self):
+        return self.control.paused
+
+    @property
+    def cancelled(self):
+        return self.control.cancelled
+
+    def pause(self):
+        """暂停处理"""
+        self.control.pause()
+
+    def resume(self):
+        """继续处理"""
+        self.control.resume()
+
+    def stop(self):
+        """停止处理：正在复制的文件在当前块写完后中止，未完成的目标文件会被删除"""
+        self.control.cancel()
+
+    # ---- 事件 ----
+
+    def emit(self, kind, **data):
+        """发出事件"""
+        if self.on_event is not None:
+            self.on_event(EngineEvent(kind, data))
+
+    def log_message(self, message, level=INFO):
+        """发出日志事件，低于 log_level 的消息直接丢弃"""
+        if level >= self.log_level:
+            start = time.perf_counter()
+            self.emit(EVENT_LOG, message=message, level=level)
+            self.metrics.add_time(STAGE_LOG, time.perf_counter() - start)
+
+    def log_file_found(self, name, path):
+        """记录找到的文件（DEBUG 级别，关闭时连字符串都不拼接）"""
+        if self.log_level <= DEBUG:
+            self.log_message(f"找到文件: {name}", DEBUG)
+            self.log_message(f"源路径: {path}", DEBUG)
+
+    def add_bytes(self, n):
+        """累计已处理的字节数（复制线程中逐块调用）"""
+        with self._lock:
+            self.bytes_done += n
+        if self.bytes_total:
+            self.report_progress()
+
+    def report_progress(self, force=False):
+        """发出按字节计算的进度事件（含速度和剩余时间），最多每 PROGRESS_INTERVAL 秒一次"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+            bytes_done = self.bytes_done
+            rate = self._meter.update(bytes_done, now)
+        remaining = max(0, self.bytes_total - bytes_done)
+        eta = remaining / rate if rate > 0 else None
+        self.emit(EVENT_PROGRESS,
+                  current=self.current_file_index, total=self.total_files,
+                  bytes_done=bytes_done, bytes_total=self.bytes_total,
+                  rate=rate, eta=eta)
+
+    def report_metrics(self, force=False):
+        """发出运行统计事件，最多每 METRICS_INTERVAL 秒一次"""
+        now = time.monotonic()
+        if not force and now - self._last_metrics < METRICS_INTERVAL:
+            return
+        self._last_metrics = now
+        data = self.metrics.snapshot(files=self.processed_count, bytes_done=self.bytes_done,
+                                     include_slowest=False)
+        data["stage_shares"] = self.metrics.stage_shares()
+        self.emit(EVENT_METRICS, **data)
+
+    # ---- 处理流程 ----
+
+    def run(self):
+        """执行整理任务，返回结果摘要"""
+        # 运行前就调用过 stop() 时保留取消状态，不重置 control
+        self.processing = True
+        self.error = None
+        self.total_files = 0
+        self.current_file_index = 0
+        self.processed_count = 0
+        self.failed_count = 0
+        self.duplicate_count = 0
+        self.skipped_count = 0
+        self.verified_count = 0
+        self.recopied_count = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self._meter = ThroughputMeter()
+        self._last_progress = 0.0
+        self.metrics = RunMetrics()
+        self._last_metrics = 0.0
+
+        # 可选的 cProfile 采样，只记录本线程（扫描与单线程复制）
+        profiler = None
+        if self.profile_path:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            self.process_files(self.source, self.dest, self.file_types)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.save_profile(profiler)
+            if self.deduper is not None:
+                self.deduper.close()
+                self.deduper = None
+            if self.manifest is not None:
+                self.manifest.close()
+                self.manifest = None
+            if self.archive_writer is not None:
+                self.close_archive()
+            if self.packed_index is not None:
+                self.packed_index.close()
+                self.packed_index = None
+            if self.dir_snapshot is not None:
+                self.close_dir_cache()
+            if self.checksums is not None:
+                self.close_checksums()
+            self.processing = False
+            self.report_metrics(force=True)
+            if self.metrics_path:
+                self.save_metrics()
+            self.emit(EVENT_FINISHED, **self.summary())
+        return self.summary()
+
+    def close_archive(self):
+        """结束归档的最后一卷，记录写出的各卷"""
+        writer, self.archive_writer = self.archive_writer, None
+        try:
+            writer.close()
+        except OSError as e:
+            self.error = str(e)
+            self.log_message(f"写入归档失败: {str(e)}", ERROR)
+            return
+        for path in writer.volumes:
+            self.log_message(f"归档已保存到: {path}")
+
+    def close_checksums(self):
+        """关闭各扩展名文件夹的校验和清单"""
+        checksums, self.checksums = self.checksums, None
+        try:
+            checksums.close()
+        except OSError as e:
+            self.log_message(f"保存校验和清单失败: {str(e)}", ERROR)
+            return
+        for folder in checksums.folders:
+            self.log_message(f"校验和已保存到: {os.path.join(folder, checksums.sums_name)}")
+
+    def close_dir_cache(self):
+        """保存目录快照缓存，记录命中情况"""
+        snapshot, self.dir_snapshot = self.dir_snapshot, None
+        try:
+            snapshot.close()
+        except sqlite3.Error as e:
+            self.log_message(f"保存目录缓存失败: {str(e)}", ERROR)
+        self.log_message(f"目录缓存：{snapshot.hits} 个目录没有变化，"
+                         f"重新列出 {snapshot.misses} 个目录")
+
+    def save_metrics(self):
+        """把本次运行的统计写入 metrics_path"""
+        try:
+            self.metrics.write_json(self.metrics_path, mode=self.mode, transfer=self.transfer,
+                                    source=self.source, dest=self.dest,
+                                    files=self.processed_count, bytes_done=self.bytes_done,
+                                    **self.summary())
+            self.log_message(f"运行统计已保存到: {self.metrics_path}")
+        except OSError as e:
+            self.log_message(f"保存运行统计失败: {str(e)}", ERROR)
+
+    def save_profile(self, profiler):
+        """保存 cProfile 结果，可用 python -m pstats 查看"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            profiler.dump_stats(self.profile_path)
+            self.log_message(f"性能分析结果已保存到: {self.profile_path}")
+        except OSError as e:
+            self.log_message(f"保存性能分析结果失败: {str(e)}", ERROR)
+
+    def summary(self):
+        """当前任务的结果摘要"""
+        return {
+            "processed": self.processed_count,
+            "total": self.total_files,
+            "failed": self.failed_count,
+            "duplicates": self.duplicate_count,
+            "skipped": self.skipped_count,
+            "cancelled": self.cancelled,
+            "error": self.error,
+        }
+
+    def process_files(self, source, dest, file_types):
+        """处理文件的核心函数"""
+        if not os.path.exists(source) or not os.path.exists(dest):
+            self.error = "源文件夹或目标文件夹不存在！"
+            self.log_message(self.error, ERROR)
+            return
+
+        self.log_message(f"开始扫描文件夹: {source}")
+        self.log_message(f"文件类型: {', '.join(file_types)}")
+        if self.transfer != TRANSFER_COPY:
+            self.log_message(f"输出方式: {self.transfer}")
+        started = time.time()
+
+        # 增量处理：清单以源文件绝对路径为键，先处理上次中断留下的记录
+        if self.incremental and self.dry_run:
+            # 演练只读取已有清单，不创建也不修复
+            from .manifest import Manifest, MANIFEST_NAME
+            source = os.path.abspath(source)
+            manifest_path = os.path.join(dest, STATE_DIR_NAME, MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                self.manifest = Manifest(manifest_path, readonly=True)
+        elif self.incremental:
+            from .manifest import Manifest, MANIFEST_NAME
+            source = os.path.abspath(source)
+            self.manifest = Manifest(state_path(dest, MANIFEST_NAME))
+            completed, removed = self.manifest.recover()
+            if completed or removed:
+                self.log_message(f"继续上次未完成的任务：补记 {completed} 个已完成文件，"
+                                 f"清理 {removed} 个不完整文件")
+
+        if self.scan_archives:
+            self.open_packed_index(dest)
+        if self.dir_cache:
+            self.open_dir_cache(dest)
+
+        if self.archive is not None:
+            # 归档内的扩展名文件夹只存在于归档中，目标文件名在本次的归档内不重复即可
+            from .archive import ArchiveWriter, archive_name
+            name = archive_name()
+            self.archive_root = os.path.join(dest, name)
+            self.layout = DestinationLayout(self.archive_root, virtual=True)
+            self.log_message(f"输出到归档: {self.archive}"
+                             + (f"，每卷 {format_size(self.volume_size)}" if self.volume_size else ""))
+            if not self.dry_run:
+                self.archive_writer = ArchiveWriter(dest, self.archive, self.volume_size,
+                                                    name, self.chunk_size)
+        else:
+            # 创建目标文件夹，并读入已有文件名用于重名处理
+            self.layout = DestinationLayout(dest, create=not self.dry_run)
+            for ext in file_types:
+                self.layout.folder(ext)
+        if self.checksum is not None and not self.dry_run:
+            from .checksum import ChecksumManifest
+            self.checksums = ChecksumManifest(self.checksum)
+            self.log_message(f"复制时计算 {self.checksum} 校验和"
+                             + ("，并重新读出目标文件校验" if self.verify else ""))
+            if self.transfer != TRANSFER_COPY:
+                self.log_message("同一磁盘上的移动、硬链接和 reflink 不复制数据，这些文件不计算校验和")
+        if self.dedupe and self.dry_run:
+            self.log_message("演练时不读取文件内容，不检查重复文件")
+        elif self.dedupe:
+            from .dedupe import Deduper, HashCache, HASH_CACHE_NAME
+            self.deduper = Deduper(self.layout, HashCache(state_path(dest, HASH_CACHE_NAME)))
+
+        if self.dry_run:
+            # 演练：只扫描并生成计划
+            self.plan_files(source, dest, file_types)
+            return
+        if self.plan is not None:
+            # 按之前演练的计划执行
+            self.process_plan(dest)
+        elif self.mode == MODE_DIRECT:
+            # 模式1：直接搜索并复制
+            self.process_files_direct(source, dest, file_types)
+        elif self.mode == MODE_SCAN_FIRST:
+            # 模式2：先搜索后复制
+            self.process_files_scan_first(source, dest, file_types)
+        else:
+            # 模式3：扫描与复制并行
+            self.process_files_pipeline(source, dest, file_types)
+
+        # 监视模式：处理完已有文件后继续等待新文件
+        if self.watch and not self.cancelled and self.error is None:
+            self.watch_source(source, dest, since=started)
+
+    def open_packed_index(self, dest):
+        """打开源文件夹中归档的索引缓存（演练时只读）"""
+        from .packed import PackedIndexCache, PACKED_INDEX_NAME
+        self.log_message("扫描源文件夹中 zip / tar 归档内的文件")
+        if self.transfer != TRANSFER_COPY:
+            self.log_message("归档内的文件总是复制出来，归档本身不变")
+        if self.dedupe:
+            self.log_message("归档内的文件不检查重复")
+        if not self.dry_run:
+            self.packed_index = PackedIndexCache(state_path(dest, PACKED_INDEX_NAME))
+            return
+        index_path = os.path.join(dest, STATE_DIR_NAME, PACKED_INDEX_NAME)
+        if os.path.exists(index_path):
+            self.packed_index = PackedIndexCache(index_path, readonly=True)
+        else:
+            self.packed_index = PackedIndexCache()
+
+    def open_dir_cache(self, dest):
+        """打开目录快照缓存（演练时只读，没有缓存时不使用）"""
+        from .dircache import DirCache, DIR_CACHE_NAME
+        from .packed import packed_format
+        scan_archives = self.scan_archives
+
+        def is_candidate(name):
+            return (self.matcher.match(name) is not None
+                    or (scan_archives and packed_format(name) is not None))
+
+        key = repr((self.matcher.name_key(), scan_archives))
+        # 清单和按大小、时间的过滤需要文件当前的 stat，缓存只省去列目录
+        fresh_stat = self.incremental or self.matcher.needs_stat
+        if not self.dry_run:
+            self.dir_snapshot = DirCache(state_path(dest, DIR_CACHE_NAME), key, is_candidate,
+                                         fresh_stat)
+        else:
+            cache_path = os.path.join(dest, STATE_DIR_NAME, DIR_CACHE_NAME)
+            if not os.path.exists(cache_path):
+                self.log_message("还没有目录缓存，演练时不创建")
+                return
+            self.dir_snapshot = DirCache(cache_path, key, is_candidate, fresh_stat, readonly=True)
+        self.log_message("使用目录缓存：修改时间没变的目录不再列出")
+        if self.scan_processes > 1 and not self.follow_symlinks \
+                and (self.dry_run or self.mode == MODE_SCAN_FIRST):
+            self.log_message("多进程扫描时不使用目录缓存")
+
+    def watch_source(self, source, dest, since=None):
+        """持续监视源文件夹，新文件写完后按同样的匹配和复制规则处理，直到取消"""
+        try:
+            watcher, found = start_watcher(
+                source, skip_dir=lambda path: self.should_skip_directory(path, dest),
+                since=since, poll_interval=self.poll_interval, sleep=self.control.sleep)
+        except OSError as e:
+            self.error = str(e)
+            self.log_message(f"无法监视文件夹: {str(e)}", ERROR)
+            return
+
+        # 扫描期间新出现或被修改的文件也交给去抖处理
+        debouncer = Debouncer(self.settle_seconds)
+        for path in found:
+            debouncer.add(path)
+
+        self.log_message(f"开始监视文件夹: {source}（{watcher.name}），取消即停止监视")
+        try:
+            while self.wait_if_paused():
+                for path in watcher.poll(0.5):
+                    debouncer.add(path)
+                for path in debouncer.ready():
+                    if self.cancelled:
+                        break
+                    self.process_path(path, dest)
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"监视过程出错: {str(e)}", ERROR)
+        finally:
+            watcher.close()
+
+        self.log_message(f"已停止监视，共处理 {self.processed_count} 个文件")
+        self.log_result_details()
+        self.log_message("=" * 50)
+
+    def process_path(self, path, dest):
+        """处理监视到的单个文件"""
+        name = os.path.basename(path)
+        file_ext = self.match_file(name, path, lambda: os.stat(path))
+        if file_ext:
+            with self._lock:
+                self.total_files += 1
+            self.log_file_found(name, path)
+            self.copy_one(path, file_ext, dest)
+        archive = self.matched_archive(path, name)
+        if archive is not None:
+            with self._lock:
+                self.total_files += len(archive[2])
+            self.copy_packed(archive, dest)
+
+    def match_entry(self, entry):
+        """检查 DirEntry 是否需要处理，返回匹配到的扩展名，不需要处理时返回 None"""
+        return self.match_file(entry.name, entry.path, entry.stat)
+
+    def match_file(self, name, path, stat):
+        """检查文件是否需要处理，stat 为获取 stat 结果的无参函数"""
+        start = time.perf_counter()
+        metrics = self.metrics
+
+        def counted_stat():
+            metrics.count_stat()
+            return stat()
+
+        file_ext = self.matcher.match(name, counted_stat)
+        if file_ext and self.manifest is not None:
+            # 上次已复制且之后没有变化的文件直接跳过
+            try:
+                unchanged = self.manifest.is_current(path, counted_stat())
+            except OSError:
+                unchanged = False
+            if unchanged:
+                with self._lock:
+                    self.skipped_count += 1
+                file_ext = None
+        metrics.add_time(STAGE_MATCH, time.perf_counter() - start)
+        self.report_metrics()
+        return file_ext
+
+    def wait_if_paused(self):
+        """暂停时阻塞等待（不占用 CPU），返回是否仍在处理"""
+        return self.control.wait()
+
+    def process_files_direct(self, source, dest, file_types):
+        """模式1：直接搜索并复制（边搜索边复制）"""
+        try:
+            self.log_message("开始搜索并处理文件...")
+            self.log_message(f"源文件夹: {source}")
+            self.log_message(f"目标文件夹: {dest}")
+            self.log_message(f"文件类型: {', '.join(file_types)}")
+
+            for root, entries in self.walk_source(source):
+                if self.cancelled:
+                    return
+
+                for entry in entries:
+                    if not self.wait_if_paused():
+                        return
+
+                    # 检查文件是否符合选定的类型和过滤条件
+                    file_ext = self.match_entry(entry)
+                    if file_ext:
+                        self.log_file_found(entry.name, entry.path)
+                        self.copy_one(entry.path, file_ext, dest)
+                    archive = self.matched_archive(entry.path, entry.name)
+                    if archive is not None:
+                        self.copy_packed(archive, dest)
+
+            self.log_message(f"处理完成！共处理 {self.processed_count} 个文件")
+            self.log_result_details()
+            self.log_message("=" * 50)
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"处理过程出错: {str(e)}", ERROR)
+
+    def process_files_scan_first(self, source, dest, file_types):
+        """模式2：先搜索后复制（显示准确进度）"""
+        # 存储待复制的文件信息（紧凑记录，文件很多时转存到临时文件）
+        files_to_copy = ScanPlan(self.spill_bytes)
+        archives = [] if self.scan_archives else None
+        try:
+
+            self.log_message("开始扫描文件...")
+            self.log_message(f"源文件夹: {source}")
+            self.log_message(f"目标文件夹: {dest}")
+            self.log_message(f"文件类型: {', '.join(file_types)}")
+
+            # 第一阶段：扫描文件
+            if not self.scan_source(source, dest, files_to_copy, archives):
+                return
+
+            self.log_message(f"扫描完成，共找到 {self.total_files} 个文件")
+            if files_to_copy.spilled:
+                self.log_message("待复制文件较多，列表已转存到临时文件")
+            self.log_message("=" * 50)
+
+            if self.total_files == 0:
+                self.log_message("未找到符合条件的文件")
+                self.log_result_details()
+                return
+
+            # 复制前检查空间，避免复制到一半才因磁盘已满失败；
+            # 去重时重复文件不占空间，事先算不出实际需要多少，不检查
+            if self.transfer not in (TRANSFER_MOVE, TRANSFER_HARDLINK) and not self.dedupe:
+                if not self.check_free_space(dest, self.bytes_total):
+                    return
+
+            # 第二阶段：复制文件，归档内的文件最后按归档逐个取出
+            self.copy_planned(itertools.chain(
+                ((path, ext, size, None, None) for path, ext, size in self.ordered(files_to_copy)),
+                self.packed_items(archives or ())), dest)
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"处理过程出错: {str(e)}", ERROR)
+        finally:
+            files_to_copy.close()
+
+    def scan_source(self, source, dest, files_to_copy, archives=None):
+        """扫描阶段：匹配的文件依次加入 files_to_copy（ScanPlan），返回是否扫描完
+
+        给出 archives 列表时，含有匹配文件的归档以 (归档路径, 格式, [(PackedFile, 扩展名)])
+        加入其中。
+        """
+        if self.scan_processes > 1:
+            if not self.follow_symlinks:
+                return self.scan_source_processes(source, dest, files_to_copy, archives)
+            # 符号链接可能让不同子树指向同一目录，单进程遍历才能保证只遍历一次
+            self.log_message("跟随符号链接时不使用多进程扫描")
+        for root, entries in self.walk_source(source, skip_output=dest):
+            if self.cancelled:
+                return False
+
+            for entry in entries:
+                if not self.wait_if_paused():
+                    return False
+
+                file_ext = self.match_entry(entry)
+                if file_ext:
+                    try:
+                        self.metrics.count_stat()
+                        size = entry.stat().st_size
+                        # POSIX 上 inode 来自目录项本身，不需要额外的系统调用
+                        inode = entry.inode()
+                    except OSError:
+                        size = inode = 0
+                    self.total_files += 1
+                    self.bytes_total += size
+                    self.log_file_found(entry.name, entry.path)
+                    files_to_copy.add(root, entry.name, file_ext, size, inode)
+                if archives is not None:
+                    archive = self.matched_archive(entry.path, entry.name)
+                    if archive is not None:
+                        archives.append(archive)
+                        self.total_files += len(archive[2])
+                        self.bytes_total += sum(packed.size for packed, _ext in archive[2])
+        return not self.cancelled
+
+    def scan_source_processes(self, source, dest, files_to_copy, archives=None):
+        """多进程扫描阶段，结果与 scan_source() 单进程遍历相同"""
+        from .procscan import scan_processes, ScannedStat
+        self.log_message(f"扫描进程数: {self.scan_processes}")
+
+        def skip_dir(path):
+            if self.should_skip_directory(path, dest):
+                self.log_message(f"跳过输出目录: {path}")
+                return True
+            return False
+
+        records = scan_processes(source, self.matcher, dest, self.scan_processes,
+                                 want_archives=archives is not None, skip_dir=skip_dir,
+                                 is_running=lambda: not self.cancelled)
+        for root, matches, skipped in self.metrics.timed(STAGE_WALK, records):
+            if not self.wait_if_paused():
+                return False
+            for path in skipped:
+                self.log_message(f"跳过输出目录: {path}")
+
+            for name, file_ext, size, mtime_ns, inode in matches:
+                path = os.path.join(root, name)
+                if file_ext and self.manifest is not None:
+                    # 子进程里没有清单，已复制过且没有变化的文件在这里跳过
+                    if mtime_ns is not None and self.manifest.is_current(
+                            path, ScannedStat(size, mtime_ns)):
+                        with self._lock:
+                            self.skipped_count += 1
+                        file_ext = None
+                if file_ext:
+                    self.total_files += 1
+                    self.bytes_total += size
+                    self.log_file_found(name, path)
+                    files_to_copy.add(root, name, file_ext, size, inode)
+                if archives is not None:
+                    archive = self.matched_archive(path, name)
+                    if archive is not None:
+                        archives.append(archive)
+                        self.total_files += len(archive[2])
+                        self.bytes_total += sum(packed.size for packed, _ext in archive[2])
+        return not self.cancelled
+
+    def copy_planned(self, items, dest):
+        """复制阶段：依次处理 (源路径, 扩展名, 大小, 计划的目标路径或 None, 归档内的文件或 None)"""
+        self.report_progress(force=True)
+        self.log_message("开始复制文件...")
+
+        for src_path, ext, size, planned, packed in items:
+            if not self.wait_if_paused():
+                break
+
+            before = self.bytes_done
+            if self.copy_one(src_path, ext, dest, planned, packed):
+                self.current_file_index += 1
+            # 移动、链接、重复或失败的文件没有逐块进度，按扫描时的大小补齐
+            self.add_bytes(max(0, size - (self.bytes_done - before)))
+        self.report_progress(force=True)
+
+        if self.current_file_index == self.total_files:
+            self.log_message("所有文件处理完成！")
+            self.emit(EVENT_STATUS, text="处理完成")
+        else:
+            self.log_message(f"处理完成 {self.current_file_index}/{self.total_files} 个文件")
+
+        self.log_result_details()
+        self.log_message("=" * 50)
+
+    def ordered(self, files):
+        """按 self.order 排列扫描到的文件"""
+        if self.order != ORDER_SCAN:
+            self.log_message(f"复制顺序: {self.order}")
+
+        def on_fallback(error):
+            self.log_message(f"文件系统不支持查询数据块位置（{error}），改为按 inode 排序")
+        return order_files(files, self.order, on_fallback)
+
+    def matched_archive(self, path, name):
+        """path 是源文件夹中的归档且其中有匹配的文件时返回 (归档路径, 格式, [(PackedFile, 扩展名)])，
+        否则返回 None；没有开启 scan_archives 时总是 None"""
+        if not self.scan_archives:
+            return None
+        from .packed import packed_format, packed_path
+        fmt = packed_format(name)
+        if fmt is None:
+            return None
+        files = self.load_packed_index(path, fmt)
+        matched = []
+        for packed in files or ():
+            inner = packed_path(path, packed.name)
+            file_ext = self.match_file(packed.basename, inner, packed.stat)
+            if file_ext:
+                self.log_file_found(packed.basename, inner)
+                matched.append((packed, file_ext))
+        return (path, fmt, matched) if matched else None
+
+    def load_packed_index(self, path, fmt):
+        """归档中的文件列表，归档没变时使用缓存；读不了时记录错误并返回 None"""
+        from .packed import index_archive, INDEX_ERRORS
+        try:
+            st = os.stat(path)
+            files = self.packed_index.get(path, st, fmt)
+            if files is None:
+                files = index_archive(path, fmt)
+                self.packed_index.put(path, st, fmt, files)
+            return files
+        except INDEX_ERRORS as e:
+            self.log_message(f"无法读取归档 {path}: {str(e)}", ERROR)
+            return None
+
+    def packed_items(self, archives):
+        """按归档逐个打开，依次产生归档内匹配的文件，格式与 copy_planned 的项目相同"""
+        from .packed import PackedReader, packed_path, INDEX_ERRORS
+        for path, fmt, matched in archives:
+            try:
+                reader = PackedReader(path, fmt)
+            except INDEX_ERRORS as e:
+                with self._lock:
+                    self.failed_count += len(matched)
+                self.log_message(f"无法打开归档 {path}: {str(e)}", ERROR)
+                continue
+            with reader:
+                for packed, file_ext in matched:
+                    yield packed_path(path, packed.name), file_ext, packed.size, None, (reader, packed)
+
+    def copy_packed(self, archive, dest):
+        """从一个归档中依次取出匹配的文件（直接、流水线和监视模式使用）"""
+        items = self.packed_items([archive])
+        try:
+            for src_path, file_ext, _size, _planned, packed in items:
+                if not self.wait_if_paused():
+                    break
+                self.copy_one(src_path, file_ext, dest, packed=packed)
+        finally:
+            items.close()
+
+    def check_free_space(self, dest, required):
+        """目标磁盘剩余空间不足 required 字节时记录错误并返回 False"""
+        import shutil
+        free = shutil.disk_usage(dest).free
+        if required <= free:
+            return True
+        self.error = (f"目标磁盘剩余空间不足：需要 {format_size(required)}，"
+                      f"剩余 {format_size(free)}")
+        self.log_message(self.error, ERROR)
+        return False
+
+    def plan_files(self, source, dest, file_types):
+        """演练：扫描并分配目标路径，按扩展名统计数量和大小并检查剩余空间，不写入任何文件"""
+        from .dryrun import DryRunPlan
+        from .packed import packed_path
+        files = ScanPlan(self.spill_bytes)
+        archives = [] if self.scan_archives else None
+        try:
+            self.log_message("演练模式：只生成计划，不复制任何文件")
+            self.log_message(f"源文件夹: {source}")
+            self.log_message(f"目标文件夹: {dest}")
+            self.log_message(f"文件类型: {', '.join(file_types)}")
+
+            if not self.scan_source(source, dest, files, archives):
+                return
+
+            plan = DryRunPlan(source, dest, file_types, self.transfer,
+                              scan_archives=self.scan_archives, archive=self.archive,
+                              volume_size=self.volume_size, archive_root=self.archive_root)
+            dest_dev = os.stat(dest).st_dev
+            dir_devs = {}
+            for src_path, ext, size in self.ordered(files):
+                plan.add(src_path, self.plan_dest(src_path, ext), ext, size,
+                         needs_space=self.needs_space(src_path, dest_dev, dir_devs))
+            # 归档内的文件总是复制出来，都占用新空间
+            for path, _fmt, matched in archives or ():
+                for packed, ext in matched:
+                    src_path = packed_path(path, packed.name)
+                    plan.add(src_path, self.plan_dest(src_path, ext), ext, packed.size)
+            plan.check_space()
+            self.dry_run_plan = plan
+            self.log_plan(plan)
+
+            for path in self.plan_exports:
+                plan.export(path)
+                self.log_message(f"计划已导出到: {path}")
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"演练过程出错: {str(e)}", ERROR)
+        finally:
+            files.close()
+
+    def plan_dest(self, src_path, file_ext):
+        """演练时的目标路径：增量处理时沿用上次的副本，否则分配新名字"""
+        if self.manifest is not None:
+            previous = self.manifest.previous_dest(src_path)
+            if previous is not None and os.path.exists(previous):
+                return previous
+        return self.layout.allocate(file_ext, os.path.basename(src_path))
+
+    def needs_space(self, src_path, dest_dev, dir_devs):
+        """文件是否会占用目标磁盘的新空间：移动、硬链接到同一磁盘时不占"""
+        if self.transfer not in (TRANSFER_MOVE, TRANSFER_HARDLINK):
+            return True
+        # 同一目录的文件在同一个文件系统上，每个目录只 stat 一次
+        folder = os.path.dirname(src_path)
+        dev = dir_devs.get(folder)
+        if dev is None:
+            try:
+                dev = dir_devs[folder] = os.stat(folder).st_dev
+            except OSError:
+                return True
+        return dev != dest_dev
+
+    def log_plan(self, plan):
+        """记录演练结果：各扩展名的数量和大小、所需与剩余空间"""
+        self.log_message(f"演练完成，共 {len(plan)} 个文件，{format_size(plan.total_bytes)}")
+        for ext, (count, size) in sorted(plan.by_ext.items()):
+            self.log_message(f"  {ext}: {count} 个文件，{format_size(size)}")
+        if self.skipped_count:
+            self.log_message(f"跳过上次已复制且未变化的文件 {self.skipped_count} 个")
+        self.log_message(f"需要空间 {format_size(plan.required_bytes)}，"
+                         f"目标磁盘剩余 {format_size(plan.free_bytes)}")
+        if plan.fits:
+            self.emit(EVENT_STATUS, text="演练完成")
+        else:
+            self.log_message(f"剩余空间不足，还差 {format_size(plan.required_bytes - plan.free_bytes)}",
+                             ERROR)
+            self.emit(EVENT_STATUS, text="演练完成：剩余空间不足")
+        self.log_message("=" * 50)
+
+    def process_plan(self, dest):
+        """按演练得到的计划复制，不再扫描源文件夹"""
+        plan = self.plan
+        try:
+            self.log_message(f"按计划处理文件（{plan.created} 生成）...")
+            self.log_message(f"源文件夹: {plan.source}")
+            self.log_message(f"目标文件夹: {dest}")
+            if not self.check_free_space(dest, plan.required_bytes):
+                return
+
+            self.total_files = len(plan)
+            self.bytes_total = plan.total_bytes
+            self.copy_planned(self.unchanged_plan_entries(plan), dest)
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"处理过程出错: {str(e)}", ERROR)
+
+    def unchanged_plan_entries(self, plan):
+        """产生计划中仍需处理的文件；增量处理时跳过计划生成后已复制过的文件"""
+        readers = {}
+        try:
+            for src_path, dst_path, ext, size in plan.entries:
+                packed = self.plan_packed(src_path, readers)
+                if self.manifest is not None:
+                    try:
+                        st = packed[1].stat() if packed is not None else os.stat(src_path)
+                        current = self.manifest.is_current(src_path, st)
+                    except OSError:
+                        current = False
+                    if current:
+                        with self._lock:
+                            self.skipped_count += 1
+                            self.total_files -= 1
+                            self.bytes_total -= size
+                        continue
+                yield src_path, ext, size, dst_path, packed
+        finally:
+            for reader, _files in readers.values():
+                if reader is not None:
+                    reader.close()
+
+    def plan_packed(self, src_path, readers):
+        """计划中的源路径是源文件夹中归档内的文件时返回 (PackedReader, PackedFile)，否则返回 None
+
+        readers 为 {归档路径: (PackedReader, {虚拟路径: PackedFile})}，计划中同一个
+        归档的文件排在一起，前一个归档用完就关闭。
+        """
+        if not self.scan_archives or os.path.lexists(src_path):
+            return None
+        from .packed import PackedReader, packed_format, packed_path, INDEX_ERRORS
+        # 往上找到是文件的那一级，即所在的归档
+        archive = src_path
+        while True:
+            parent = os.path.dirname(archive)
+            if parent == archive:
+                return None
+            archive = parent
+            if os.path.isfile(archive):
+                break
+        fmt = packed_format(archive)
+        if fmt is None:
+            return None
+        if archive not in readers:
+            for reader, _files in readers.values():
+                if reader is not None:
+                    reader.close()
+            readers.clear()
+            reader, lookup = None, {}
+            files = self.load_packed_index(archive, fmt)
+            if files is not None:
+                try:
+                    reader = PackedReader(archive, fmt)
+                    lookup = {packed_path(archive, packed.name): packed for packed in files}
+                except INDEX_ERRORS as e:
+                    self.log_message(f"无法打开归档 {archive}: {str(e)}", ERROR)
+            readers[archive] = (reader, lookup)
+        reader, lookup = readers[archive]
+        packed = lookup.get(src_path)
+        return (reader, packed) if packed is not None else None
+
+    def process_files_pipeline(self, source, dest, file_types):
+        """模式3：扫描线程将匹配文件放入有界队列，复制线程池并行取出复制"""
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            work_queue = Queue(maxsize=self.queue_size)
+
+            self.log_message("开始并行搜索并复制文件...")
+            self.log_message(f"源文件夹: {source}")
+            self.log_message(f"目标文件夹: {dest}")
+            self.log_message(f"文件类型: {', '.join(file_types)}")
+            self.log_message(f"复制线程数: {self.workers}")
+
+            def copy_worker():
+                while True:
+                    item = work_queue.get()
+                    if item is None:
+                        return
+                    # 取消后继续取出剩余任务，避免扫描线程阻塞在 put 上
+                    if not self.wait_if_paused():
+                        continue
+                    # 归档由一个线程按顺序逐个取出其中的文件
+                    if item[2] is not None:
+                        self.copy_packed(item[2], dest)
+                    else:
+                        self.copy_one(item[0], item[1], dest)
+
+            with ThreadPoolExecutor(max_workers=self.workers,
+                                    thread_name_prefix="copy") as pool:
+                for _ in range(self.workers):
+                    pool.submit(copy_worker)
+                try:
+                    # 输出目录在复制过程中不断变化，必须跳过
+                    for root, entries in self.walk_source(source, skip_output=dest):
+                        if self.cancelled:
+                            break
+
+                        for entry in entries:
+                            if not self.wait_if_paused():
+                                break
+
+                            file_ext = self.match_entry(entry)
+                            if file_ext:
+                                with self._lock:
+                                    self.total_files += 1
+                                self.log_file_found(entry.name, entry.path)
+                                work_queue.put((entry.path, file_ext, None))
+                                self.metrics.sample_queue(work_queue.qsize())
+                            archive = self.matched_archive(entry.path, entry.name)
+                            if archive is not None:
+                                with self._lock:
+                                    self.total_files += len(archive[2])
+                                work_queue.put((entry.path, None, archive))
+                finally:
+                    # 每个复制线程收到一个结束标记后退出
+                    for _ in range(self.workers):
+                        work_queue.put(None)
+
+            if not self.cancelled:
+                self.log_message(f"处理完成！共处理 {self.processed_count} 个文件")
+            else:
+                self.log_message(f"处理完成 {self.processed_count}/{self.total_files} 个文件")
+            self.log_result_details()
+            self.log_message("=" * 50)
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"处理过程出错: {str(e)}", ERROR)
+
+    def walk_source(self, source, skip_output=None):
+        """遍历源文件夹，产生 (目录路径, 文件 DirEntry 列表)
+
+        给出 skip_output 时跳过输出目录及其子目录。
+        """
+        skip_dir = None
+        if skip_output is not None:
+            def skip_dir(path):
+                # 如果当前目录是输出目录或其子目录，跳过
+                if self.should_skip_directory(path, skip_output):
+                    self.log_message(f"跳过输出目录: {path}")
+                    return True
+                return False
+
+        walker = TreeWalker(workers=self.walk_workers,
+                            follow_symlinks=self.follow_symlinks,
+                            skip_dir=skip_dir,
+                            is_running=lambda: not self.cancelled,
+                            dir_cache=self.dir_snapshot)
+        return self.metrics.timed(STAGE_WALK, walker.walk(source))
+
+    def copy_one(self, src_path, file_ext, dest, planned=None, packed=None):
+        """按输出方式把单个文件放到对应扩展名文件夹，返回目标路径（重复文件返回已有副本），失败时返回 None
+
+        planned 为演练计划中的目标路径，仍可用时使用，已被占用时重新分配。
+        packed 为 (PackedReader, PackedFile) 时 src_path 是归档内文件的虚拟路径，
+        内容从归档中读出，不检查重复。
+        """
+        dst_path = None
+        src_stat = None
+        # 覆盖上次的副本时它原来的大小，用于更新去重索引
+        replaced_size = None
+        try:
+            # 准备目标路径（文件夹在本次运行中只创建一次）
+            filename = os.path.basename(src_path)
+            if self.manifest is not None:
+                self.metrics.count_stat()
+                src_stat = packed[1].stat() if packed is not None else os.stat(src_path)
+                # 只有上次的副本与源文件内容相同时才写回原处（例如只改了修改时间），
+                # 内容不同的同名文件（如存储卡格式化后重新编号的照片）另起一个 _N
+                previous = self.manifest.previous_dest(src_path)
+                if previous is not None and self.same_content(previous, src_path, src_stat,
+                                                              packed):
+                    replaced_size = src_stat.st_size
+                    dst_path = previous
+
+            start = time.perf_counter()
+            if dst_path is None and self.deduper is not None and packed is None:
+                duplicate, dst_path = self.deduper.claim(
+                    src_path, file_ext, lambda: self.allocate_dest(file_ext, filename, planned))
+                self.metrics.add_time(STAGE_DEDUPE, time.perf_counter() - start)
+                if duplicate is not None:
+                    with self._lock:
+                        self.duplicate_count += 1
+                    if self.manifest is not None:
+                        self.manifest.finish(src_path, src_stat, duplicate)
+                    if self.log_level <= DEBUG:
+                        self.log_message(f"跳过重复文件: {src_path}（与 {duplicate} 内容相同）", DEBUG)
+                    return duplicate
+            elif dst_path is None:
+                dst_path = self.allocate_dest(file_ext, filename, planned)
+                self.metrics.add_time(STAGE_ALLOCATE, time.perf_counter() - start)
+
+            # 复制、移动或链接文件
+            if self.manifest is not None:
+                self.manifest.begin(src_path, src_stat, dst_path)
+            start = time.perf_counter()
+            if self.archive_writer is not None:
+                member = self.archive_member(dst_path)
+                if packed is not None:
+                    reader, packed_file = packed
+                    with reader.open(packed_file) as f:
+                        volume = self.archive_writer.add_fileobj(
+                            f, member, packed_file.stat(), on_progress=self.add_bytes,
+                            should_continue=self.wait_if_paused)
+                else:
+                    volume = self.archive_writer.add(src_path, member, on_progress=self.add_bytes,
+                                                     should_continue=self.wait_if_paused)
+                method, fallback = METHOD_ARCHIVE, False
+            elif packed is not None:
+                self.extract_packed(packed, dst_path)
+                method, fallback = METHOD_EXTRACT, False
+            else:
+                method, fallback = transfer_file(src_path, dst_path, self.transfer,
+                                                 copy_function=self.copy_contents)
+                if self.checksums is not None and method in (METHOD_RENAME, METHOD_LINK,
+                                                             METHOD_REFLINK):
+                    # 没有经过复制，不能沿用清单中这个文件名上次的校验和
+                    self.checksums.discard(dst_path)
+            self.metrics.record_copy(src_path, dst_path, time.perf_counter() - start)
+            self.report_metrics()
+            if self.deduper is not None:
+                if replaced_size is not None:
+                    self.deduper.replaced(dst_path, replaced_size)
+                else:
+                    self.deduper.done(dst_path, True)
+            if self.manifest is not None:
+                self.manifest.finish(src_path, src_stat, dst_path)
+            with self._lock:
+                self.processed_count += 1
+            if self.log_level <= DEBUG:
+                if method == METHOD_ARCHIVE:
+                    self.log_message(f"{METHOD_LABELS[method]}: {volume} -> {member}", DEBUG)
+                elif fallback:
+                    self.log_message(f"{METHOD_LABELS[method]}: {dst_path}"
+                                     f"（无法使用 {self.transfer}，已改用复制）", DEBUG)
+                else:
+                    self.log_message(f"{METHOD_LABELS[method]}: {dst_path}", DEBUG)
+            return dst_path
+
+        except CopyCancelled:
+            # 复制到一半被取消：未完成的目标文件已删除
+            self.release_claim(src_path, dst_path)
+            if self.log_level <= DEBUG:
+                self.log_message(f"已取消复制: {src_path}", DEBUG)
+            return None
+
+        except Exception as e:
+            self.release_claim(src_path, dst_path)
+            with self._lock:
+                self.failed_count += 1
+            self.log_message(f"处理文件失败: {src_path}", ERROR)
+            self.log_message(f"错误信息: {str(e)}", ERROR)
+            return None
+
+    def allocate_dest(self, file_ext, filename, planned=None):
+        """分配目标路径：优先使用计划中的路径
+
+        输出到归档时计划中是演练时归档名下的虚拟路径，换到本次的归档名下使用。
+        """
+        if planned is not None and self.archive is not None:
+            root = self.plan.archive_root
+            planned = None if root is None else \
+                os.path.join(self.archive_root, os.path.relpath(planned, root))
+        if planned is not None:
+            if self.layout.reserve(planned):
+                return planned
+            self.log_message(f"计划中的目标文件已存在，改用新名字: {planned}")
+        return self.layout.allocate(file_ext, filename)
+
+    def same_content(self, path, src_path, src_stat, packed=None):
+        """已有文件 path 的内容是否与源文件相同，大小不同时不读内容"""
+        try:
+            if os.stat(path).st_size != src_stat.st_size:
+                return False
+            if packed is None:
+                if os.path.samefile(path, src_path):
+                    return True
+                source = open(src_path, 'rb')
+            else:
+                source = packed[0].open(packed[1])
+            with source, open(path, 'rb') as existing:
+                while True:
+                    chunk = source.read(self.chunk_size)
+                    if chunk != existing.read(self.chunk_size):
+                        return False
+                    if not chunk:
+                        return True
+        except OSError:
+            return False
+
+    def archive_member(self, dst_path):
+        """虚拟目标路径在归档内的成员名，如 JPG/a.jpg"""
+        return os.path.relpath(dst_path, self.archive_root).replace(os.sep, "/")
+
+    def extract_packed(self, packed, dst_path):
+        """从源文件夹的归档中取出文件，修改时间与归档中记录的相同"""
+        reader, packed_file = packed
+
+        def extract(hasher=None):
+            with reader.open(packed_file) as f:
+                copy_stream(f, dst_path, self.chunk_size, on_progress=self.add_bytes,
+                            should_continue=self.wait_if_paused, hasher=hasher,
+                            sync=hasher is not None and self.verify)
+
+        if self.checksums is not None:
+            self.copy_checked(dst_path, extract)
+        else:
+            extract()
+        os.utime(dst_path, ns=(packed_file.mtime_ns, packed_file.mtime_ns))
+
+    def copy_contents(self, src_path, dst_path):
+        """分块复制文件内容，逐块累计字节进度，暂停和取消在块之间生效"""
+        if self.checksums is not None:
+            self.copy_checked(dst_path, lambda hasher: copy_file(
+                src_path, dst_path, self.chunk_size, on_progress=self.add_bytes,
+                should_continue=self.wait_if_paused, hasher=hasher, sync=self.verify))
+            return
+        copy_file(src_path, dst_path, self.chunk_size,
+                  on_progress=self.add_bytes, should_continue=self.wait_if_paused)
+
+    def copy_checked(self, dst_path, copy):
+        """copy(hasher) 复制一次并计算校验和；需要校验时重新读出目标文件比较
+
+        不一致时重新复制，最多 VERIFY_RETRIES 次，仍不一致时删除目标文件并
+        抛出 ChecksumMismatch。通过后校验和记入所在扩展名文件夹的清单。
+        移动时在这里出错，源文件不会被删除。
+        """
+        from .checksum import new_hasher, file_digest, ChecksumMismatch, VERIFY_RETRIES
+        for attempt in range(VERIFY_RETRIES + 1):
+            hasher = new_hasher(self.checksum)
+            copy(hasher)
+            digest = hasher.hexdigest()
+            if not self.verify:
+                break
+            try:
+                actual = file_digest(dst_path, self.checksum, self.chunk_size, self.wait_if_paused)
+            except BaseException:
+                self.remove_partial(dst_path)
+                raise
+            if actual == digest:
+                with self._lock:
+                    self.verified_count += 1
+                break
+            if attempt < VERIFY_RETRIES:
+                with self._lock:
+                    self.recopied_count += 1
+                self.log_message(f"校验不一致，重新复制（第 {attempt + 1} 次）: {dst_path}", ERROR)
+        else:
+            self.remove_partial(dst_path)
+            self.checksums.discard(dst_path)
+            raise ChecksumMismatch(f"复制 {VERIFY_RETRIES + 1} 次后校验仍不一致: {dst_path}")
+        self.checksums.add(dst_path, digest)
+
+    @staticmethod
+    def remove_partial(dst_path):
+        """删除没有通过校验或被取消的目标文件"""
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+
+    def release_claim(self, src_path, dst_path):
+        """复制没有完成：撤销去重登记、清单记录和目标文件名"""
+        if dst_path is None:
+            return
+        if self.deduper is not None:
+            self.deduper.done(dst_path, False)
+        if self.manifest is not None:
+            self.manifest.abort(src_path)
+        self.layout.release(dst_path)
+
+    def log_result_details(self):
+        """记录结果中的附加统计"""
+        elapsed = self.metrics.elapsed()
+        if self.processed_count and elapsed > 0:
+            self.log_message(f"用时 {elapsed:.1f} 秒，平均每秒 {self.processed_count / elapsed:.1f} 个文件，"
+                             f"{format_size(self.bytes_done / elapsed)}/s")
+        if self.skipped_count:
+            self.log_message(f"跳过上次已复制且未变化的文件 {self.skipped_count} 个")
+        if self.duplicate_count:
+            self.log_message(f"跳过重复文件 {self.duplicate_count} 个")
+        if self.verified_count:
+            self.log_message(f"重新读出校验通过 {self.verified_count} 个文件")
+        if self.recopied_count:
+            self.log_message(f"校验不一致后重新复制 {self.recopied_count} 次", ERROR)
+        if self.failed_count:
+            self.log_message(f"处理失败 {self.failed_count} 个文件", ERROR)
+
+    def should_skip_directory(self, dir_path, dest_path):
+        """检查是否应该跳过该目录"""
+        # 转换为绝对路径进行比较
+        abs_dir = os.path.abspath(dir_path)
+        abs_dest = os.path.abspath(dest_path)
+
+        # 检查是否是输出目录或其子目录
+        return abs_dir.startswith(abs_dest)
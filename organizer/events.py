@@ -0,0 +1,14 @@
+# 作者：AleOsh
+# 引擎事件类型：界面只依赖这里，不必在启动时加载整个引擎
+
+from collections import namedtuple
+
+EVENT_LOG = "log"            # data: message, level
+EVENT_PROGRESS = "progress"  # data: current, total, bytes_done, bytes_total, rate, eta
+EVENT_STATUS = "status"      # data: text
+EVENT_METRICS = "metrics"    # data: RunMetrics.snapshot() 的字段, stage_shares
+EVENT_FINISHED = "finished"  # data: processed, total, failed, duplicates, skipped, cancelled, error
+EVENT_JOB = "job"            # data: Job.info()，调度器中任务状态变化时发出
+
+# source：发出事件的任务（如调度器中的任务编号），转发事件的一方需要区分多个任务时填写
+EngineEvent = namedtuple("EngineEvent", ["kind", "data", "source"], defaults=(None,))
@@ -0,0 +1,118 @@
+# 作者：AleOsh
+# 目标目录布局缓存：每个扩展名文件夹只创建、列出一次，重名时 O(1) 分配 _N 名字
+
+import os
+import threading
+
+# 输出目录中保存运行状态（哈希缓存等）的隐藏文件夹
+STATE_DIR_NAME = ".file_organizer"
+
+
+def state_path(dest, name):
+    """输出目录下状态文件的路径，必要时创建状态文件夹"""
+    folder = os.path.join(dest, STATE_DIR_NAME)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, name)
+
+
+def split_name(filename, file_ext=None):
+    """拆分文件名与扩展名，匹配到的多段扩展名（如 .tar.gz）保持完整"""
+    if file_ext and len(filename) > len(file_ext) and filename.lower().endswith(file_ext):
+        return filename[:-len(file_ext)], filename[-len(file_ext):]
+    return os.path.splitext(filename)
+
+
+def ext_folder_name(file_ext):
+    """扩展名对应的文件夹名，如 '.jpg' -> 'JPG'"""
+    return file_ext.lstrip('.').upper()
+
+
+class DestinationLayout:
+    """输出目录的内存索引
+
+    每个扩展名文件夹在本次运行中只 makedirs 一次、scandir 一次，之后用
+    集合记录已占用的文件名，用计数器记住每个 (文件名, 扩展名) 下一个可用的
+    _N 序号，分配名字不再需要逐个 os.path.exists 探测。
+
+    索引只反映本进程的写入，运行期间不要让其他程序往输出目录写同名文件。
+    create=False 时不创建文件夹（演练时使用），不存在的文件夹视为空。
+    virtual=True 时 dest 只是归档内的路径前缀，既不创建也不读取任何文件夹。
+    """
+
+    def __init__(self, dest, create=True, virtual=False):
+        self.dest = dest
+        self.create = create and not virtual
+        self.virtual = virtual
+        self._lock = threading.Lock()
+        self._names = {}      # 文件夹路径 -> 已占用文件名集合（normcase 后）
+        self._counters = {}   # (文件夹路径, 主名, 扩展名) -> 下一个序号
+
+    def folder(self, file_ext):
+        """返回扩展名对应的文件夹路径，首次使用时创建并读取已有文件名"""
+        path = os.path.join(self.dest, ext_folder_name(file_ext))
+        with self._lock:
+            self._load(path)
+        return path
+
+    def _load(self, path):
+        # 调用方持有 self._lock
+        if path in self._names:
+            return
+        if self.virtual:
+            self._names[path] = set()
+            return
+        if self.create:
+            os.makedirs(path, exist_ok=True)
+        elif not os.path.isdir(path):
+            self._names[path] = set()
+            return
+        with os.scandir(path) as it:
+            self._names[path] = {os.path.normcase(entry.name) for entry in it}
+
+    def allocate(self, file_ext, filename):
+        """为文件分配目标路径，重名时追加 _1、_2 等后缀（线程安全）"""
+        folder = os.path.join(self.dest, ext_folder_name(file_ext))
+        with self._lock:
+            self._load(folder)
+            names = self._names[folder]
+
+            key = os.path.normcase(filename)
+            if key not in names:
+                names.add(key)
+                return os.path.join(folder, filename)
+
+            # 处理重名文件：从上次用到的序号继续往后找
+            base, ext = split_name(filename, file_ext)
+            counter_key = (folder, os.path.normcase(base), os.path.normcase(ext))
+            counter = self._counters.get(counter_key, 1)
+            while True:
+                new_filename = f"{base}_{counter}{ext}"
+                key = os.path.normcase(new_filename)
+                counter += 1
+                if key not in names:
+                    break
+            names.add(key)
+            self._counters[counter_key] = counter
+            return os.path.join(folder, new_filename)
+
+    def reserve(self, path):
+        """占用指定的目标路径（按计划执行时使用），已被占用时返回 False"""
+        folder, filename = os.path.split(path)
+        with self._lock:
+            self._load(folder)
+            names = self._names[folder]
+            key = os.path.normcase(filename)
+            if key in names:
+                return False
+            names.add(key)
+            return True
+
+    def release(self, path):
+        """释放分配了但没有写出文件的路径（复制失败时调用）"""
+        if not self.virtual and os.path.exists(path):
+            return
+        folder, filename = os.path.split(path)
+        with self._lock:
+            names = self._names.get(folder)
+            if names is not None:
+                names.discard(os.path.normcase(filename))
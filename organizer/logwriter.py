@@ -0,0 +1,160 @@
+# 作者：AleOsh
+# 日志写入：独立写线程批量写文件，支持日志级别和按大小滚动压缩
+
+import os
+import threading
+import time
+from queue import Queue, Empty
+
+# 日志级别：DEBUG 为逐个文件的明细（找到文件/源路径/已复制到）
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 20
+
+_STOP = object()
+
+
+def parse_level(name):
+    """把 'info' 等级别名转换为数值"""
+    try:
+        return LEVELS[name.lower()]
+    except KeyError:
+        raise ValueError(f"未知的日志级别: {name}") from None
+
+
+class LogWriter:
+    """后台日志写入器
+
+    write() 只把消息放入队列，由一个专用线程批量写入文件，一批只 flush
+    一次，不再每条消息都打开/关闭文件。当前文件超过 max_bytes 时压缩为
+    <日志名>.1.gz、.2.gz ... 保存在同一目录，只保留最近 backup_count 个。
+    """
+
+    def __init__(self, log_dir, level=DEBUG, max_bytes=DEFAULT_MAX_BYTES,
+                 backup_count=DEFAULT_BACKUP_COUNT, batch_size=1000):
+        self.log_dir = log_dir
+        self.level = level
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.log_file = None
+
+        self._queue = Queue()
+        self._thread = None
+        self._file = None
+        self._part = 0
+        self._time_cache = (None, "")
+
+    def open(self):
+        """创建日志文件并启动写线程，返回日志文件路径"""
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        # 设置日志文件路径
+        current_time = time.strftime("%Y-%m-%d_%H-%M-%S")
+        self.log_file = os.path.join(self.log_dir, f"organize_{current_time}.log")
+
+        # 创建日志文件
+        self._file = open(self.log_file, 'w', encoding='utf-8')
+        self._file.write(f"文件整理工具日志 - {current_time}\n")
+        self._file.write("-" * 50 + "\n\n")
+        self._file.flush()
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        return self.log_file
+
+    def enabled(self, level):
+        """该级别的消息是否会被记录"""
+        return level >= self.level
+
+    def write(self, message, level=INFO, timestamp=None):
+        """记录一条日志（线程安全，不阻塞）"""
+        if level < self.level or self._thread is None:
+            return
+        self._queue.put((timestamp or time.time(), message))
+
+    def flush(self):
+        """等待队列中已有的日志全部写入文件"""
+        if self._thread is not None:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        """写完剩余日志并关闭文件"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    # ---- 写线程 ----
+
+    def _format_time(self, timestamp):
+        # 同一秒内的消息复用格式化结果
+        second = int(timestamp)
+        if self._time_cache[0] != second:
+            self._time_cache = (second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)))
+        return self._time_cache[1]
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = [item]
+            # 一次取出队列中已有的消息，合并成一次写入
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+
+            lines = []
+            waiters = []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    timestamp, message = item
+                    lines.append(f"[{self._format_time(timestamp)}] {message}\n")
+
+            try:
+                if lines:
+                    self._file.write("".join(lines))
+                    self._file.flush()
+                    if self.max_bytes and self._file.tell() >= self.max_bytes:
+                        self._rotate()
+            except Exception as e:
+                print(f"写入日志时出错: {str(e)}")
+
+            for waiter in waiters:
+                waiter.set()
+
+        self._file.close()
+
+    def _rotate(self):
+        """压缩当前日志文件并重新开始写"""
+        import gzip
+        import shutil
+        self._file.close()
+        self._part += 1
+        archive = f"{self.log_file}.{self._part}.gz"
+        with open(self.log_file, 'rb') as src, gzip.open(archive, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+
+        # 只保留最近 backup_count 个压缩文件
+        expired = self._part - self.backup_count
+        if expired > 0:
+            try:
+                os.remove(f"{self.log_file}.{expired}.gz")
+            except OSError:
+                pass
+
+        self._file = open(self.log_file, 'w', encoding='utf-8')
@@ -0,0 +1,179 @@
+# 作者：AleOsh
+# 输出目录清单：记录每个源文件（路径、大小、修改时间）复制到了哪里，重复运行时只处理新增或变化的文件
+
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+from .copier import partial_path
+
+MANIFEST_NAME = "manifest.db"
+# 重新复制时保存上一条完成记录的列，复制失败时恢复
+_PREVIOUS_COLUMNS = (("prev_size", "INTEGER"), ("prev_mtime_ns", "INTEGER"), ("prev_dest", "TEXT"))
+
+
+def _unchanged(path, size, mtime_ns):
+    """path 的大小和修改时间是否仍与记录相同"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and st.st_mtime_ns == mtime_ns
+
+
+class Manifest:
+    """保存在输出目录中的 SQLite 清单
+
+    复制前先登记一条“进行中”的记录，复制完成后标记为完成。启动时全部
+    完成记录读入内存，判断文件是否需要处理只是一次字典查找。上次运行被
+    取消或中途崩溃留下的“进行中”记录由 recover() 处理：目标文件完整的补记
+    为完成，不完整的删除后重新复制，从而实现断点续传。重新复制已完成过
+    的文件时保留上一条完成记录，失败或中断后恢复，上次的副本仍然有效。
+
+    readonly=True 时以只读方式打开已有清单（演练时使用），不能再登记。
+    """
+
+    def __init__(self, db_path, readonly=False):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if readonly:
+            # immutable：不加锁，也不创建 -wal / -shm 文件
+            self._conn = sqlite3.connect(
+                f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro&immutable=1",
+                uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            # WAL 模式下每次提交只是追加写，进程崩溃也不会丢已提交的记录
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " src TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " dest TEXT, done INTEGER)")
+            # 旧版本创建的清单没有这几列
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+            for name, column_type in _PREVIOUS_COLUMNS:
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE files ADD COLUMN {name} {column_type}")
+            self._conn.commit()
+
+        self._entries = {}
+        # 目标路径 -> 记录到它的源文件数；去重时多个源文件共用一个副本
+        self._dest_refs = {}
+        for src, size, mtime_ns, dest in self._conn.execute(
+                "SELECT src, size, mtime_ns, dest FROM files WHERE done = 1"):
+            self._set_entry(src, (size, mtime_ns, dest))
+
+    def _set_entry(self, src, entry):
+        # 调用方持有 self._lock（构造时除外）
+        old = self._entries.get(src)
+        if old is not None:
+            refs = self._dest_refs[old[2]] - 1
+            if refs:
+                self._dest_refs[old[2]] = refs
+            else:
+                del self._dest_refs[old[2]]
+        self._entries[src] = entry
+        self._dest_refs[entry[2]] = self._dest_refs.get(entry[2], 0) + 1
+
+    def recover(self):
+        """处理上次未完成的记录，返回 (补记完成数, 清理的不完整文件数)"""
+        completed = removed = 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT src, size, mtime_ns, dest, prev_size, prev_mtime_ns, prev_dest"
+                " FROM files WHERE done = 0").fetchall()
+            for src, size, mtime_ns, dest, prev_size, prev_mtime_ns, prev_dest in rows:
+                # 覆盖上次的副本时先写的临时文件，写到一半中断时留下
+                try:
+                    os.remove(partial_path(dest))
+                except OSError:
+                    pass
+                try:
+                    st = os.stat(dest)
+                except OSError:
+                    st = None
+                # copy2 最后才写入修改时间，大小和修改时间都一致说明已复制完
+                if st is not None and st.st_size == size and st.st_mtime_ns == mtime_ns:
+                    self._conn.execute("UPDATE files SET done = 1, prev_size = NULL,"
+                                       " prev_mtime_ns = NULL, prev_dest = NULL WHERE src = ?",
+                                       (src,))
+                    self._set_entry(src, (size, mtime_ns, dest))
+                    completed += 1
+                    continue
+                if prev_dest is not None and _unchanged(prev_dest, prev_size, prev_mtime_ns):
+                    # 重新复制时中断，上次的副本没有被改动过：恢复上一条完成记录
+                    self._restore(src, prev_size, prev_mtime_ns, prev_dest)
+                    self._set_entry(src, (prev_size, prev_mtime_ns, prev_dest))
+                    continue
+                if st is not None:
+                    try:
+                        os.remove(dest)
+                        removed += 1
+                    except OSError:
+                        pass
+                self._conn.execute("DELETE FROM files WHERE src = ?", (src,))
+            self._conn.commit()
+        return completed, removed
+
+    def is_current(self, src, st):
+        """源文件是否已复制过且之后没有变化"""
+        entry = self._entries.get(src)
+        return entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+
+    def previous_dest(self, src):
+        """源文件上次复制到的位置，没有记录时返回 None
+
+        去重时与其他源文件共用的副本不返回：覆盖它会改掉其他源文件的副本。
+        """
+        entry = self._entries.get(src)
+        if entry is None or self._dest_refs.get(entry[2], 0) > 1:
+            return None
+        return entry[2]
+
+    def begin(self, src, st, dest):
+        """登记即将开始复制的文件，已有的完成记录保存到 prev_* 列"""
+        with self._lock:
+            previous = self._entries.get(src, (None, None, None))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files"
+                " (src, size, mtime_ns, dest, done, prev_size, prev_mtime_ns, prev_dest)"
+                " VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (src, st.st_size, st.st_mtime_ns, dest) + tuple(previous))
+            self._conn.commit()
+
+    def finish(self, src, st, dest):
+        """标记文件已复制完成（随下一次提交一起写入）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (src, size, mtime_ns, dest, done)"
+                " VALUES (?, ?, ?, ?, 1)",
+                (src, st.st_size, st.st_mtime_ns, dest))
+            self._set_entry(src, (st.st_size, st.st_mtime_ns, dest))
+
+    def abort(self, src):
+        """复制失败，删除登记；重新复制的文件恢复上一条完成记录"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT prev_size, prev_mtime_ns, prev_dest FROM files WHERE src = ? AND done = 0",
+                (src,)).fetchone()
+            if row is None:
+                return
+            if row[2] is None:
+                self._conn.execute("DELETE FROM files WHERE src = ?", (src,))
+            else:
+                self._restore(src, *row)
+            self._conn.commit()
+
+    def _restore(self, src, size, mtime_ns, dest):
+        # 调用方持有 self._lock；只改数据库，begin() 不改内存中的记录
+        self._conn.execute(
+            "UPDATE files SET size = ?, mtime_ns = ?, dest = ?, done = 1, prev_size = NULL,"
+            " prev_mtime_ns = NULL, prev_dest = NULL WHERE src = ?",
+            (size, mtime_ns, dest, src))
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
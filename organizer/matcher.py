@@ -0,0 +1,131 @@
+# 作者：AleOsh
+# 文件匹配器：把选择的文件类型和过滤条件预先编译好，逐个文件匹配时只做最少的工作
+
+import fnmatch
+import re
+from datetime import datetime
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def normalize_ext(ext):
+    """统一扩展名格式：小写并带前导点，如 'JPG' -> '.jpg'，'tar.gz' -> '.tar.gz'"""
+    ext = ext.strip().lower()
+    if not ext.startswith('.'):
+        ext = '.' + ext
+    return ext
+
+
+def parse_size(text):
+    """解析文件大小，支持 500、10K、1.5M、2G 等写法，返回字节数"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", text.upper())
+    if not match:
+        raise ValueError(f"无法识别的文件大小: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def parse_time(text):
+    """解析时间，支持 2025-01-05 或 2025-01-05 12:00:00，返回时间戳"""
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"无法识别的时间: {text}") from None
+
+
+class FileMatcher:
+    """预编译的文件匹配器
+
+    扩展名用集合查找，与所选类型数量无关，且按完整后缀比较（"peg" 不会
+    匹配 ".jpeg"），支持 ".tar.gz" 这类多段扩展名。其余条件可选，按开销从
+    小到大依次检查：扩展名 → 文件名通配符/正则 → 大小/修改时间（需要 stat）。
+    """
+
+    def __init__(self, file_types, min_size=None, max_size=None,
+                 newer_than=None, older_than=None,
+                 globs=None, exclude_globs=None, regex=None):
+        self.extensions = frozenset(normalize_ext(ext) for ext in file_types if ext.strip())
+        if not self.extensions:
+            raise ValueError("请至少选择一种文件类型")
+        # 最多需要检查的后缀段数，如 ".tar.gz" 为 2
+        self._max_parts = max(ext.count('.') for ext in self.extensions)
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.newer_than = newer_than
+        self.older_than = older_than
+        self._needs_stat = any(v is not None for v in (min_size, max_size, newer_than, older_than))
+
+        # 多个通配符合并成一个正则，只匹配一次
+        self._include = self._compile_globs(globs)
+        self._exclude = self._compile_globs(exclude_globs)
+        self._regex = re.compile(regex) if regex else None
+
+    @property
+    def needs_stat(self):
+        """是否有需要 stat 的条件（大小、修改时间）"""
+        return self._needs_stat
+
+    def name_key(self):
+        """只按文件名判断的条件（扩展名、通配符、正则）的文字描述，条件相同时相同"""
+        return repr((sorted(self.extensions),
+                     self._include.pattern if self._include is not None else None,
+                     self._exclude.pattern if self._exclude is not None else None,
+                     self._regex.pattern if self._regex is not None else None))
+
+    @staticmethod
+    def _compile_globs(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join(fnmatch.translate(p) for p in patterns), re.IGNORECASE)
+
+    def match_ext(self, name):
+        """返回文件名匹配到的扩展名（小写带点），不匹配返回 None，多段扩展名优先"""
+        lower = name.lower()
+        matched = None
+        pos = len(lower)
+        for _ in range(self._max_parts):
+            pos = lower.rfind('.', 0, pos)
+            # 与 os.path.splitext 一致：以点开头的隐藏文件名不算扩展名
+            if pos <= 0:
+                break
+            suffix = lower[pos:]
+            if suffix in self.extensions:
+                matched = suffix
+        return matched
+
+    def match(self, name, stat=None):
+        """检查文件是否符合全部条件，返回扩展名或 None
+
+        stat 为无参可调用对象（如 DirEntry.stat），只有设置了大小或时间条件
+        且前面的条件都通过时才会调用。
+        """
+        ext = self.match_ext(name)
+        if ext is None:
+            return None
+
+        if self._include is not None and not self._include.match(name):
+            return None
+        if self._exclude is not None and self._exclude.match(name):
+            return None
+        if self._regex is not None and not self._regex.search(name):
+            return None
+
+        if self._needs_stat and stat is not None:
+            try:
+                st = stat()
+            except OSError:
+                return None
+            if self.min_size is not None and st.st_size < self.min_size:
+                return None
+            if self.max_size is not None and st.st_size > self.max_size:
+                return None
+            if self.newer_than is not None and st.st_mtime < self.newer_than:
+                return None
+            if self.older_than is not None and st.st_mtime > self.older_than:
+                return None
+
+        return ext
+
+    def match_entry(self, entry):
+        """匹配 os.DirEntry，复用其缓存的 stat 结果"""
+        return self.match(entry.name, entry.stat)
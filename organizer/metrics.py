@@ -0,0 +1,154 @@
+# 作者：AleOsh
+# 运行统计：各阶段耗时、stat 次数、队列深度、最慢的文件，结束时可保存为 JSON
+
+import heapq
+import os
+import threading
+import time
+
+# 阶段名称：遍历目录、匹配文件、分配目标名、去重比较、复制、写日志
+STAGE_WALK = "walk"
+STAGE_MATCH = "match"
+STAGE_ALLOCATE = "allocate"
+STAGE_DEDUPE = "dedupe"
+STAGE_COPY = "copy"
+STAGE_LOG = "log"
+STAGES = (STAGE_WALK, STAGE_MATCH, STAGE_ALLOCATE, STAGE_DEDUPE, STAGE_COPY, STAGE_LOG)
+
+STAGE_LABELS = {
+    STAGE_WALK: "遍历",
+    STAGE_MATCH: "匹配",
+    STAGE_ALLOCATE: "分配",
+    STAGE_DEDUPE: "去重",
+    STAGE_COPY: "复制",
+    STAGE_LOG: "日志",
+}
+
+# 保留多少个最慢的文件
+DEFAULT_SLOWEST = 10
+
+
+class RunMetrics:
+    """一次运行的计数器和分阶段计时（线程安全）
+
+    各阶段时间是所有线程累加的时间，多线程复制时总和可能超过墙钟时间，
+    看比例即可。
+    """
+
+    def __init__(self, slowest=DEFAULT_SLOWEST):
+        self.slowest_count = slowest
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self._stage_calls = dict.fromkeys(STAGES, 0)
+        self.stat_calls = 0
+        self.copies = 0
+        self.copy_seconds = 0.0
+        self._slowest = []       # 小顶堆：(耗时, 源路径, 目标路径)
+        self.queue_max = 0
+        self._queue_total = 0
+        self._queue_samples = 0
+
+    def add_time(self, stage, seconds):
+        """累计某个阶段的耗时"""
+        with self._lock:
+            self._stage_seconds[stage] += seconds
+            self._stage_calls[stage] += 1
+
+    def timed(self, stage, iterable):
+        """包装迭代器，把每次取下一项的时间计入 stage"""
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, clock() - start)
+                return
+            self.add_time(stage, clock() - start)
+            yield item
+
+    def count_stat(self, n=1):
+        with self._lock:
+            self.stat_calls += n
+
+    def record_copy(self, src_path, dst_path, seconds):
+        """记录一次复制的耗时，并保留最慢的几个文件"""
+        with self._lock:
+            self._stage_seconds[STAGE_COPY] += seconds
+            self._stage_calls[STAGE_COPY] += 1
+            self.copies += 1
+            self.copy_seconds += seconds
+            item = (seconds, src_path, dst_path)
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, item)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def sample_queue(self, depth):
+        """记录一次流水线队列深度"""
+        with self._lock:
+            if depth > self.queue_max:
+                self.queue_max = depth
+            self._queue_total += depth
+            self._queue_samples += 1
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def stage_shares(self):
+        """各阶段耗时占比（0~1）"""
+        with self._lock:
+            total = sum(self._stage_seconds.values())
+            if not total:
+                return dict.fromkeys(STAGES, 0.0)
+            return {stage: seconds / total for stage, seconds in self._stage_seconds.items()}
+
+    def snapshot(self, files=0, bytes_done=0, include_slowest=True):
+        """当前统计的字典形式，files、bytes_done 由引擎提供"""
+        elapsed = self.elapsed()
+        with self._lock:
+            stages = {stage: {"seconds": round(self._stage_seconds[stage], 6),
+                              "calls": self._stage_calls[stage]}
+                      for stage in STAGES}
+            data = {
+                "elapsed_seconds": round(elapsed, 3),
+                "files": files,
+                "bytes": bytes_done,
+                "files_per_sec": round(files / elapsed, 2) if elapsed > 0 else 0.0,
+                "bytes_per_sec": round(bytes_done / elapsed, 2) if elapsed > 0 else 0.0,
+                "stat_calls": self.stat_calls,
+                "queue_depth": {
+                    "max": self.queue_max,
+                    "avg": round(self._queue_total / self._queue_samples, 2)
+                    if self._queue_samples else 0.0,
+                },
+                "copy": {
+                    "count": self.copies,
+                    "avg_seconds": round(self.copy_seconds / self.copies, 6) if self.copies else 0.0,
+                },
+                "stages": stages,
+            }
+            slowest = sorted(self._slowest, reverse=True) if include_slowest else []
+        if include_slowest:
+            data["slowest_files"] = [
+                {"path": src, "dest": dst, "seconds": round(seconds, 6), "bytes": _size(dst)}
+                for seconds, src, dst in slowest]
+        return data
+
+    def write_json(self, path, files=0, bytes_done=0, **extra):
+        """把统计写入 JSON 文件，extra 中的字段（运行参数、结果摘要）一并写入"""
+        import json
+        data = dict(extra)
+        data.update(self.snapshot(files=files, bytes_done=bytes_done))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
@@ -0,0 +1,102 @@
+# 作者：AleOsh
+# 复制顺序：先搜索后复制模式下，按磁盘上的位置而不是扫描顺序读取源文件，减少机械硬盘和阵列的寻道
+
+import errno
+import os
+import struct
+import sys
+
+try:
+    import fcntl
+except ImportError:      # Windows
+    fcntl = None
+
+ORDER_SCAN = "scan"              # 扫描顺序（与 os.walk 相同）
+ORDER_INODE = "inode"            # 按 inode 号
+ORDER_EXTENT = "extent"          # 按第一个数据块的物理位置（FIEMAP），不支持时按 inode
+ORDER_DIRECTORY = "directory"    # 按目录的 inode 号逐个目录处理，目录内保持扫描顺序
+ORDER_SMALL_FIRST = "small_first"  # 小文件优先，尽早完成大部分文件
+ORDERS = (ORDER_SCAN, ORDER_INODE, ORDER_EXTENT, ORDER_DIRECTORY, ORDER_SMALL_FIRST)
+
+# FIEMAP ioctl，见 <linux/fiemap.h>
+FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_HEADER = struct.Struct("=QQIIII")        # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+_FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")     # fe_logical, fe_physical, fe_length, 保留 x2, fe_flags, 保留 x3
+_FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+# 文件系统不支持 FIEMAP 时的错误
+_UNSUPPORTED = {errno.ENOTTY, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL}
+
+
+def physical_offset(path):
+    """文件第一个数据块在磁盘上的字节位置；空文件返回 0，不支持 FIEMAP 时抛出 OSError"""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError("当前系统不支持 FIEMAP")
+    request = bytearray(_FIEMAP_HEADER.pack(0, _FIEMAP_MAX_OFFSET, 0, 0, 1, 0))
+    request += bytes(_FIEMAP_EXTENT.size)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, request)
+    finally:
+        os.close(fd)
+    mapped = _FIEMAP_HEADER.unpack_from(request)[3]
+    if not mapped:
+        return 0
+    return _FIEMAP_EXTENT.unpack_from(request, _FIEMAP_HEADER.size)[1]
+
+
+def order_files(files, order, on_fallback=None):
+    """按 order 重新排列 ScanPlan 中的文件，产生 (路径, 扩展名, 大小)
+
+    除 ORDER_SCAN 外需要把整个列表读入内存排序。ORDER_EXTENT 对每个文件做
+    一次 FIEMAP，遇到不支持的文件系统（tmpfs、网络盘等）时改为按 inode，
+    并调用 on_fallback(错误)。
+    """
+    if order == ORDER_SCAN:
+        yield from files
+        return
+    if order not in ORDERS:
+        raise ValueError(f"未知的复制顺序: {order}")
+
+    records = list(files.records())
+    if order == ORDER_SMALL_FIRST:
+        # 同样大小时保持扫描顺序
+        records.sort(key=lambda record: record[2])
+    elif order == ORDER_INODE:
+        records.sort(key=lambda record: record[3])
+    elif order == ORDER_DIRECTORY:
+        dir_keys = {}
+        records.sort(key=lambda record: _directory_key(record[0], dir_keys))
+    else:
+        try:
+            records.sort(key=_extent_key)
+        except OSError as e:
+            if on_fallback is not None:
+                on_fallback(e)
+            records.sort(key=lambda record: record[3])
+
+    for path, file_ext, size, _inode in records:
+        yield path, file_ext, size
+
+
+def _directory_key(path, dir_keys):
+    # 同一目录的文件排在一起，目录之间按目录 inode 排列
+    folder = os.path.dirname(path)
+    key = dir_keys.get(folder)
+    if key is None:
+        try:
+            key = os.stat(folder).st_ino
+        except OSError:
+            key = 0
+        key = dir_keys[folder] = (key, len(dir_keys))
+    return key
+
+
+def _extent_key(record):
+    path, _ext, _size, inode = record
+    try:
+        return physical_offset(path), inode
+    except OSError as e:
+        # 文件在扫描后被删除不影响整体排序；文件系统不支持时整体改用 inode
+        if e.errno is None or e.errno in _UNSUPPORTED:
+            raise
+        return 0, inode
@@ -0,0 +1,240 @@
+# 作者：AleOsh
+# 源文件夹中归档内的文件：只读 zip 的中央目录或 tar 的成员头建立索引，不解压；
+# 匹配到的文件直接从归档中流式读出。索引按 (路径, 大小, 修改时间) 缓存，归档没变就不再解析
+
+import json
+import os
+import sqlite3
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from urllib.request import pathname2url
+
+PACKED_INDEX_NAME = "packed_index.db"
+
+FORMAT_ZIP = "zip"
+FORMAT_TAR = "tar"
+FORMAT_TGZ = "tar.gz"
+FORMAT_TBZ = "tar.bz2"
+FORMAT_TXZ = "tar.xz"
+
+# 按文件名后缀识别归档，长后缀在前
+_SUFFIXES = ((".tar.gz", FORMAT_TGZ), (".tgz", FORMAT_TGZ),
+             (".tar.bz2", FORMAT_TBZ), (".tbz2", FORMAT_TBZ),
+             (".tar.xz", FORMAT_TXZ), (".txz", FORMAT_TXZ),
+             (".tar", FORMAT_TAR), (".zip", FORMAT_ZIP))
+
+# 读取索引失败时的异常
+INDEX_ERRORS = (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError)
+
+
+def packed_format(name):
+    """按文件名判断归档格式，不是支持的归档时返回 None"""
+    lower = name.lower()
+    for suffix, fmt in _SUFFIXES:
+        if lower.endswith(suffix):
+            return fmt
+    return None
+
+
+def packed_path(archive_path, name):
+    """归档内文件的虚拟路径（归档路径 + 成员名），用于日志、清单和计划"""
+    return os.path.join(archive_path, *[part for part in name.split("/") if part not in ("", ".")])
+
+
+class PackedStat(namedtuple("PackedStat", "st_size st_mtime_ns st_mode")):
+    """归档内文件的 stat 结果，只有过滤条件和清单用到的字段"""
+
+    __slots__ = ()
+
+    @property
+    def st_mtime(self):
+        return self.st_mtime_ns / 1e9
+
+
+class PackedFile(namedtuple("PackedFile", "name size mtime_ns mode offset")):
+    """归档内的一个普通文件；offset 为 zip 的本地文件头位置或 tar 中数据的位置，按它排序即顺序读取"""
+
+    __slots__ = ()
+
+    @property
+    def basename(self):
+        return self.name.rstrip("/").rsplit("/", 1)[-1]
+
+    def stat(self):
+        return PackedStat(self.size, self.mtime_ns, self.mode)
+
+
+def index_archive(path, fmt):
+    """列出归档内的普通文件，按 offset 排列
+
+    zip 只读中央目录；未压缩的 tar 逐个读成员头并跳过数据，压缩的 tar 只能
+    整个解压一遍，但同样只解析成员头。目录、链接和加密的 zip 成员不列出。
+    """
+    files = []
+    if fmt == FORMAT_ZIP:
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                mode = info.external_attr >> 16
+                file_type = stat.S_IFMT(mode)
+                # 只记了权限位、没有文件类型的成员也当作普通文件
+                if info.is_dir() or info.flag_bits & 0x1 or file_type not in (0, stat.S_IFREG):
+                    continue
+                try:
+                    mtime = time.mktime(info.date_time + (0, 0, -1))
+                except (OverflowError, ValueError):
+                    mtime = 0
+                files.append(PackedFile(info.filename, info.file_size, int(mtime * 1e9),
+                                        stat.S_IMODE(mode) or 0o644, info.header_offset))
+    else:
+        with tarfile.open(path, "r:*") as tf:
+            info = tf.next()
+            while info is not None:
+                if info.isreg():
+                    files.append(PackedFile(info.name, info.size, int(info.mtime * 1e9),
+                                            info.mode, info.offset_data))
+                # TarFile 会保留读过的每个 TarInfo，成员很多时清掉以节省内存
+                tf.members = []
+                info = tf.next()
+    files.sort(key=lambda packed: packed.offset)
+    return files
+
+
+class PackedIndexCache:
+    """归档索引的缓存，以 (路径, 大小, 修改时间) 判断归档是否变化
+
+    db_path 为 None 时只在内存中缓存；readonly=True 时以只读方式打开已有的
+    缓存（演练时使用），新建的索引只保存在内存中。
+    """
+
+    def __init__(self, db_path=None, readonly=False):
+        self.db_path = db_path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._conn = None
+        if db_path is None:
+            return
+        if readonly:
+            self._conn = sqlite3.connect(
+                f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro&immutable=1",
+                uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS archives ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " format TEXT, files TEXT)")
+            self._conn.commit()
+
+    def get(self, path, st, fmt):
+        """返回缓存的文件列表，没有缓存或归档已变化时为 None"""
+        key = (st.st_size, st.st_mtime_ns, fmt)
+        with self._lock:
+            cached = self._memory.get(path)
+            if cached is not None:
+                return cached[1] if cached[0] == key else None
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, format, files FROM archives WHERE path = ?",
+                (path,)).fetchone()
+        if row is None or tuple(row[:3]) != key:
+            return None
+        return [PackedFile(*item) for item in json.loads(row[3])]
+
+    def put(self, path, st, fmt, files):
+        """保存归档的文件列表"""
+        with self._lock:
+            self._memory[path] = ((st.st_size, st.st_mtime_ns, fmt), files)
+            if self._conn is not None and not self.readonly:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO archives (path, size, mtime_ns, format, files)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (path, st.st_size, st.st_mtime_ns, fmt,
+                     json.dumps(files, ensure_ascii=False)))
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Limited:
+    """只能读出 size 字节的文件对象"""
+
+    def __init__(self, f, size):
+        self._file = f
+        self._remaining = size
+
+    def read(self, n=-1):
+        if n < 0 or n > self._remaining:
+            n = self._remaining
+        parts = []
+        while n:
+            data = self._file.read(n)
+            if not data:
+                break
+            parts.append(data)
+            n -= len(data)
+            self._remaining -= len(data)
+        return b"".join(parts)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PackedReader:
+    """从一个归档中依次读出文件；按 offset 顺序读取时整个归档只顺序读一遍
+
+    open() 返回的文件对象在打开下一个文件前有效。
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.format = fmt
+        self._zip = None
+        self._stream = None
+        if fmt == FORMAT_ZIP:
+            self._zip = zipfile.ZipFile(path)
+        elif fmt == FORMAT_TGZ:
+            import gzip
+            self._stream = gzip.open(path, 'rb')
+        elif fmt == FORMAT_TBZ:
+            import bz2
+            self._stream = bz2.open(path, 'rb')
+        elif fmt == FORMAT_TXZ:
+            import lzma
+            self._stream = lzma.open(path, 'rb')
+        else:
+            self._stream = open(path, 'rb')
+
+    def open(self, packed):
+        if self._zip is not None:
+            return self._zip.open(packed.name)
+        # 压缩流往后 seek 只是解压并丢弃中间的数据，往前 seek 要从头解压
+        self._stream.seek(packed.offset)
+        return _Limited(self._stream, packed.size)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        if self._stream is not None:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,114 @@
+# 作者：AleOsh
+# 先搜索后复制模式的待复制列表：紧凑二进制记录，目录只存一次，超过阈值后转存到临时文件
+
+import os
+import struct
+
+# 内存中缓冲多少字节的记录后转存到临时文件（约 100 万个文件）
+DEFAULT_SPILL_BYTES = 64 * 1024 * 1024
+
+# 记录格式：目录记录 b'D' + 长度 + 路径；文件记录 b'F' + 名字长度 + 扩展名序号 + 大小 + inode + 名字
+_DIR = struct.Struct("<cI")
+_FILE = struct.Struct("<cHHQQ")
+_DIR_TAG = b'D'
+_FILE_TAG = b'F'
+
+
+class ScanPlan:
+    """按扫描顺序保存 (路径, 扩展名, 大小, inode) 的列表
+
+    同一目录下的文件只记录一次目录路径，文件本身只占十几个字节加文件名，
+    扩展名用序号代替。缓冲区超过 spill_bytes 后整块写入临时文件，内存占用
+    与文件总数无关。遍历时按原顺序先读临时文件再读缓冲区。
+    """
+
+    def __init__(self, spill_bytes=DEFAULT_SPILL_BYTES, tmp_dir=None):
+        self.spill_bytes = spill_bytes
+        self.tmp_dir = tmp_dir
+        self.count = 0
+        self.total_bytes = 0
+        self._buffer = bytearray()
+        self._exts = []          # 序号 -> 扩展名
+        self._ext_ids = {}       # 扩展名 -> 序号
+        self._last_dir = None
+        self._spill = None       # 临时文件
+        self._segments = []      # 已写入临时文件的每块长度
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def spilled(self):
+        """是否已转存到临时文件"""
+        return self._spill is not None
+
+    def add(self, dirpath, name, file_ext, size, inode=0):
+        """追加一个文件；inode 供按磁盘位置排序使用"""
+        if dirpath != self._last_dir:
+            encoded = os.fsencode(dirpath)
+            self._buffer += _DIR.pack(_DIR_TAG, len(encoded))
+            self._buffer += encoded
+            self._last_dir = dirpath
+
+        ext_id = self._ext_ids.get(file_ext)
+        if ext_id is None:
+            ext_id = self._ext_ids[file_ext] = len(self._exts)
+            self._exts.append(file_ext)
+
+        encoded = os.fsencode(name)
+        self._buffer += _FILE.pack(_FILE_TAG, len(encoded), ext_id, size, inode)
+        self._buffer += encoded
+        self.count += 1
+        self.total_bytes += size
+
+        if len(self._buffer) >= self.spill_bytes:
+            self._flush()
+
+    def _flush(self):
+        if self._spill is None:
+            import tempfile
+            self._spill = tempfile.TemporaryFile(prefix="file_organizer_plan_", dir=self.tmp_dir)
+        self._spill.write(self._buffer)
+        self._segments.append(len(self._buffer))
+        self._buffer = bytearray()
+
+    def __iter__(self):
+        """按添加顺序产生 (路径, 扩展名, 大小)"""
+        for path, file_ext, size, _inode in self.records():
+            yield path, file_ext, size
+
+    def records(self):
+        """按添加顺序产生 (路径, 扩展名, 大小, inode)"""
+        state = [None]   # 当前目录，跨块延续
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.seek(0)
+            for length in self._segments:
+                # 每次只读回一块，内存占用不超过 spill_bytes
+                yield from self._parse(self._spill.read(length), state)
+            self._spill.seek(0, os.SEEK_END)
+        yield from self._parse(bytes(self._buffer), state)
+
+    def _parse(self, data, state):
+        view = memoryview(data)
+        offset = 0
+        exts = self._exts
+        while offset < len(view):
+            if view[offset] == _DIR_TAG[0]:
+                _tag, length = _DIR.unpack_from(view, offset)
+                offset += _DIR.size
+                state[0] = os.fsdecode(view[offset:offset + length].tobytes())
+            else:
+                _tag, length, ext_id, size, inode = _FILE.unpack_from(view, offset)
+                offset += _FILE.size
+                name = os.fsdecode(view[offset:offset + length].tobytes())
+                yield os.path.join(state[0], name), exts[ext_id], size, inode
+            offset += length
+
+    def close(self):
+        """释放缓冲区并删除临时文件"""
+        self._buffer = bytearray()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._segments = []
@@ -0,0 +1,128 @@
+# 作者：AleOsh
+# 多进程扫描：把源文件夹拆成若干子目录树，由进程池中的进程分别遍历并匹配，
+# 只把匹配到的文件以紧凑的元组批量传回；按拆分顺序拼接后与单进程遍历的结果相同
+
+import os
+from collections import namedtuple
+
+from .walker import TreeWalker
+
+# 默认扫描进程数：1 表示不用多进程
+DEFAULT_SCAN_PROCESSES = 1
+# 每个进程大约分到几棵子目录树，树的大小不均匀时分得越细越容易均衡
+SHARDS_PER_PROCESS = 4
+# 等待子进程结果时检查取消的间隔（秒）
+_POLL_SECONDS = 0.2
+
+# 子进程传回的大小和修改时间，供主进程查清单
+ScannedStat = namedtuple("ScannedStat", "st_size st_mtime_ns")
+
+
+def is_inside(path, dest):
+    """path 是否是输出目录或其子目录（与 OrganizeEngine.should_skip_directory 相同）"""
+    return os.path.abspath(path).startswith(os.path.abspath(dest))
+
+
+def dir_key(path):
+    """目录的 (设备号, inode)，取不到时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino) if st.st_ino else None
+
+
+def match_files(files, matcher, want_archives):
+    """匹配一个目录中的文件，返回 [(文件名, 扩展名, 大小, 修改时间 ns, inode)]
+
+    want_archives 为真时，没有匹配但看起来是归档的文件也列出（扩展名为 None），
+    由主进程决定是否查找其中的文件。stat 失败的文件大小、inode 记为 0，
+    修改时间记为 None。
+    """
+    if want_archives:
+        from .packed import packed_format
+    matches = []
+    for entry in files:
+        file_ext = matcher.match(entry.name, entry.stat)
+        if file_ext is None and not (want_archives and packed_format(entry.name)):
+            continue
+        try:
+            st = entry.stat()
+            size, mtime_ns, inode = st.st_size, st.st_mtime_ns, entry.inode()
+        except OSError:
+            size, mtime_ns, inode = 0, None, 0
+        matches.append((entry.name, file_ext, size, mtime_ns, inode))
+    return matches
+
+
+def scan_tree(task):
+    """在子进程中遍历一棵子目录树
+
+    返回 [(目录路径, 目录标识, 匹配结果, 跳过的输出目录列表)]，顺序与单线程
+    遍历相同；匹配结果的格式见 match_files()。
+    """
+    top, matcher, dest, follow_symlinks, want_archives = task
+    skipped = []
+
+    def skip_dir(path):
+        if is_inside(path, dest):
+            skipped.append(path)
+            return True
+        return False
+
+    walker = TreeWalker(follow_symlinks=follow_symlinks, skip_dir=skip_dir)
+    records = []
+    # 跳过的子目录在列出父目录时发现，记在父目录的结果里，主进程按同样的顺序记录日志
+    for path, files in walker.walk(top):
+        records.append((path, dir_key(path), match_files(files, matcher, want_archives),
+                        skipped[:]))
+        del skipped[:]
+    return records
+
+
+def scan_processes(top, matcher, dest, processes, follow_symlinks=False, want_archives=False,
+                   skip_dir=None, is_running=None):
+    """多进程遍历 top，按单线程遍历的顺序产生 (目录路径, 匹配结果, 跳过的输出目录列表)
+
+    先在本进程中按 TreeWalker.split() 拆分，拆分时列出的目录直接在本进程
+    匹配（跳过的目录由 skip_dir 处理），其余子目录树交给进程池。不同子树中
+    出现的同一目录（bind mount）按遍历顺序只保留第一次，与单线程遍历相同。
+    is_running() 为假时停止等待，已经开始的子进程做完手上的子树后退出。
+    """
+    from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+    walker = TreeWalker(follow_symlinks=follow_symlinks, skip_dir=skip_dir,
+                        is_running=is_running)
+    items = walker.split(top, processes * SHARDS_PER_PROCESS)
+    pool = ProcessPoolExecutor(max_workers=processes)
+    seen = set()
+    try:
+        futures = [None if files is not None else
+                   pool.submit(scan_tree, (path, matcher, dest, follow_symlinks, want_archives))
+                   for path, files in items]
+        for (path, files), future in zip(items, futures):
+            if future is None:
+                records = [(path, dir_key(path), match_files(files, matcher, want_archives), [])]
+            else:
+                while True:
+                    if is_running is not None and not is_running():
+                        return
+                    try:
+                        records = future.result(_POLL_SECONDS)
+                        break
+                    except FutureTimeout:
+                        continue
+            dropped = None
+            for record_path, key, matches, skipped in records:
+                if dropped is not None and (record_path == dropped
+                                            or record_path.startswith(dropped + os.sep)):
+                    continue
+                dropped = None
+                if key is not None:
+                    if key in seen:
+                        dropped = record_path
+                        continue
+                    seen.add(key)
+                yield record_path, matches, skipped
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
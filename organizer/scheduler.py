@@ -0,0 +1,287 @@
+# 作者：AleOsh
+# 多任务调度：任务排队后按优先级启动，同一块磁盘上同时运行的任务数有上限，不同磁盘上的任务并行
+
+import itertools
+import os
+import sys
+import threading
+import time
+
+from .events import EngineEvent, EVENT_PROGRESS, EVENT_JOB
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINAL_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "排队中",
+    JOB_RUNNING: "运行中",
+    JOB_DONE: "已完成",
+    JOB_FAILED: "失败",
+    JOB_CANCELLED: "已取消",
+}
+
+# 默认每块磁盘同时运行的任务数：机械硬盘上两个任务交替读写会频繁寻道
+DEFAULT_PER_DEVICE = 1
+
+
+def device_key(path):
+    """path 所在的磁盘标识
+
+    Linux 上把分区归到整块磁盘（同一块硬盘的两个分区共用磁头），其他系统
+    或查不到时使用 st_dev。路径还不存在时取最近的已存在上级目录。
+    """
+    path = os.path.abspath(path)
+    while True:
+        try:
+            dev = os.stat(path).st_dev
+            break
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+    if sys.platform.startswith("linux"):
+        sys_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        try:
+            real = os.path.realpath(sys_path)
+            if os.path.exists(os.path.join(real, "partition")):
+                real = os.path.dirname(real)
+            with open(os.path.join(real, "dev")) as f:
+                return f.read().strip()
+        except OSError:
+            pass
+    return dev
+
+
+class Job:
+    """一个整理任务：源文件夹、目标文件夹、文件类型和引擎参数"""
+
+    def __init__(self, job_id, source, dest, file_types, priority=0, options=None, name=None):
+        self.id = job_id
+        self.name = name or os.path.basename(os.path.normpath(source)) or source
+        self.source = source
+        self.dest = dest
+        self.file_types = list(file_types)
+        self.priority = priority
+        self.options = dict(options or {})
+        self.status = JOB_QUEUED
+        self.devices = ()
+        self.engine = None
+        self.progress = None     # 最近一次进度事件的数据
+        self.summary = None      # 结束后为引擎的结果摘要
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def finished_ok(self):
+        return self.status == JOB_DONE
+
+    def wait(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def info(self):
+        """任务状态的字典形式，便于界面显示或输出 JSON"""
+        return {
+            "id": self.id, "name": self.name, "source": self.source, "dest": self.dest,
+            "file_types": self.file_types, "priority": self.priority,
+            "status": self.status, "devices": list(self.devices),
+            "paused": self.engine is not None and self.engine.paused,
+            "progress": self.progress, "summary": self.summary, "error": self.error,
+            "submitted": self.submitted, "started": self.started, "finished": self.finished,
+        }
+
+
+class JobScheduler:
+    """任务调度器，界面和命令行共用
+
+    submit() 提交任务后立即返回；每当有任务提交或结束，就按优先级（数值大
+    的优先，相同时先提交的优先）挑出所涉及的磁盘都还有空位的任务启动，
+    每个任务在自己的线程中运行一个 OrganizeEngine。排在前面但磁盘忙的任务
+    不会挡住其他磁盘上的任务。
+
+    autostart=False 时提交的任务先排队，调用 start() 后才开始调度，一次提交
+    一批任务时优先级才能完整生效。
+
+    on_event(job, event) 在工作线程中调用：引擎事件原样转发，任务状态变化
+    以 EVENT_JOB 事件发出（EVENT_FINISHED 之后还会有一条最终状态的 EVENT_JOB）。
+    """
+
+    def __init__(self, per_device=DEFAULT_PER_DEVICE, device_limits=None,
+                 max_jobs=None, on_event=None, autostart=True):
+        if per_device < 1:
+            raise ValueError("每块磁盘的并发任务数必须大于 0")
+        self.per_device = per_device
+        self.device_limits = dict(device_limits or {})   # 磁盘标识 -> 并发上限
+        self.max_jobs = max_jobs                         # 所有磁盘合计的上限，None 表示不限
+        self.on_event = on_event
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._queue = []
+        self._busy = {}          # 磁盘标识 -> 正在运行的任务数
+        self._running = 0
+        self._closed = False
+        self._started = autostart
+
+    # ---- 提交与控制 ----
+
+    def submit(self, source, dest, file_types, priority=0, name=None, **options):
+        """提交任务，返回 Job；options 原样传给 OrganizeEngine"""
+        job = Job(next(self._ids), source, dest, file_types, priority, options, name)
+        job.devices = tuple(sorted({device_key(source), device_key(dest)} - {None}, key=str))
+        # 提交时就创建引擎：参数有误立即报错，排队中的任务也可以先暂停
+        job.engine = self._create_engine(job)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("调度器已关闭")
+            self._jobs[job.id] = job
+            self._queue.append(job)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def start(self):
+        """开始调度（autostart=False 时使用）"""
+        with self._lock:
+            self._started = True
+        self._dispatch()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        """按提交顺序返回全部任务"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def set_priority(self, job_id, priority):
+        """修改排队中任务的优先级"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.priority = priority
+        self._dispatch()
+
+    def pause(self, job_id):
+        """暂停任务；排队中的任务启动后立即处于暂停状态"""
+        self._jobs[job_id].engine.pause()
+
+    def resume(self, job_id):
+        self._jobs[job_id].engine.resume()
+
+    def cancel(self, job_id):
+        """取消任务：排队中的直接移出队列，运行中的通知引擎停止"""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.status == JOB_QUEUED:
+                self._queue.remove(job)
+                self._finish(job, JOB_CANCELLED)
+                queued = True
+            else:
+                queued = False
+        if queued:
+            self._notify(job)
+        else:
+            job.engine.stop()
+
+    def wait(self, timeout=None):
+        """等待所有已提交的任务结束，返回是否全部结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in self.jobs():
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not job.wait(remaining):
+                return False
+        return True
+
+    def shutdown(self, cancel=False, wait=True):
+        """不再接受新任务；cancel 为真时取消全部任务"""
+        with self._lock:
+            self._closed = True
+        if cancel:
+            for job in self.jobs():
+                if job.status not in FINAL_STATES:
+                    self.cancel(job.id)
+        if wait:
+            self.wait()
+
+    # ---- 调度 ----
+
+    def _limit(self, device):
+        return self.device_limits.get(device, self.per_device)
+
+    def _dispatch(self):
+        """启动所有磁盘有空位的排队任务"""
+        started = []
+        with self._lock:
+            if not self._started:
+                return
+            self._queue.sort(key=lambda job: (-job.priority, job.id))
+            for job in list(self._queue):
+                if self.max_jobs is not None and self._running >= self.max_jobs:
+                    break
+                if any(self._busy.get(dev, 0) >= self._limit(dev) for dev in job.devices):
+                    continue
+                self._queue.remove(job)
+                for dev in job.devices:
+                    self._busy[dev] = self._busy.get(dev, 0) + 1
+                self._running += 1
+                job.status = JOB_RUNNING
+                job.started = time.time()
+                started.append(job)
+        for job in started:
+            self._notify(job)
+            threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}",
+                             daemon=True).start()
+
+    def _create_engine(self, job):
+        from .engine import OrganizeEngine
+        return OrganizeEngine(job.source, job.dest, job.file_types,
+                              on_event=lambda event: self._forward(job, event), **job.options)
+
+    def _run(self, job):
+        try:
+            summary = job.engine.run()
+            if summary["cancelled"]:
+                status = JOB_CANCELLED
+            elif summary["error"] or summary["failed"]:
+                status = JOB_FAILED
+            else:
+                status = JOB_DONE
+            job.summary = summary
+            job.error = summary["error"]
+        except Exception as e:
+            status = JOB_FAILED
+            job.error = str(e)
+        with self._lock:
+            for dev in job.devices:
+                self._busy[dev] -= 1
+            self._running -= 1
+            self._finish(job, status)
+        self._notify(job)
+        self._dispatch()
+
+    def _finish(self, job, status):
+        # 调用方持有 self._lock
+        job.status = status
+        job.finished = time.time()
+        job._done.set()
+
+    # ---- 事件 ----
+
+    def _forward(self, job, event):
+        if event.kind == EVENT_PROGRESS:
+            job.progress = event.data
+        if self.on_event is not None:
+            self.on_event(job, event)
+
+    def _notify(self, job):
+        if self.on_event is not None:
+            self.on_event(job, EngineEvent(EVENT_JOB, job.info()))
@@ -0,0 +1,141 @@
+# 作者：AleOsh
+# 输出方式：复制、移动、硬链接、reflink（写时复制），做不到时退回到真正的复制
+
+import errno
+import os
+import shutil
+
+from .copier import copy_file, write_target, finish_target, partial_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+TRANSFER_COPY = "copy"
+TRANSFER_MOVE = "move"
+TRANSFER_HARDLINK = "hardlink"
+TRANSFER_REFLINK = "reflink"
+TRANSFER_MODES = (TRANSFER_COPY, TRANSFER_MOVE, TRANSFER_HARDLINK, TRANSFER_REFLINK)
+
+# 实际使用的方法
+METHOD_COPY = "copy"
+METHOD_RENAME = "rename"
+METHOD_COPY_DELETE = "copy+delete"
+METHOD_LINK = "link"
+METHOD_REFLINK = "reflink"
+METHOD_ARCHIVE = "archive"
+METHOD_EXTRACT = "extract"
+
+# <linux/fs.h>: #define FICLONE _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 日志中的说明
+METHOD_LABELS = {
+    METHOD_COPY: "已复制到",
+    METHOD_RENAME: "已移动到",
+    METHOD_COPY_DELETE: "已移动到（跨磁盘，复制后删除源文件）",
+    METHOD_LINK: "已硬链接到",
+    METHOD_REFLINK: "已创建 reflink 副本到",
+    METHOD_ARCHIVE: "已写入归档",
+    METHOD_EXTRACT: "已从归档中取出到",
+}
+
+
+def same_device(src, dst):
+    """源文件与目标路径是否在同一个文件系统上"""
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(dst)).st_dev
+    except OSError:
+        return False
+
+
+def same_file(src, dst):
+    """dst 是否存在且与 src 是同一个文件（硬链接）"""
+    try:
+        return os.path.samestat(os.stat(src), os.stat(dst))
+    except OSError:
+        return False
+
+
+def reflink(src, dst):
+    """用 FICLONE ioctl 创建写时复制副本（btrfs、xfs 等），不支持时抛出 OSError
+
+    dst 已存在时先克隆到临时文件再替换，见 copier.write_target()。
+    """
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "当前系统不支持 reflink")
+    target = write_target(dst)
+    try:
+        with open(src, 'rb') as fsrc, open(target, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, target)
+        finish_target(target, dst)
+    except BaseException:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        raise
+
+
+def link(src, dst):
+    """创建硬链接；dst 已存在时先链接到临时文件再替换，替换失败时上次的副本不受影响"""
+    if not os.path.lexists(dst):
+        os.link(src, dst)
+        return
+    if same_file(src, dst):
+        return
+    target = partial_path(dst)
+    if os.path.lexists(target):
+        os.remove(target)
+    os.link(src, target)
+    try:
+        os.replace(target, dst)
+    except OSError:
+        os.remove(target)
+        raise
+
+
+def transfer_file(src, dst, mode=TRANSFER_COPY, copy_function=copy_file):
+    """按指定方式把 src 放到 dst，返回 (实际使用的方法, 是否退回到普通复制)
+
+    move 在同一文件系统上用 os.replace，跨文件系统时复制后删除源文件
+    （METHOD_COPY_DELETE 本身已说明，不算退回）；
+    hardlink 用 os.link；reflink 用 FICLONE。后两者失败时改用 copy_function 复制。
+    已存在的 dst 不会被原地改写（它可能是 src 的硬链接），copy_function 也需要
+    这样处理（copier.copy_file 会先写到临时文件）。
+    """
+    if mode == TRANSFER_MOVE:
+        if same_file(src, dst):
+            # 上次以硬链接输出的副本：rename 对同一文件的两个名字什么也不做，直接删掉源文件名
+            os.remove(src)
+            return METHOD_RENAME, False
+        if same_device(src, dst):
+            try:
+                os.replace(src, dst)
+                return METHOD_RENAME, False
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        copy_function(src, dst)
+        os.remove(src)
+        return METHOD_COPY_DELETE, False
+
+    if mode == TRANSFER_HARDLINK:
+        try:
+            link(src, dst)
+            return METHOD_LINK, False
+        except OSError:
+            pass
+    elif mode == TRANSFER_REFLINK:
+        try:
+            reflink(src, dst)
+            return METHOD_REFLINK, False
+        except OSError:
+            pass
+    elif mode != TRANSFER_COPY:
+        raise ValueError(f"未知的输出方式: {mode}")
+
+    copy_function(src, dst)
+    return METHOD_COPY, mode != TRANSFER_COPY
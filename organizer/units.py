@@ -0,0 +1,22 @@
+# 作者：AleOsh
+# 字节数、剩余时间的显示格式
+
+
+def format_size(size):
+    """字节数转为便于阅读的文字，如 1536 -> '1.5 KB'"""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_eta(seconds):
+    """剩余秒数转为 时:分:秒，未知时返回 '--:--'"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
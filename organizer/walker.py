@@ -0,0 +1,207 @@
+# 作者：AleOsh
+# 基于 os.scandir 的目录遍历，可并行遍历同级子目录
+
+import os
+from threading import Lock
+
+# 默认只用一个线程遍历，输出顺序与 os.walk 一致
+DEFAULT_WALK_WORKERS = 1
+# split() 最多往下展开几层目录
+SPLIT_MAX_DEPTH = 3
+
+
+class TreeWalker:
+    """目录树遍历器
+
+    walk() 依次产生 (目录路径, 文件 DirEntry 列表)。与 os.walk 相比：
+    - 直接返回 DirEntry，调用方可复用 entry.path / entry.stat() 缓存，
+      无需再做 os.path.join 或额外的 stat；
+    - workers > 1 时用线程池同时列出多个子目录，适合网络盘和超大目录树，
+      此时产生的目录顺序不固定；
+    - 以 (st_dev, st_ino) 记录已访问目录，符号链接环和 bind mount
+      重复挂载的目录只会遍历一次；
+    - 给出 dir_cache（DirCache）时，修改时间没变的目录直接使用缓存的快照，
+      此时文件列表中只有按文件名可能匹配的文件（CachedEntry）。
+    """
+
+    def __init__(self, workers=DEFAULT_WALK_WORKERS, follow_symlinks=False,
+                 skip_dir=None, on_error=None, is_running=None, dir_cache=None):
+        self.workers = max(1, workers)
+        self.follow_symlinks = follow_symlinks
+        self.skip_dir = skip_dir        # skip_dir(path) 为真时不进入该目录
+        self.on_error = on_error        # on_error(OSError)，默认忽略，与 os.walk 一致
+        self.is_running = is_running    # is_running() 为假时停止继续列目录
+        self.dir_cache = dir_cache
+        self._visited = set()
+        self._visited_lock = Lock()
+
+    def walk(self, top):
+        """遍历 top，产生 (目录路径, 文件 DirEntry 列表)"""
+        self._visited.clear()
+        if self.skip_dir is not None and self.skip_dir(top):
+            return
+        try:
+            self._first_visit(os.stat(top))
+        except OSError as e:
+            self._error(e)
+            return
+        if self.workers == 1:
+            yield from self._walk_serial(top)
+        else:
+            yield from self._walk_parallel(top)
+
+    def split(self, top, shards, max_depth=SPLIT_MAX_DEPTH):
+        """把 top 拆成若干子目录树，供多个进程分别遍历
+
+        返回按单线程遍历顺序排列的 [(目录路径, 文件 DirEntry 列表或 None)]：
+        文件列表为 None 的项是还没有遍历的整棵子目录树，其余是在这里已经
+        列出的目录。先按顶层子目录拆分，子目录树不足 shards 个时再逐层往下
+        展开（最多 max_depth 层）。依次遍历各项、按列表顺序拼接结果，与
+        walk() 单线程遍历的顺序相同。
+        """
+        self._visited.clear()
+        if self.skip_dir is not None and self.skip_dir(top):
+            return []
+        try:
+            self._first_visit(os.stat(top))
+        except OSError as e:
+            self._error(e)
+            return []
+        items = [(top, None)]
+        for _ in range(max(1, max_depth)):
+            if self.is_running is not None and not self.is_running():
+                break
+            expanded = []
+            for path, files in items:
+                if files is not None:
+                    expanded.append((path, files))
+                    continue
+                path, files, subdirs = self.scan_dir(path)
+                expanded.append((path, files))
+                expanded.extend((subdir, None) for subdir in subdirs)
+            items = expanded
+            trees = sum(1 for _path, files in items if files is None)
+            if trees == 0 or trees >= shards:
+                break
+        return items
+
+    def _walk_serial(self, top):
+        """单线程深度优先遍历，顺序与 os.walk(topdown=True) 相同"""
+        stack = [top]
+        while stack:
+            if self.is_running is not None and not self.is_running():
+                return
+            path, files, subdirs = self.scan_dir(stack.pop())
+            yield path, files
+            stack.extend(reversed(subdirs))
+
+    def _walk_parallel(self, top):
+        """线程池并行遍历，每列完一个目录就把其子目录提交给线程池"""
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="walk")
+        pending = {pool.submit(self.scan_dir, top)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, files, subdirs = future.result()
+                    if self.is_running is None or self.is_running():
+                        for subdir in subdirs:
+                            pending.add(pool.submit(self.scan_dir, subdir))
+                    yield path, files
+        finally:
+            # 调用方提前结束遍历时，丢弃尚未开始的目录
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def scan_dir(self, path):
+        """列出一个目录，返回 (路径, 文件列表, 需要继续进入的子目录列表)"""
+        dir_stat = None
+        if self.dir_cache is not None:
+            dir_stat, cached = self.dir_cache.lookup(path)
+            if cached is not None:
+                files, children = cached
+                return path, files, self._enter_cached(path, children)
+        files = []
+        subdirs = []
+        # 重新列出的目录记下子目录，存入缓存
+        children = [] if dir_stat is not None else None
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        # 与 os.walk 相同：指向目录的符号链接算作目录
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if not is_dir:
+                        files.append(entry)
+                        continue
+
+                    child = self._enter(entry, subdirs)
+                    if children is not None:
+                        children.append(child)
+        except OSError as e:
+            self._error(e)
+            children = None
+        if children is not None:
+            self.dir_cache.store(path, dir_stat, files, children)
+        return path, files, subdirs
+
+    def _enter(self, entry, subdirs):
+        """处理一个子目录，需要进入时加入 subdirs；返回 (名字, 是否符号链接, 目录标识或 None)"""
+        symlink = entry.is_symlink()
+        if not self.follow_symlinks and symlink:
+            return entry.name, True, None
+        if self.skip_dir is not None and self.skip_dir(entry.path):
+            return entry.name, symlink, None
+        try:
+            st = entry.stat()
+            if not st.st_ino:
+                # Windows 上 DirEntry.stat() 不带 inode，需再 stat 一次
+                st = os.stat(entry.path)
+        except OSError as e:
+            self._error(e)
+            return entry.name, symlink, None
+        if self._first_visit(st):
+            subdirs.append(entry.path)
+        return entry.name, symlink, (st.st_dev, st.st_ino) if st.st_ino else None
+
+    def _enter_cached(self, path, children):
+        """按缓存的子目录列表决定要进入的子目录，规则与 _enter() 相同"""
+        subdirs = []
+        for name, symlink, key in children:
+            if not self.follow_symlinks and symlink:
+                continue
+            child = os.path.join(path, name)
+            if self.skip_dir is not None and self.skip_dir(child):
+                continue
+            if key is None:
+                # 上次被跳过或 stat 失败的子目录，这次需要时再 stat
+                try:
+                    st = os.stat(child)
+                except OSError as e:
+                    self._error(e)
+                    continue
+                key = (st.st_dev, st.st_ino) if st.st_ino else None
+            if self._first_visit_key(key):
+                subdirs.append(child)
+        return subdirs
+
+    def _first_visit(self, st):
+        """记录目录的 (设备号, inode)，第一次访问时返回 True"""
+        return self._first_visit_key((st.st_dev, st.st_ino) if st.st_ino else None)
+
+    def _first_visit_key(self, key):
+        # 部分文件系统不提供 inode，无法去重，按未访问处理
+        if key is None:
+            return True
+        with self._visited_lock:
+            if key in self._visited:
+                return False
+            self._visited.add(key)
+            return True
+
+    def _error(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
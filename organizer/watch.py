@@ -0,0 +1,277 @@
+# 作者：AleOsh
+# 监视模式：Linux 上用 inotify（ctypes 调用 libc），其他系统或 inotify 不可用时退回到目录快照轮询
+
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from .walker import TreeWalker
+
+# 文件写完后保持不变多久才处理（秒）
+DEFAULT_SETTLE_SECONDS = 2.0
+# 轮询模式下两次检查的间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 常量，见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Debouncer:
+    """等文件写完再处理：大小和修改时间在 settle 秒内不再变化才算就绪
+
+    每次检查只 stat 待定的文件，开销与变化的文件数成正比。
+    """
+
+    def __init__(self, settle=DEFAULT_SETTLE_SECONDS):
+        self.settle = settle
+        self._pending = {}   # 路径 -> (大小, 修改时间, 最近一次变化的时间)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, path):
+        """记录一个可能有变化的文件"""
+        if path not in self._pending:
+            self._pending[path] = (None, None, time.monotonic())
+
+    def ready(self):
+        """返回已经稳定的文件路径列表"""
+        now = time.monotonic()
+        result = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # 文件已被删除或移走
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.settle:
+                del self._pending[path]
+                result.append(path)
+        return result
+
+
+class _InotifyLib:
+    """libc 中 inotify 函数的 ctypes 绑定（用到时才加载 ctypes）"""
+
+    def __init__(self):
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.init1 = libc.inotify_init1
+        self.init1.argtypes = [ctypes.c_int]
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.rm_watch = libc.inotify_rm_watch
+        self.rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.get_errno = ctypes.get_errno
+
+
+class InotifyWatcher:
+    """基于 inotify 的监视器：每个目录一个 watch，新建的子目录自动加入"""
+
+    name = "inotify"
+
+    def __init__(self, root, skip_dir=None):
+        self.root = root
+        self.skip_dir = skip_dir
+        self._lib = _InotifyLib()
+        self._fd = self._lib.init1(IN_CLOEXEC)
+        if self._fd < 0:
+            err = self._lib.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._dirs = {}   # watch 描述符 -> 目录路径
+
+    def start(self, since=None):
+        """为整棵目录树添加 watch，返回修改时间不早于 since 的已有文件"""
+        return self._add_tree(self.root, since)
+
+    def _add_tree(self, top, since=None):
+        found = []
+        walker = TreeWalker(skip_dir=self.skip_dir)
+        for dirpath, entries in walker.walk(top):
+            self._add_watch(dirpath)
+            for entry in entries:
+                try:
+                    if since is None or entry.stat().st_mtime >= since:
+                        found.append(entry.path)
+                except OSError:
+                    pass
+        return found
+
+    def _add_watch(self, path):
+        wd = self._lib.add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = self._lib.get_errno()
+            # 目录在加 watch 前被删除，忽略即可；watch 数量超限等错误向上抛出
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, f"{os.strerror(err)}: {path}")
+        self._dirs[wd] = path
+
+    def poll(self, timeout):
+        """等待最多 timeout 秒，返回可能有变化的文件路径列表"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self._fd, 256 * 1024)
+
+        changed = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 内核事件队列溢出：重新扫描整棵树，找出所有文件交给去抖
+                return self._add_tree(self.root)
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, os.fsdecode(name))
+
+            if mask & IN_ISDIR:
+                # 新目录：加 watch，并把其中已经存在的文件也算作变化
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if self.skip_dir is None or not self.skip_dir(path):
+                        changed.extend(self._add_tree(path))
+            elif mask & (IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.append(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """目录快照轮询：只 stat 目录，修改时间变化的目录才重新列出
+
+    新建、移入的文件都会改变所在目录的修改时间，因此每轮开销与目录数量
+    成正比，而不是与文件数量成正比。
+    """
+
+    name = "polling"
+
+    def __init__(self, root, skip_dir=None, interval=DEFAULT_POLL_INTERVAL, sleep=None):
+        self.root = root
+        self.skip_dir = skip_dir
+        self.interval = interval
+        # sleep(秒) 返回 False 表示已取消，本轮不再检查；默认 time.sleep
+        self.sleep = sleep
+        self._dirs = {}   # 目录路径 -> (修改时间, {文件名: (大小, 修改时间)})
+
+    def start(self, since=None):
+        """记录初始快照，返回修改时间不早于 since 的已有文件"""
+        found = []
+        for dirpath, files in self._snapshot_tree(self.root):
+            if since is not None:
+                found.extend(os.path.join(dirpath, name)
+                             for name, (_size, mtime_ns) in files.items()
+                             if mtime_ns >= since * 1e9)
+        return found
+
+    def _snapshot_tree(self, top):
+        walker = TreeWalker(skip_dir=self.skip_dir)
+        for dirpath, entries in walker.walk(top):
+            files = {}
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                    files[entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    pass
+            try:
+                dir_mtime = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            self._dirs[dirpath] = (dir_mtime, files)
+            yield dirpath, files
+
+    def poll(self, timeout):
+        """等待最多 timeout 秒后检查一轮，返回新增或变化的文件路径列表"""
+        if self.sleep is None:
+            time.sleep(min(timeout, self.interval))
+        elif self.sleep(min(timeout, self.interval)) is False:
+            return []
+        changed = []
+        for dirpath, (dir_mtime, files) in list(self._dirs.items()):
+            try:
+                current = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                del self._dirs[dirpath]
+                continue
+            if current == dir_mtime:
+                continue
+
+            new_files = {}
+            try:
+                with os.scandir(dirpath) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                if (entry.path not in self._dirs and not entry.is_symlink()
+                                        and (self.skip_dir is None or not self.skip_dir(entry.path))):
+                                    # 新目录：整棵加入快照，其中的文件都算新文件
+                                    for sub, sub_files in self._snapshot_tree(entry.path):
+                                        changed.extend(os.path.join(sub, name) for name in sub_files)
+                                continue
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        new_files[entry.name] = (st.st_size, st.st_mtime_ns)
+                        if files.get(entry.name) != new_files[entry.name]:
+                            changed.append(entry.path)
+            except OSError:
+                del self._dirs[dirpath]
+                continue
+            self._dirs[dirpath] = (current, new_files)
+        return changed
+
+    def close(self):
+        self._dirs.clear()
+
+
+def start_watcher(root, skip_dir=None, since=None,
+                  poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True, sleep=None):
+    """创建并启动监视器，返回 (监视器, 修改时间不早于 since 的已有文件)
+
+    优先使用 inotify；不是 Linux、libc 不支持或 watch 数量超过
+    fs.inotify.max_user_watches 时退回到轮询。sleep 传给轮询监视器，用于
+    在等待期间响应取消。
+    """
+    if use_inotify and sys.platform.startswith("linux"):
+        watcher = None
+        try:
+            watcher = InotifyWatcher(root, skip_dir=skip_dir)
+            return watcher, watcher.start(since)
+        except (OSError, AttributeError, ImportError):
+            if watcher is not None:
+                watcher.close()
+    watcher = PollingWatcher(root, skip_dir=skip_dir, interval=poll_interval, sleep=sleep)
+    return watcher, watcher.start(since)
@@ -0,0 +1,36 @@
+# 作者：AleOsh
+# 测试共用的夹具：在临时目录中生成源文件夹和输出文件夹
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_file(path, data=b"x"):
+    """写入文件（必要时创建所在文件夹），返回路径"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src"
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def dest(tmp_path):
+    path = tmp_path / "out"
+    path.mkdir()
+    return str(path)
@@ -0,0 +1,173 @@
+# 作者：AleOsh
+# 归档输出：分卷大小限制、写入的内容可以正常读出、取消时回退
+
+import os
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+from conftest import write_file
+from organizer.archive import ARCHIVE_FORMATS, ARCHIVE_TAR, ARCHIVE_TGZ, ARCHIVE_ZIP, ArchiveWriter
+from organizer.cli import main
+from organizer.copier import CopyCancelled
+from organizer.engine import OrganizeEngine
+
+VOLUME_SIZE = 10 * 1024
+
+
+def _members(path):
+    """返回 {成员名: 内容}"""
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            assert zf.testzip() is None
+            return {name: zf.read(name) for name in zf.namelist()}
+    with tarfile.open(path) as tf:
+        return {m.name: tf.extractfile(m).read() for m in tf.getmembers()}
+
+
+def _sources(src, count, size):
+    # 随机内容几乎无法压缩，压缩格式的卷也接近 volume_size
+    return [write_file(os.path.join(src, f"f{i:03d}.jpg"), os.urandom(size))
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("fmt", ARCHIVE_FORMATS)
+def test_volumes_do_not_exceed_volume_size(src, dest, fmt):
+    paths = _sources(src, 20, 3000)
+    writer = ArchiveWriter(dest, fmt, volume_size=VOLUME_SIZE, name="a")
+    for path in paths:
+        writer.add(path, "JPG/" + os.path.basename(path))
+    writer.close()
+
+    assert len(writer.volumes) > 1
+    found = {}
+    for volume in writer.volumes:
+        assert os.path.getsize(volume) <= VOLUME_SIZE, volume
+        found.update(_members(volume))
+    assert sorted(found) == sorted("JPG/" + os.path.basename(p) for p in paths)
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert found["JPG/" + os.path.basename(path)] == f.read()
+
+
+@pytest.mark.parametrize("fmt", ARCHIVE_FORMATS)
+def test_long_names_are_counted(src, dest, fmt):
+    # 长文件名需要 PAX 扩展头，也要算进卷的大小
+    name = "n" * 300 + ".jpg"
+    path = write_file(os.path.join(src, "a.jpg"), os.urandom(2000))
+    writer = ArchiveWriter(dest, fmt, volume_size=VOLUME_SIZE, name="a")
+    for i in range(10):
+        writer.add(path, f"JPG/{i}{name}")
+    writer.close()
+    for volume in writer.volumes:
+        assert os.path.getsize(volume) <= VOLUME_SIZE, volume
+
+
+def test_oversized_file_gets_its_own_volume(src, dest):
+    small = write_file(os.path.join(src, "s.jpg"), b"s" * 100)
+    big = write_file(os.path.join(src, "b.jpg"), os.urandom(3 * VOLUME_SIZE))
+    writer = ArchiveWriter(dest, ARCHIVE_TAR, volume_size=VOLUME_SIZE, name="a")
+    writer.add(small, "JPG/s.jpg")
+    writer.add(big, "JPG/b.jpg")
+    writer.add(small, "JPG/s2.jpg")
+    writer.close()
+    assert [sorted(_members(v)) for v in writer.volumes] == \
+        [["JPG/s.jpg"], ["JPG/b.jpg"], ["JPG/s2.jpg"]]
+
+
+@pytest.mark.parametrize("fmt", ARCHIVE_FORMATS)
+def test_cancelled_member_is_rolled_back(src, dest, fmt):
+    keep = write_file(os.path.join(src, "keep.jpg"), b"keep")
+    big = write_file(os.path.join(src, "big.jpg"), os.urandom(64 * 1024))
+    writer = ArchiveWriter(dest, fmt, name="a", chunk_size=4096)
+    writer.add(keep, "JPG/keep.jpg")
+    calls = []
+
+    def should_continue():
+        calls.append(1)
+        return len(calls) < 3
+
+    with pytest.raises(CopyCancelled):
+        writer.add(big, "JPG/big.jpg", should_continue=should_continue)
+    writer.add(keep, "JPG/after.jpg")
+    writer.close()
+    assert _members(writer.volumes[0]) == {"JPG/keep.jpg": b"keep", "JPG/after.jpg": b"keep"}
+
+
+def test_tgz_is_single_gzip_stream(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"a" * 5000)
+    writer = ArchiveWriter(dest, ARCHIVE_TGZ, name="a")
+    writer.add(path, "JPG/a.jpg")
+    writer.close()
+    assert writer.volumes[0].endswith(".tar.gz")
+    assert _members(writer.volumes[0]) == {"JPG/a.jpg": b"a" * 5000}
+
+
+def test_tgz_of_small_files_compresses_like_tarfile(src, dest, tmp_path):
+    # 每个成员之后不刷新压缩器，很多小文件时与 tarfile 一次性压缩的大小相近
+    paths = [write_file(os.path.join(src, f"{i:04d}.txt"),
+                        f"第 {i} 行日志 status=ok value={i * 7}\n".encode() * 20)
+             for i in range(2000)]
+    writer = ArchiveWriter(dest, ARCHIVE_TGZ, name="a")
+    for path in paths:
+        writer.add(path, "TXT/" + os.path.basename(path))
+    writer.close()
+    expected = str(tmp_path / "tarfile.tar.gz")
+    with tarfile.open(expected, "w:gz") as tf:
+        for path in paths:
+            tf.add(path, "TXT/" + os.path.basename(path))
+    assert os.path.getsize(writer.volumes[0]) <= 1.1 * os.path.getsize(expected)
+    assert len(_members(writer.volumes[0])) == 2000
+
+
+def test_tgz_rollback_after_checkpoints(src, dest, monkeypatch):
+    # 回退到检查点后重新压缩检查点之后的成员，之前的成员都保留
+    monkeypatch.setattr("organizer.archive._REPLAY_LIMIT", 3000)
+    sizes = [700, 5000, 300, 900, 2500, 100]
+    paths = [write_file(os.path.join(src, f"{i}.jpg"), os.urandom(size))
+             for i, size in enumerate(sizes)]
+    big = write_file(os.path.join(src, "big.jpg"), os.urandom(20000))
+    writer = ArchiveWriter(dest, ARCHIVE_TGZ, name="a", chunk_size=4096)
+    expected = {}
+    for i, path in enumerate(paths):
+        writer.add(path, f"JPG/{i}.jpg")
+        expected[f"JPG/{i}.jpg"] = open(path, 'rb').read()
+        calls = []
+        with pytest.raises(CopyCancelled):
+            writer.add(big, "JPG/big.jpg",
+                       should_continue=lambda: calls.append(1) or len(calls) < 3)
+    writer.close()
+    assert _members(writer.volumes[0]) == expected
+
+
+@pytest.mark.parametrize("fmt", ARCHIVE_FORMATS)
+def test_engine_writes_matches_into_archive(src, dest, fmt):
+    write_file(os.path.join(src, "a.jpg"), b"a")
+    write_file(os.path.join(src, "sub", "a.jpg"), b"sub")
+    write_file(os.path.join(src, "b.png"), b"b")
+    summary = OrganizeEngine(src, dest, ["jpg", "png"], archive=fmt).run()
+    assert summary["processed"] == 3 and summary["failed"] == 0
+
+    # 输出文件夹中只有归档，没有扩展名文件夹
+    names = os.listdir(dest)
+    assert len(names) == 1 and names[0].endswith("." + fmt)
+    members = _members(os.path.join(dest, names[0]))
+    assert sorted(members) == ["JPG/a.jpg", "JPG/a_1.jpg", "PNG/b.png"]
+    assert sorted([members["JPG/a.jpg"], members["JPG/a_1.jpg"]]) == [b"a", b"sub"]
+
+
+def test_engine_rejects_archive_with_other_transfers(src, dest):
+    with pytest.raises(ValueError):
+        OrganizeEngine(src, dest, ["jpg"], archive=ARCHIVE_TAR, transfer="move")
+
+
+@pytest.mark.parametrize("options", [["--volume-size", "10M"],
+                                     ["--archive", "tar", "-t", "move"]])
+def test_cli_rejects_bad_options_before_opening_log(src, dest, tmp_path, options):
+    log_dir = str(tmp_path / "logs")
+    with pytest.raises(SystemExit):
+        main([src, dest, "-e", "jpg", "--log-dir", log_dir, "-q"] + options)
+    assert not os.path.exists(log_dir) or not os.listdir(log_dir)
+    assert "log-writer" not in [thread.name for thread in threading.enumerate()]
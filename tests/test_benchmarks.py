@@ -0,0 +1,84 @@
+# 作者：AleOsh
+# 基准测试脚本：合成目录树可重现、用例解析、结果 JSON
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCH_DIR)
+
+from treegen import generate_tree, parse_ext_mix  # noqa: E402
+from run import parse_case, summarize  # noqa: E402
+
+
+def snapshot(root):
+    found = {}
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                found[os.path.relpath(path, root)] = f.read()
+    return found
+
+
+def test_same_seed_gives_the_same_tree(tmp_path):
+    a = generate_tree(str(tmp_path / "a"), depth=2, fanout=2, files_per_dir=5, sizes="tiny", seed=7)
+    b = generate_tree(str(tmp_path / "b"), depth=2, fanout=2, files_per_dir=5, sizes="tiny", seed=7)
+    assert a == b
+    assert snapshot(str(tmp_path / "a")) == snapshot(str(tmp_path / "b"))
+    assert a["dirs"] == 1 + 2 + 4
+    assert a["files"] == len(snapshot(str(tmp_path / "a")))
+    assert a["bytes"] == sum(len(data) for data in snapshot(str(tmp_path / "a")).values())
+    assert sum(stats["files"] for stats in a["by_ext"].values()) == a["files"]
+
+
+def test_collision_rate_creates_shared_names(tmp_path):
+    generate_tree(str(tmp_path), depth=1, fanout=3, files_per_dir=10, sizes="tiny",
+                  collision_rate=1.0, ext_mix={".jpg": 1})
+    names = [os.path.basename(path) for path in snapshot(str(tmp_path))]
+    assert len(set(names)) < len(names)
+
+
+def test_unknown_size_distribution(tmp_path):
+    with pytest.raises(ValueError):
+        generate_tree(str(tmp_path), sizes="huge")
+
+
+def test_parse_ext_mix_and_case():
+    assert parse_ext_mix("jpg=5, .PNG=2,txt") == {".jpg": 5.0, ".png": 2.0, ".txt": 1.0}
+    with pytest.raises(ValueError):
+        parse_ext_mix(" , ")
+    assert parse_case("p8:mode=pipeline,workers=8,dedupe=true") == \
+        ("p8", {"mode": "pipeline", "workers": 8, "dedupe": True})
+    assert parse_case("scan_first") == ("scan_first", {"mode": "scan_first"})
+    assert parse_case("link:transfer=hardlink") == \
+        ("link", {"transfer": "hardlink", "mode": "direct"})
+
+
+def test_summarize_uses_the_best_run():
+    runs = [{"wall_seconds": 3.0, "files_per_sec": 1, "bytes_per_sec": 1, "peak_rss_kib": 10},
+            {"wall_seconds": 1.0, "files_per_sec": 3, "bytes_per_sec": 3, "peak_rss_kib": 20},
+            {"wall_seconds": 2.0, "files_per_sec": 2, "bytes_per_sec": 2, "peak_rss_kib": None}]
+    summary = summarize(runs)
+    assert summary["median_wall_seconds"] == 2.0
+    assert summary["min_wall_seconds"] == 1.0
+    assert summary["files_per_sec"] == 3
+    assert summary["peak_rss_kib"] == 20
+
+
+def test_run_writes_results(tmp_path):
+    output = str(tmp_path / "result.json")
+    subprocess.run([sys.executable, os.path.join(BENCH_DIR, "run.py"), "--depth", "1",
+                    "--fanout", "2", "--files-per-dir", "3", "--sizes", "tiny", "-r", "1",
+                    "--case", "direct", "--workdir", str(tmp_path), "-o", output],
+                   check=True, capture_output=True, timeout=120)
+    with open(output, encoding='utf-8') as f:
+        data = json.load(f)
+    assert [case["name"] for case in data["cases"]] == ["direct"]
+    run = data["cases"][0]["runs"][0]
+    assert run["failed"] == 0 and run["error"] is None
+    assert 0 < run["files"] <= data["tree"]["stats"]["files"]
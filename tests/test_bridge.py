@@ -0,0 +1,59 @@
+# 作者：AleOsh
+# 界面事件桥：进度合并、日志行数上限、按批取出
+
+import threading
+
+from organizer.bridge import EventBridge
+from organizer.events import EngineEvent, EVENT_PROGRESS, EVENT_STATUS
+
+
+def progress(current):
+    return EngineEvent(EVENT_PROGRESS, {"current": current})
+
+
+def test_progress_is_coalesced():
+    bridge = EventBridge()
+    for i in range(100):
+        bridge.post(progress(i))
+    lines, latest, events = bridge.drain()
+    assert lines == [] and events == []
+    assert latest.data == {"current": 99}
+    # 取出后清空
+    assert bridge.drain() == ([], None, [])
+
+
+def test_logs_keep_order_and_only_the_last_lines():
+    bridge = EventBridge(max_lines=10)
+    for i in range(50):
+        bridge.post_log(f"line {i}")
+    bridge.post(EngineEvent(EVENT_STATUS, {"text": "done"}))
+    lines, _latest, events = bridge.drain()
+    assert [line.split("] ", 1)[1] for line in lines] == [f"line {i}\n" for i in range(40, 50)]
+    assert all(line.startswith("[") for line in lines)
+    assert [event.data["text"] for event in events] == ["done"]
+
+
+def test_drain_is_limited_per_frame():
+    bridge = EventBridge()
+    for i in range(30):
+        bridge.post_log(str(i))
+    assert len(bridge.drain(max_events=20)[0]) == 20
+    assert len(bridge.drain(max_events=20)[0]) == 10
+
+
+def test_post_from_many_threads():
+    bridge = EventBridge(max_lines=10000)
+
+    def post():
+        for i in range(500):
+            bridge.post_log(str(i))
+            bridge.post(progress(i))
+
+    threads = [threading.Thread(target=post) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lines, latest, _events = bridge.drain()
+    assert len(lines) == 2000
+    assert latest.data == {"current": 499}
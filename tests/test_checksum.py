@@ -0,0 +1,135 @@
+# 作者：AleOsh
+# 复制校验：校验和清单的格式、重复与删除的文件名、引擎复制时计算并重新读出校验
+
+import hashlib
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from organizer import checksum
+from organizer.checksum import (ChecksumManifest, file_digest, CHECKSUM_BLAKE2B, CHECKSUM_SHA256,
+                                VERIFY_RETRIES)
+from organizer.engine import OrganizeEngine
+
+from conftest import write_file, read_file
+
+
+def sums(folder, name="SHA256SUMS"):
+    with open(os.path.join(folder, name), 'rb') as f:
+        return f.read().splitlines()
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_file_digest(src):
+    path = write_file(os.path.join(src, "a.jpg"), b"abc" * 1000)
+    assert file_digest(path, CHECKSUM_SHA256, chunk_size=7) == sha256(b"abc" * 1000)
+    assert file_digest(path, CHECKSUM_BLAKE2B) == hashlib.blake2b(b"abc" * 1000).hexdigest()
+    with pytest.raises(ValueError):
+        file_digest(path, "md5")
+
+
+def test_manifest_rewrites_duplicates_and_discards(dest):
+    folder = os.path.join(dest, "JPG")
+    os.makedirs(folder)
+    manifest = ChecksumManifest()
+    manifest.add(os.path.join(folder, "a.jpg"), sha256(b"1"))
+    manifest.add(os.path.join(folder, "b.jpg"), sha256(b"2"))
+    manifest.add(os.path.join(folder, "a.jpg"), sha256(b"3"))
+    # 立即追加写入，中途中断也不丢失
+    assert len(sums(folder)) == 3
+    manifest.discard(os.path.join(folder, "b.jpg"))
+    manifest.close()
+    assert sums(folder) == [f"{sha256(b'3')}  a.jpg".encode()]
+
+    # 再次运行时读入已有的清单
+    manifest = ChecksumManifest()
+    manifest.add(os.path.join(folder, "c.jpg"), sha256(b"4"))
+    manifest.close()
+    assert len(sums(folder)) == 2
+
+
+def test_manifest_escapes_names_like_coreutils(dest):
+    manifest = ChecksumManifest()
+    manifest.add(os.path.join(dest, "a\\b\nc.jpg"), sha256(b"x"))
+    manifest.close()
+    assert sums(dest) == [b"\\" + sha256(b"x").encode() + b"  a\\\\b\\nc.jpg"]
+    # 读回后没有重复
+    manifest = ChecksumManifest()
+    manifest.add(os.path.join(dest, "a\\b\nc.jpg"), sha256(b"y"))
+    manifest.close()
+    assert len(sums(dest)) == 1
+
+
+@pytest.mark.parametrize("algorithm, tool", [(CHECKSUM_SHA256, "sha256sum"),
+                                             (CHECKSUM_BLAKE2B, "b2sum")])
+def test_engine_sums_pass_coreutils_check(src, dest, algorithm, tool):
+    write_file(os.path.join(src, "a.jpg"), b"a" * 5000)
+    write_file(os.path.join(src, "sub", "a.jpg"), b"other")
+    write_file(os.path.join(src, "b.png"), b"png")
+    summary = OrganizeEngine(src, dest, ["jpg", "png"], checksum=algorithm, verify=True).run()
+    assert summary["processed"] == 3 and summary["failed"] == 0
+    name = checksum.SUMS_NAMES[algorithm]
+    assert len(sums(os.path.join(dest, "JPG"), name)) == 2
+    if shutil.which(tool) is None:
+        pytest.skip(f"没有 {tool}")
+    for folder in ("JPG", "PNG"):
+        subprocess.run([tool, "--quiet", "-c", name], cwd=os.path.join(dest, folder), check=True)
+
+
+def test_mismatch_is_recopied(src, dest, monkeypatch):
+    write_file(os.path.join(src, "a.jpg"), b"data")
+    real = checksum.file_digest
+    calls = []
+
+    def flaky(path, *args, **kwargs):
+        calls.append(path)
+        return "0" * 64 if len(calls) == 1 else real(path, *args, **kwargs)
+
+    monkeypatch.setattr(checksum, "file_digest", flaky)
+    engine = OrganizeEngine(src, dest, ["jpg"], verify=True)
+    summary = engine.run()
+    assert summary["processed"] == 1 and summary["failed"] == 0
+    assert engine.recopied_count == 1 and engine.verified_count == 1
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"data"
+
+
+def test_persistent_mismatch_fails_and_keeps_source(src, dest, monkeypatch):
+    path = write_file(os.path.join(src, "a.jpg"), b"data")
+    monkeypatch.setattr(checksum, "file_digest", lambda *args, **kwargs: "0" * 64)
+    engine = OrganizeEngine(src, dest, ["jpg"], verify=True)
+    summary = engine.run()
+    assert summary["failed"] == 1
+    assert engine.recopied_count == VERIFY_RETRIES
+    assert read_file(path) == b"data"
+    assert not os.path.exists(os.path.join(dest, "JPG", "a.jpg"))
+    assert not os.path.exists(os.path.join(dest, "JPG", "SHA256SUMS"))
+
+
+def test_invalid_options(src, dest):
+    with pytest.raises(ValueError):
+        OrganizeEngine(src, dest, ["jpg"], checksum="md5")
+    with pytest.raises(ValueError):
+        OrganizeEngine(src, dest, ["jpg"], verify=True, archive="tar")
+
+
+def test_verify_syncs_while_writing(src, dest, monkeypatch):
+    # Windows 上只读打开的文件不能 fsync：只在复制时对写入的文件 fsync
+    fcntl = pytest.importorskip("fcntl")
+    write_file(os.path.join(src, "a.jpg"), b"data")
+    synced = []
+
+    def fsync(fd):
+        if fcntl.fcntl(fd, fcntl.F_GETFL) & os.O_ACCMODE == os.O_RDONLY:
+            raise OSError("拒绝访问")
+        synced.append(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    engine = OrganizeEngine(src, dest, ["jpg"], verify=True)
+    summary = engine.run()
+    assert summary["processed"] == 1 and summary["failed"] == 0
+    assert engine.verified_count == 1 and len(synced) == 1
@@ -0,0 +1,89 @@
+# 作者：AleOsh
+# 暂停与取消：等待中的线程被唤醒，引擎暂停时不复制、取消后停下
+
+import os
+import threading
+import time
+
+import pytest
+
+from organizer.control import RunControl
+from organizer.engine import OrganizeEngine, MODES
+
+from conftest import write_file
+
+
+def run_in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=target()))
+    thread.start()
+    return thread, result
+
+
+def test_wait_blocks_while_paused():
+    control = RunControl()
+    assert control.wait()
+    control.pause()
+    assert control.paused
+    thread, result = run_in_thread(control.wait)
+    thread.join(0.1)
+    assert thread.is_alive()
+    control.resume()
+    thread.join(5)
+    assert result["value"] is True
+
+
+def test_cancel_wakes_paused_waiters():
+    control = RunControl()
+    control.pause()
+    thread, result = run_in_thread(control.wait)
+    control.cancel()
+    thread.join(5)
+    assert result["value"] is False
+    # 取消后不能再暂停
+    control.pause()
+    assert not control.paused
+    control.reset()
+    assert not control.cancelled and control.wait()
+
+
+def test_sleep_returns_early_on_cancel():
+    control = RunControl()
+    assert control.sleep(0.01)
+    thread, result = run_in_thread(lambda: control.sleep(30))
+    started = time.monotonic()
+    control.cancel()
+    thread.join(5)
+    assert result["value"] is False
+    assert time.monotonic() - started < 5
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_paused_engine_copies_nothing_until_resumed(src, dest, mode):
+    for i in range(5):
+        write_file(os.path.join(src, f"{i}.jpg"))
+    engine = OrganizeEngine(src, dest, ["jpg"], mode=mode)
+    engine.pause()
+    thread, result = run_in_thread(engine.run)
+    thread.join(0.3)
+    assert thread.is_alive()
+    folder = os.path.join(dest, "JPG")
+    assert not os.path.isdir(folder) or os.listdir(folder) == []
+    engine.resume()
+    thread.join(10)
+    assert result["value"]["processed"] == 5
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_stopped_paused_engine_finishes_cancelled(src, dest, mode):
+    for i in range(5):
+        write_file(os.path.join(src, f"{i}.jpg"))
+    engine = OrganizeEngine(src, dest, ["jpg"], mode=mode)
+    engine.pause()
+    thread, result = run_in_thread(engine.run)
+    thread.join(0.1)
+    engine.stop()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert result["value"]["cancelled"]
+    assert result["value"]["processed"] == 0
@@ -0,0 +1,122 @@
+# 作者：AleOsh
+# 分块复制：内容与元数据、进度、取消、换用其他复制方法、速度与剩余时间
+
+import errno
+import hashlib
+import io
+import os
+
+import pytest
+
+from organizer import copier
+from organizer.copier import (copy_file, copy_stream, CopyCancelled, ThroughputMeter,
+                              partial_path)
+from organizer.units import format_eta, format_size
+
+from conftest import write_file, read_file
+
+DATA = os.urandom(100 * 1024 + 7)
+
+
+@pytest.fixture
+def source(src):
+    path = write_file(os.path.join(src, "big.bin"), DATA)
+    os.utime(path, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    return path
+
+
+def test_copies_content_and_mtime_with_progress(source, dest):
+    dst = os.path.join(dest, "big.bin")
+    chunks = []
+    assert copy_file(source, dst, chunk_size=16 * 1024, on_progress=chunks.append) == len(DATA)
+    assert read_file(dst) == DATA
+    assert os.stat(dst).st_mtime_ns == os.stat(source).st_mtime_ns
+    assert sum(chunks) == len(DATA)
+    assert len(chunks) > 1
+
+
+def test_cancel_removes_unfinished_file(source, dest):
+    dst = os.path.join(dest, "big.bin")
+    calls = []
+
+    def should_continue():
+        calls.append(1)
+        return len(calls) < 3
+
+    with pytest.raises(CopyCancelled):
+        copy_file(source, dst, chunk_size=16 * 1024, should_continue=should_continue)
+    assert not os.path.exists(dst)
+
+
+def test_cancelled_overwrite_keeps_existing_file(source, dest):
+    dst = write_file(os.path.join(dest, "big.bin"), b"previous")
+    with pytest.raises(CopyCancelled):
+        copy_file(source, dst, chunk_size=16 * 1024, should_continue=lambda: False)
+    assert read_file(dst) == b"previous"
+    assert not os.path.exists(partial_path(dst))
+
+
+def test_overwrite_replaces_instead_of_truncating(source, dest):
+    # 已有的目标文件可能还有别的名字（硬链接），不能原地改写
+    dst = write_file(os.path.join(dest, "big.bin"), b"previous")
+    other = os.path.join(dest, "other.bin")
+    os.link(dst, other)
+    copy_file(source, dst)
+    assert read_file(dst) == DATA
+    assert read_file(other) == b"previous"
+
+
+def test_falls_back_when_kernel_copy_is_unsupported(source, dest, monkeypatch):
+    def unsupported(infd, outfd, offset, count):
+        raise OSError(errno.ENOSYS, "not supported")
+
+    monkeypatch.setattr(copier, "_STRATEGIES", [unsupported, copier._read_write])
+    dst = os.path.join(dest, "big.bin")
+    assert copy_file(source, dst, chunk_size=10000) == len(DATA)
+    assert read_file(dst) == DATA
+
+
+@pytest.mark.parametrize("strategy", copier._STRATEGIES)
+def test_each_strategy_copies_everything(source, dest, monkeypatch, strategy):
+    monkeypatch.setattr(copier, "_STRATEGIES", [strategy])
+    dst = os.path.join(dest, "big.bin")
+    copy_file(source, dst, chunk_size=10000)
+    assert read_file(dst) == DATA
+
+
+def test_hasher_sees_every_byte(source, dest):
+    hasher = hashlib.sha256()
+    copy_file(source, os.path.join(dest, "big.bin"), chunk_size=10000, hasher=hasher)
+    assert hasher.hexdigest() == hashlib.sha256(DATA).hexdigest()
+
+
+def test_copy_stream(dest):
+    dst = os.path.join(dest, "out.bin")
+    hasher = hashlib.sha256()
+    chunks = []
+    assert copy_stream(io.BytesIO(DATA), dst, chunk_size=10000, on_progress=chunks.append,
+                       hasher=hasher) == len(DATA)
+    assert read_file(dst) == DATA
+    assert sum(chunks) == len(DATA)
+    assert hasher.hexdigest() == hashlib.sha256(DATA).hexdigest()
+    with pytest.raises(CopyCancelled):
+        copy_stream(io.BytesIO(DATA), os.path.join(dest, "x.bin"), should_continue=lambda: False)
+    assert not os.path.exists(os.path.join(dest, "x.bin"))
+
+
+def test_throughput_meter():
+    meter = ThroughputMeter(window=5.0)
+    assert meter.update(0, now=100.0) == 0.0
+    assert meter.update(1000, now=101.0) == 1000.0
+    assert meter.update(3000, now=102.0) == 1500.0
+    # 超出窗口的旧样本被丢弃，暂停后速度降下来
+    assert meter.update(3000, now=110.0) < 1500.0
+
+
+def test_format_size_and_eta():
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KB"
+    assert format_size(3 * 1024 ** 3) == "3.0 GB"
+    assert format_eta(None) == "--:--"
+    assert format_eta(75) == "01:15"
+    assert format_eta(3725) == "1:02:05"
@@ -0,0 +1,102 @@
+# 作者：AleOsh
+# 按内容去重：索引、哈希缓存，以及增量处理覆盖副本后的索引更新
+
+import os
+
+from organizer.dedupe import Deduper, HashCache, quick_hash, full_hash, BLOCK_SIZE
+from organizer.engine import OrganizeEngine
+from organizer.layout import DestinationLayout
+
+from conftest import write_file, read_file
+
+
+def test_quick_hash_of_small_file_is_full_hash(tmp_path):
+    path = write_file(str(tmp_path / "a"), b"abc")
+    assert quick_hash(path, 3) == full_hash(path)
+
+
+def test_quick_hash_only_reads_head_and_tail(tmp_path):
+    middle_a = b"a" * BLOCK_SIZE
+    middle_b = b"b" * BLOCK_SIZE
+    a = write_file(str(tmp_path / "a"), b"h" * BLOCK_SIZE + middle_a + b"t" * BLOCK_SIZE)
+    b = write_file(str(tmp_path / "b"), b"h" * BLOCK_SIZE + middle_b + b"t" * BLOCK_SIZE)
+    size = 3 * BLOCK_SIZE
+    assert quick_hash(a, size) == quick_hash(b, size)
+    assert full_hash(a) != full_hash(b)
+
+
+def test_claim_finds_existing_copy(tmp_path, dest):
+    write_file(os.path.join(dest, "JPG", "old.jpg"), b"same")
+    src_path = write_file(str(tmp_path / "a.jpg"), b"same")
+    deduper = Deduper(DestinationLayout(dest))
+    duplicate, dst_path = deduper.claim(src_path, ".jpg", lambda: None)
+    assert duplicate == os.path.join(dest, "JPG", "old.jpg")
+    assert dst_path is None
+
+
+def test_sources_in_same_run_are_deduplicated(tmp_path, dest):
+    layout = DestinationLayout(dest)
+    deduper = Deduper(layout)
+    a = write_file(str(tmp_path / "a.jpg"), b"same")
+    b = write_file(str(tmp_path / "b.jpg"), b"same")
+    duplicate, dst_path = deduper.claim(a, ".jpg", lambda: layout.allocate(".jpg", "a.jpg"))
+    assert duplicate is None
+    duplicate, _ = deduper.claim(b, ".jpg", lambda: layout.allocate(".jpg", "b.jpg"))
+    assert duplicate == dst_path
+
+
+def test_failed_copy_leaves_index(tmp_path, dest):
+    layout = DestinationLayout(dest)
+    deduper = Deduper(layout)
+    a = write_file(str(tmp_path / "a.jpg"), b"same")
+    b = write_file(str(tmp_path / "b.jpg"), b"same")
+    _, dst_path = deduper.claim(a, ".jpg", lambda: layout.allocate(".jpg", "a.jpg"))
+    deduper.done(dst_path, False)
+    duplicate, _ = deduper.claim(b, ".jpg", lambda: layout.allocate(".jpg", "b.jpg"))
+    assert duplicate is None
+
+
+def test_hash_cache_detects_changed_file(tmp_path):
+    path = write_file(str(tmp_path / "a"), b"one")
+    cache = HashCache(str(tmp_path / "cache.db"))
+    cache.put(path, os.stat(path), b"q", b"f")
+    assert cache.get(path, os.stat(path)) == (b"q", b"f")
+    write_file(path, b"longer")
+    assert cache.get(path, os.stat(path)) == (None, None)
+    cache.close()
+
+
+def test_replaced_copy_drops_old_hashes(tmp_path, dest):
+    layout = DestinationLayout(dest)
+    deduper = Deduper(layout)
+    copy = write_file(os.path.join(dest, "JPG", "a.jpg"), b"xxxx")
+    other = write_file(str(tmp_path / "other.jpg"), b"zzzz")
+    # 与 a.jpg 比较一次，让索引中记下 a.jpg 旧内容的哈希
+    duplicate, _ = deduper.claim(other, ".jpg", lambda: layout.allocate(".jpg", "other.jpg"))
+    assert duplicate is None
+
+    write_file(copy, b"yyyy")
+    deduper.replaced(copy, 4)
+    source = write_file(str(tmp_path / "b.jpg"), b"xxxx")
+    duplicate, _ = deduper.claim(source, ".jpg", lambda: layout.allocate(".jpg", "b.jpg"))
+    assert duplicate is None
+    same = write_file(str(tmp_path / "c.jpg"), b"yyyy")
+    duplicate, _ = deduper.claim(same, ".jpg", lambda: layout.allocate(".jpg", "c.jpg"))
+    assert duplicate == copy
+
+
+def test_incremental_changed_file_is_checked_against_previous_copy(src, dest):
+    # 遍历顺序：1/d.jpg、1/2/a.jpg、1/2/3/b.jpg
+    a = write_file(os.path.join(src, "1", "2", "a.jpg"), b"xxxx")
+    options = dict(mode="direct", dedupe=True, incremental=True)
+    OrganizeEngine(src, dest, ["jpg"], **options).run()
+
+    write_file(os.path.join(src, "1", "d.jpg"), b"zzzz")
+    write_file(a, b"yyyy")
+    write_file(os.path.join(src, "1", "2", "3", "b.jpg"), b"xxxx")
+    summary = OrganizeEngine(src, dest, ["jpg"], **options).run()
+    # 内容变化的 a.jpg 另起一个文件名，上次的副本仍是 b.jpg 的重复
+    assert summary["duplicates"] == 1
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"xxxx"
+    assert read_file(os.path.join(dest, "JPG", "a_1.jpg")) == b"yyyy"
+    assert not os.path.exists(os.path.join(dest, "JPG", "b.jpg"))
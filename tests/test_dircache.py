@@ -0,0 +1,119 @@
+# 作者：AleOsh
+# 目录快照缓存：没变化的目录直接用缓存，目录变化或匹配条件变化时重新列出
+
+import os
+import time
+
+from organizer.dircache import DirCache, RACY_NS
+from organizer.engine import OrganizeEngine
+from organizer.events import EVENT_LOG
+from organizer.walker import TreeWalker
+
+from conftest import write_file
+
+
+def age(root):
+    """把 root 下所有目录的修改时间改到足够早，不再算“刚修改过”"""
+    old = time.time() - 2 * RACY_NS / 1e9 - 60
+    for dirpath, _dirs, _files in os.walk(root):
+        os.utime(dirpath, (old, old))
+
+
+def open_cache(tmp_path, key="jpg", fresh_stat=False):
+    return DirCache(str(tmp_path / "cache.db"), key, lambda name: name.endswith(".jpg"),
+                    fresh_stat=fresh_stat)
+
+
+def walk(src, cache):
+    return {path: sorted(entry.name for entry in files)
+            for path, files in TreeWalker(dir_cache=cache).walk(src)}
+
+
+def test_unchanged_directories_come_from_cache(tmp_path, src):
+    write_file(os.path.join(src, "a.jpg"), b"12")
+    write_file(os.path.join(src, "a.txt"))
+    write_file(os.path.join(src, "sub", "b.jpg"))
+    age(src)
+    cache = open_cache(tmp_path)
+    first = walk(src, cache)
+    assert cache.misses == 2 and cache.hits == 0
+    cache.close()
+
+    cache = open_cache(tmp_path)
+    second = walk(src, cache)
+    assert cache.hits == 2 and cache.misses == 0
+    # 快照中只有可能匹配的文件
+    assert second == {src: ["a.jpg"], os.path.join(src, "sub"): ["b.jpg"]}
+    assert first[src] == ["a.jpg", "a.txt"]
+    st, (entries, _children) = cache.lookup(src)
+    assert entries[0].stat().st_size == 2
+    cache.close()
+
+
+def test_changed_directory_is_listed_again(tmp_path, src):
+    write_file(os.path.join(src, "sub", "b.jpg"))
+    age(src)
+    cache = open_cache(tmp_path)
+    walk(src, cache)
+    cache.close()
+
+    write_file(os.path.join(src, "sub", "new.jpg"))
+    cache = open_cache(tmp_path)
+    assert walk(src, cache)[os.path.join(src, "sub")] == ["b.jpg", "new.jpg"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_recent_directories_and_other_keys_are_not_used(tmp_path, src):
+    write_file(os.path.join(src, "a.jpg"))
+    cache = open_cache(tmp_path)
+    walk(src, cache)
+    cache.close()
+    # 刚修改过的目录没有缓存
+    cache = open_cache(tmp_path)
+    walk(src, cache)
+    assert cache.hits == 0
+    cache.close()
+
+    age(src)
+    cache = open_cache(tmp_path)
+    walk(src, cache)
+    cache.close()
+    cache = open_cache(tmp_path, key="png")
+    walk(src, cache)
+    assert cache.hits == 0
+    cache.close()
+
+
+def test_removed_subtree_is_forgotten(tmp_path, src):
+    write_file(os.path.join(src, "gone", "deep", "a.jpg"))
+    write_file(os.path.join(src, "keep", "b.jpg"))
+    age(src)
+    cache = open_cache(tmp_path)
+    walk(src, cache)
+    cache.close()
+
+    os.remove(os.path.join(src, "gone", "deep", "a.jpg"))
+    os.rmdir(os.path.join(src, "gone", "deep"))
+    os.rmdir(os.path.join(src, "gone"))
+    cache = open_cache(tmp_path)
+    assert sorted(walk(src, cache)) == [src, os.path.join(src, "keep")]
+    cache.close()
+
+
+def test_engine_rescan_uses_cache(src, dest):
+    for i in range(3):
+        write_file(os.path.join(src, f"d{i}", f"{i}.jpg"))
+    age(src)
+    assert OrganizeEngine(src, dest, ["jpg"], dir_cache=True,
+                          incremental=True).run()["processed"] == 3
+
+    write_file(os.path.join(src, "d0", "new.jpg"))
+    messages = []
+    engine = OrganizeEngine(src, dest, ["jpg"], dir_cache=True, incremental=True,
+                            on_event=lambda event: event.kind == EVENT_LOG
+                            and messages.append(event.data["message"]))
+    summary = engine.run()
+    assert summary["processed"] == 1 and summary["skipped"] == 3
+    assert os.path.exists(os.path.join(dest, "JPG", "new.jpg"))
+    assert any(message.startswith("目录缓存：3 个目录没有变化") for message in messages)
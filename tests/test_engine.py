@@ -0,0 +1,83 @@
+# 作者：AleOsh
+# 整理引擎与命令行：不依赖 Tk 运行，按扩展名分文件夹，发出事件
+
+import os
+
+import pytest
+
+from organizer.cli import main
+from organizer.engine import OrganizeEngine, MODE_DIRECT, MODES, MODE_PIPELINE
+from organizer.events import EVENT_FINISHED, EVENT_LOG
+
+from conftest import write_file, read_file
+
+
+def make_tree(src):
+    write_file(os.path.join(src, "a.jpg"), b"a")
+    write_file(os.path.join(src, "sub", "a.jpg"), b"sub")
+    write_file(os.path.join(src, "sub", "deep", "b.PNG"), b"b")
+    write_file(os.path.join(src, "notes.txt"), b"skip")
+
+
+def listing(dest):
+    """{相对路径: 内容}"""
+    found = {}
+    for root, _dirs, files in os.walk(dest):
+        for name in files:
+            path = os.path.join(root, name)
+            found[os.path.relpath(path, dest).replace(os.sep, "/")] = read_file(path)
+    return found
+
+
+def test_direct_mode_sorts_by_extension(src, dest):
+    make_tree(src)
+    events = []
+    engine = OrganizeEngine(src, dest, ["jpg", "png"], mode=MODE_DIRECT, on_event=events.append)
+    summary = engine.run()
+
+    assert summary["processed"] == 3
+    assert summary["failed"] == 0 and not summary["cancelled"] and summary["error"] is None
+    found = listing(dest)
+    assert sorted(found) == ["JPG/a.jpg", "JPG/a_1.jpg", "PNG/b.PNG"]
+    assert sorted([found["JPG/a.jpg"], found["JPG/a_1.jpg"]]) == [b"a", b"sub"]
+    # 源文件保持不变
+    assert read_file(os.path.join(src, "a.jpg")) == b"a"
+
+    kinds = [event.kind for event in events]
+    assert EVENT_LOG in kinds
+    assert kinds[-1] == EVENT_FINISHED
+    assert events[-1].data["processed"] == 3
+
+
+def test_missing_source_is_an_error(tmp_path, dest):
+    summary = OrganizeEngine(str(tmp_path / "missing"), dest, ["jpg"]).run()
+    assert summary["error"]
+    assert summary["processed"] == 0
+
+
+def test_cli_exit_codes(tmp_path, src, dest):
+    make_tree(src)
+    assert main([src, dest, "-e", "jpg,png", "-q"]) == 0
+    assert sorted(listing(dest)) == ["JPG/a.jpg", "JPG/a_1.jpg", "PNG/b.PNG"]
+    assert main([str(tmp_path / "missing"), dest, "-e", "jpg", "-q"]) == 1
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_modes_produce_the_same_output(src, dest, mode):
+    make_tree(src)
+    summary = OrganizeEngine(src, dest, ["jpg", "png"], mode=mode, workers=4).run()
+    assert summary["processed"] == 3 and summary["failed"] == 0
+    assert sorted(listing(dest)) == ["JPG/a.jpg", "JPG/a_1.jpg", "PNG/b.PNG"]
+
+
+def test_pipeline_with_many_files_and_small_queue(src, dest):
+    # 队列比文件少得多：扫描线程会被阻塞，等复制线程取走后继续
+    for i in range(200):
+        write_file(os.path.join(src, f"d{i % 7}", str(i), "same.jpg"), str(i).encode())
+    engine = OrganizeEngine(src, dest, ["jpg"], mode=MODE_PIPELINE, workers=8, queue_size=4)
+    summary = engine.run()
+    assert summary["processed"] == 200 and summary["failed"] == 0
+    found = listing(dest)
+    # 同名文件并发分配目标名，不重复也不覆盖
+    assert len(found) == 200
+    assert sorted(found.values()) == sorted(str(i).encode() for i in range(200))
@@ -0,0 +1,72 @@
+# 作者：AleOsh
+# 图形界面的事件处理：被取消的任务之后才结束时，不影响新开始的任务
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from file_organizer import FileOrganizer  # noqa: E402
+from organizer.bridge import EventBridge  # noqa: E402
+from organizer.events import EngineEvent, EVENT_FINISHED, EVENT_PROGRESS, EVENT_STATUS  # noqa: E402
+
+
+PROGRESS = {"current": 1, "total": 2, "bytes_done": 10, "bytes_total": 20, "rate": 5, "eta": 2}
+
+
+class Widget(dict):
+    """记录 pack / pack_forget 和 ['text'] 等设置的假控件"""
+
+    visible = False
+
+    def pack(self, **options):
+        self.visible = True
+
+    def pack_forget(self):
+        self.visible = False
+
+    def after(self, delay, callback):
+        pass
+
+
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.engine = object()
+
+
+def make_app():
+    app = FileOrganizer.__new__(FileOrganizer)
+    app.bridge = EventBridge()
+    app.window = Widget()
+    for name in ("progress", "progress_label", "status_label", "metrics_label",
+                 "start_btn", "pause_btn", "exit_btn"):
+        setattr(app, name, Widget())
+    app.log_writer = None
+    app.processing = True
+    return app
+
+
+def finished():
+    return EngineEvent(EVENT_FINISHED, {"cancelled": True})
+
+
+def test_late_finish_of_cancelled_job_keeps_new_job_controls():
+    app = make_app()
+    old, new = Job(1), Job(2)
+    # 第二个任务已经开始，第一个（已取消的）任务这时才发出结束和进度事件
+    app.engine, app.job_id = new.engine, new.id
+    app.pause_btn.pack()
+    app.exit_btn.pack()
+    app._on_job_event(old, EngineEvent(EVENT_STATUS, {"text": "旧任务"}))
+    app._on_job_event(old, EngineEvent(EVENT_PROGRESS, PROGRESS))
+    app._on_job_event(old, finished())
+    app._drain_events()
+    assert app.pause_btn.visible and app.exit_btn.visible
+    assert not app.start_btn.visible
+    assert app.processing
+    assert "text" not in app.status_label and "value" not in app.progress
+
+    app._on_job_event(new, finished())
+    app._drain_events()
+    assert app.start_btn.visible and not app.pause_btn.visible
+    assert not app.processing
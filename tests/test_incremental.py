@@ -0,0 +1,235 @@
+# 作者：AleOsh
+# 增量处理：清单记录、覆盖上次的副本、中断后恢复
+
+import os
+import time
+
+from organizer.cli import main
+from organizer.copier import partial_path
+from organizer.engine import OrganizeEngine
+from organizer.manifest import Manifest
+
+from conftest import write_file, read_file
+
+
+def fail_copy(*args, **kwargs):
+    raise OSError("disk error")
+
+
+def organize(src, dest, **options):
+    engine = OrganizeEngine(src, dest, ["jpg"], incremental=True, **options)
+    return engine.run()
+
+
+def test_unchanged_files_are_skipped(src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"one")
+    assert organize(src, dest)["processed"] == 1
+    summary = organize(src, dest)
+    assert summary["processed"] == 0
+    assert summary["skipped"] == 1
+
+
+def test_changed_file_keeps_previous_copy(src, dest):
+    # 例如存储卡格式化后重新编号的 IMG_0001.jpg：上次的副本不能被覆盖
+    path = write_file(os.path.join(src, "IMG_0001.jpg"), b"first")
+    organize(src, dest)
+    write_file(path, b"second photo")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    for transfer in ("copy", "move"):
+        assert organize(src, dest, transfer=transfer)["processed"] == 1
+        write_file(path, b"third photo")
+    folder = os.path.join(dest, "JPG")
+    assert sorted(os.listdir(folder)) == ["IMG_0001.jpg", "IMG_0001_1.jpg", "IMG_0001_2.jpg"]
+    assert read_file(os.path.join(folder, "IMG_0001.jpg")) == b"first"
+    assert read_file(os.path.join(folder, "IMG_0001_1.jpg")) == b"second photo"
+
+
+def test_touched_file_reuses_previous_copy(src, dest):
+    # 内容没有变化、只改了修改时间：写回上次的位置，不多出一个 _N
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    assert organize(src, dest)["processed"] == 1
+    assert sorted(os.listdir(os.path.join(dest, "JPG"))) == ["a.jpg"]
+    assert os.stat(os.path.join(dest, "JPG", "a.jpg")).st_mtime_ns == os.stat(path).st_mtime_ns
+
+
+def test_copy_over_previous_hardlink_keeps_source(src, dest):
+    # 上次以硬链接输出，这次改用复制：不能原地截断与源文件共用的 inode
+    path = write_file(os.path.join(src, "a.jpg"), b"original")
+    assert main([src, dest, "-e", "jpg", "-t", "hardlink", "--incremental", "-q"]) == 0
+    copy = os.path.join(dest, "JPG", "a.jpg")
+    assert os.path.samefile(path, copy)
+    with open(path, 'ab') as f:
+        f.write(b" appended")
+
+    assert main([src, dest, "-e", "jpg", "--incremental", "-q"]) == 0
+    assert read_file(path) == b"original appended"
+    assert read_file(copy) == b"original appended"
+    assert not os.path.samefile(path, copy)
+    assert not os.path.exists(partial_path(copy))
+
+
+def test_reflink_over_previous_hardlink_keeps_source(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"original")
+    organize(src, dest, transfer="hardlink")
+    with open(path, 'ab') as f:
+        f.write(b" appended")
+    # 不支持 reflink 的文件系统上退回到复制，两种情况都不能截断源文件
+    assert organize(src, dest, transfer="reflink")["processed"] == 1
+    assert read_file(path) == b"original appended"
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"original appended"
+
+
+def test_move_over_previous_hardlink_removes_source_name(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"original")
+    organize(src, dest, transfer="hardlink")
+    with open(path, 'ab') as f:
+        f.write(b"!")
+    assert organize(src, dest, transfer="move")["processed"] == 1
+    assert not os.path.exists(path)
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"original!"
+
+
+def test_failed_recopy_keeps_previous_copy(src, dest, monkeypatch):
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+    write_file(path, b"changed")
+
+    monkeypatch.setattr("organizer.copier._copy_fds", fail_copy)
+    assert organize(src, dest)["failed"] == 1
+    copy = os.path.join(dest, "JPG", "a.jpg")
+    assert read_file(copy) == b"one"
+    assert not os.path.exists(partial_path(copy))
+
+
+def test_shared_duplicate_copy_is_not_overwritten(src, dest):
+    # 去重时 b.jpg 记录的是 a.jpg 的副本，b.jpg 变化后不能改写 a.jpg 的副本
+    write_file(os.path.join(src, "a.jpg"), b"same")
+    b = write_file(os.path.join(src, "sub", "b.jpg"), b"same")
+    organize(src, dest, dedupe=True)
+    assert os.listdir(os.path.join(dest, "JPG")) == ["a.jpg"]
+
+    write_file(b, b"different")
+    organize(src, dest, dedupe=True)
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"same"
+    assert read_file(os.path.join(dest, "JPG", "b.jpg")) == b"different"
+
+
+def test_recover_removes_leftover_partial(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+    copy = os.path.join(dest, "JPG", "a.jpg")
+    write_file(partial_path(copy), b"half")
+    manifest = Manifest(os.path.join(dest, ".file_organizer", "manifest.db"))
+    manifest.begin(os.path.abspath(path), os.stat(path), copy)
+    manifest.recover()
+    manifest.close()
+    assert not os.path.exists(partial_path(copy))
+
+
+def manifest_row(dest, src_path):
+    import sqlite3
+    conn = sqlite3.connect(os.path.join(dest, ".file_organizer", "manifest.db"))
+    try:
+        return conn.execute("SELECT size, dest, done FROM files WHERE src = ?",
+                            (os.path.abspath(src_path),)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_abort_restores_previous_record(tmp_path):
+    copy = write_file(str(tmp_path / "out" / "a.jpg"), b"one")
+    src_path = str(tmp_path / "a.jpg")
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    first = os.stat(write_file(src_path, b"one"))
+    manifest.finish(src_path, first, copy)
+    second = os.stat(write_file(src_path, b"changed"))
+    manifest.begin(src_path, second, copy)
+    manifest.abort(src_path)
+    manifest.close()
+
+    reopened = Manifest(str(tmp_path / "manifest.db"))
+    assert reopened.is_current(src_path, first)
+    assert reopened.previous_dest(src_path) == copy
+    reopened.close()
+
+
+def test_abort_of_new_file_removes_record(tmp_path):
+    src_path = write_file(str(tmp_path / "a.jpg"), b"one")
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    manifest.begin(src_path, os.stat(src_path), str(tmp_path / "out.jpg"))
+    manifest.abort(src_path)
+    manifest.close()
+    reopened = Manifest(str(tmp_path / "manifest.db"))
+    assert reopened.previous_dest(src_path) is None
+    assert reopened.recover() == (0, 0)
+    reopened.close()
+
+
+def test_failed_recopy_keeps_manifest_record(src, dest, monkeypatch):
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+
+    write_file(path, b"changed")
+    monkeypatch.setattr("organizer.copier._copy_fds", fail_copy)
+    assert organize(src, dest)["failed"] == 1
+    assert manifest_row(dest, path) == (3, os.path.join(dest, "JPG", "a.jpg"), 1)
+
+    monkeypatch.undo()
+    assert organize(src, dest)["processed"] == 1
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"one"
+    assert read_file(os.path.join(dest, "JPG", "a_1.jpg")) == b"changed"
+
+
+def test_recover_after_interrupted_recopy_keeps_previous_copy(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+    copy = os.path.join(dest, "JPG", "a.jpg")
+
+    # 模拟重新复制时进程崩溃：登记了新的记录，新内容只写了一半在临时文件里
+    write_file(path, b"changed")
+    manifest = Manifest(os.path.join(dest, ".file_organizer", "manifest.db"))
+    manifest.begin(os.path.abspath(path), os.stat(path), copy)
+    manifest.close()
+    write_file(partial_path(copy), b"cha")
+
+    manifest = Manifest(os.path.join(dest, ".file_organizer", "manifest.db"))
+    assert manifest.recover() == (0, 0)
+    assert manifest.previous_dest(os.path.abspath(path)) == copy
+    manifest.close()
+    assert read_file(copy) == b"one"
+    assert not os.path.exists(partial_path(copy))
+
+
+def test_recover_drops_previous_copy_that_was_changed(src, dest):
+    path = write_file(os.path.join(src, "a.jpg"), b"one")
+    organize(src, dest)
+    copy = os.path.join(dest, "JPG", "a.jpg")
+
+    # 上次的副本在重新复制时被改写了一半：不能再当作完整的副本
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    manifest = Manifest(os.path.join(dest, ".file_organizer", "manifest.db"))
+    manifest.begin(os.path.abspath(path), os.stat(path), copy)
+    manifest.close()
+    write_file(copy, b"on")
+
+    manifest = Manifest(os.path.join(dest, ".file_organizer", "manifest.db"))
+    assert manifest.recover() == (0, 1)
+    assert manifest.previous_dest(os.path.abspath(path)) is None
+    manifest.close()
+    assert not os.path.exists(copy)
+
+
+def test_old_manifest_schema_is_upgraded(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "manifest.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE files (src TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                 " dest TEXT, done INTEGER)")
+    conn.execute("INSERT INTO files VALUES ('a', 1, 2, 'b', 1)")
+    conn.commit()
+    conn.close()
+    manifest = Manifest(db_path)
+    assert manifest.previous_dest("a") == "b"
+    manifest.close()
@@ -0,0 +1,75 @@
+# 作者：AleOsh
+# 目标目录布局：重名处理、已有文件、计划路径占用、演练和归档时不建文件夹
+
+import os
+import threading
+
+from organizer.layout import DestinationLayout, split_name, ext_folder_name
+
+from conftest import write_file
+
+
+def test_split_name_keeps_multi_part_extension():
+    assert split_name("backup.tar.gz", ".tar.gz") == ("backup", ".tar.gz")
+    assert split_name("a.jpg") == ("a", ".jpg")
+    assert ext_folder_name(".tar.gz") == "TAR.GZ"
+
+
+def test_allocate_appends_counter(dest):
+    layout = DestinationLayout(dest)
+    names = [os.path.basename(layout.allocate(".jpg", "a.jpg")) for _ in range(3)]
+    assert names == ["a.jpg", "a_1.jpg", "a_2.jpg"]
+    assert os.path.isdir(os.path.join(dest, "JPG"))
+    assert os.path.basename(layout.allocate(".tar.gz", "b.tar.gz")) == "b.tar.gz"
+    assert os.path.basename(layout.allocate(".tar.gz", "b.tar.gz")) == "b_1.tar.gz"
+
+
+def test_existing_files_are_not_reused(dest):
+    write_file(os.path.join(dest, "JPG", "a.jpg"))
+    write_file(os.path.join(dest, "JPG", "a_1.jpg"))
+    layout = DestinationLayout(dest)
+    assert layout.allocate(".jpg", "a.jpg") == os.path.join(dest, "JPG", "a_2.jpg")
+
+
+def test_reserve_and_release(dest):
+    layout = DestinationLayout(dest)
+    planned = os.path.join(dest, "JPG", "a.jpg")
+    assert layout.reserve(planned)
+    assert not layout.reserve(planned)
+    assert layout.allocate(".jpg", "a.jpg") == os.path.join(dest, "JPG", "a_1.jpg")
+    # 没有写出文件的路径释放后可以再用
+    layout.release(planned)
+    assert layout.reserve(planned)
+    # 已经写出的文件不释放
+    write_file(planned)
+    layout.release(planned)
+    assert not layout.reserve(planned)
+
+
+def test_dry_run_and_virtual_layouts_create_nothing(dest):
+    write_file(os.path.join(dest, "JPG", "a.jpg"))
+    layout = DestinationLayout(dest, create=False)
+    assert layout.allocate(".jpg", "a.jpg").endswith("a_1.jpg")
+    assert layout.allocate(".png", "b.png").endswith("b.png")
+    assert not os.path.exists(os.path.join(dest, "PNG"))
+
+    root = os.path.join(dest, "organized")
+    virtual = DestinationLayout(root, virtual=True)
+    assert virtual.allocate(".jpg", "a.jpg") == os.path.join(root, "JPG", "a.jpg")
+    assert not os.path.exists(root)
+
+
+def test_allocate_from_many_threads_gives_unique_names(dest):
+    layout = DestinationLayout(dest)
+    results = []
+
+    def allocate():
+        for _ in range(200):
+            results.append(layout.allocate(".jpg", "same.jpg"))
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 800
@@ -0,0 +1,76 @@
+# 作者：AleOsh
+# 后台日志写入：级别过滤、flush、按大小滚动压缩
+
+import gzip
+import os
+import threading
+
+import pytest
+
+from organizer.logwriter import LogWriter, DEBUG, INFO, WARNING, parse_level
+
+
+def read_log(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_level():
+    assert parse_level("Warning") == WARNING
+    with pytest.raises(ValueError):
+        parse_level("loud")
+
+
+def test_writes_messages_at_or_above_level(tmp_path):
+    writer = LogWriter(str(tmp_path / "logs"), level=INFO)
+    path = writer.open()
+    writer.write("found a.jpg", DEBUG)
+    writer.write("copied a.jpg", INFO)
+    writer.flush()
+    text = read_log(path)
+    assert "copied a.jpg" in text and "found a.jpg" not in text
+    writer.close()
+
+
+def test_messages_from_many_threads_are_all_written(tmp_path):
+    writer = LogWriter(str(tmp_path), batch_size=7)
+    path = writer.open()
+
+    def log(n):
+        for i in range(100):
+            writer.write(f"t{n}-{i}")
+
+    threads = [threading.Thread(target=log, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    lines = [line for line in read_log(path).splitlines() if line.startswith("[")]
+    assert len(lines) == 400
+    # 同一线程的消息保持顺序
+    t0 = [line.split("] ", 1)[1] for line in lines if "] t0-" in line]
+    assert t0 == [f"t0-{i}" for i in range(100)]
+
+
+def test_write_before_open_and_double_close_are_ignored(tmp_path):
+    writer = LogWriter(str(tmp_path))
+    writer.write("nowhere")
+    writer.flush()
+    writer.close()
+    writer.open()
+    writer.close()
+    writer.close()
+
+
+def test_rotation_keeps_backup_count_archives(tmp_path):
+    writer = LogWriter(str(tmp_path), max_bytes=200, backup_count=2)
+    path = writer.open()
+    for i in range(6):
+        writer.write("x" * 300 + f" {i}")
+        writer.flush()
+    writer.close()
+    archives = sorted(name for name in os.listdir(tmp_path) if name.endswith(".gz"))
+    assert archives == [os.path.basename(path) + f".{n}.gz" for n in (5, 6)]
+    with gzip.open(os.path.join(tmp_path, archives[-1]), 'rt', encoding='utf-8') as f:
+        assert " 5\n" in f.read()
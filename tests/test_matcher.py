@@ -0,0 +1,103 @@
+# 作者：AleOsh
+# 文件匹配器：扩展名、通配符、正则、大小和时间条件
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from organizer.matcher import FileMatcher, normalize_ext, parse_size, parse_time
+
+
+def stat_of(size=0, mtime=0.0):
+    return lambda: SimpleNamespace(st_size=size, st_mtime=mtime)
+
+
+def test_normalize_ext():
+    assert normalize_ext("JPG") == ".jpg"
+    assert normalize_ext(" .Tar.GZ ") == ".tar.gz"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("500", 500), ("10K", 10240), ("1.5M", 1536 * 1024), ("2g", 2 * 1024 ** 3),
+    ("4 GB", 4 * 1024 ** 3), ("1KiB", 1024),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_parse_size_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_size("ten")
+
+
+def test_parse_time():
+    assert parse_time("2025-01-05") < parse_time("2025-01-05 12:00:00")
+    with pytest.raises(ValueError):
+        parse_time("yesterday")
+
+
+def test_extension_match_is_exact_and_case_insensitive():
+    matcher = FileMatcher(["jpg", "peg"])
+    assert matcher.match("a.JPG") == ".jpg"
+    assert matcher.match("a.jpeg") is None
+    assert matcher.match(".jpg") is None
+    assert matcher.match("jpg") is None
+
+
+def test_multi_part_extension_wins():
+    matcher = FileMatcher(["gz", "tar.gz"])
+    assert matcher.match("backup.tar.gz") == ".tar.gz"
+    assert matcher.match("log.gz") == ".gz"
+
+
+def test_requires_a_type():
+    with pytest.raises(ValueError):
+        FileMatcher(["", " "])
+
+
+def test_globs_and_regex():
+    matcher = FileMatcher(["jpg"], globs=["IMG_*"], exclude_globs=["*_thumb.jpg"],
+                          regex=r"\d{4}")
+    assert matcher.match("img_2024.jpg") == ".jpg"
+    assert matcher.match("IMG_2024_thumb.jpg") is None
+    assert matcher.match("IMG_ab.jpg") is None
+    assert matcher.match("DSC_2024.jpg") is None
+
+
+def test_size_and_time_filters():
+    matcher = FileMatcher(["jpg"], min_size=10, max_size=100, newer_than=50.0, older_than=150.0)
+    assert matcher.needs_stat
+    assert matcher.match("a.jpg", stat_of(50, 100.0)) == ".jpg"
+    assert matcher.match("a.jpg", stat_of(5, 100.0)) is None
+    assert matcher.match("a.jpg", stat_of(500, 100.0)) is None
+    assert matcher.match("a.jpg", stat_of(50, 10.0)) is None
+    assert matcher.match("a.jpg", stat_of(50, 200.0)) is None
+
+
+def test_stat_is_only_called_when_needed():
+    calls = []
+
+    def stat():
+        calls.append(1)
+        raise OSError("gone")
+
+    assert FileMatcher(["jpg"]).match("a.jpg", stat) == ".jpg"
+    assert FileMatcher(["jpg"], min_size=1).match("a.png", stat) is None
+    assert calls == []
+    # stat 失败的文件不匹配
+    assert FileMatcher(["jpg"], min_size=1).match("a.jpg", stat) is None
+    assert calls == [1]
+
+
+def test_name_key_ignores_stat_conditions():
+    assert FileMatcher(["jpg"], min_size=1).name_key() == FileMatcher(["JPG"]).name_key()
+    assert FileMatcher(["jpg"], globs=["a*"]).name_key() != FileMatcher(["jpg"]).name_key()
+
+
+def test_match_entry(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"12345")
+    entry = next(e for e in os.scandir(tmp_path) if e.name == "a.jpg")
+    assert FileMatcher(["jpg"], min_size=5).match_entry(entry) == ".jpg"
+    assert FileMatcher(["jpg"], min_size=6).match_entry(entry) is None
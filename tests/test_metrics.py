@@ -0,0 +1,57 @@
+# 作者：AleOsh
+# 运行统计：阶段计时、最慢文件、队列深度、保存 JSON
+
+import json
+import os
+
+from organizer.cli import main
+from organizer.metrics import RunMetrics, STAGES, STAGE_COPY, STAGE_WALK
+
+from conftest import write_file
+
+
+def test_slowest_files_keeps_the_top_n():
+    metrics = RunMetrics(slowest=3)
+    for i in range(10):
+        metrics.record_copy(f"s{i}", f"d{i}", float(i))
+    data = metrics.snapshot()
+    assert [item["path"] for item in data["slowest_files"]] == ["s9", "s8", "s7"]
+    assert data["copy"]["count"] == 10
+    assert data["copy"]["avg_seconds"] == 4.5
+    assert data["stages"][STAGE_COPY] == {"seconds": 45.0, "calls": 10}
+
+
+def test_stage_shares_and_timed():
+    metrics = RunMetrics()
+    assert set(metrics.stage_shares().values()) == {0.0}
+    metrics.add_time(STAGE_WALK, 1.0)
+    metrics.add_time(STAGE_COPY, 3.0)
+    shares = metrics.stage_shares()
+    assert set(shares) == set(STAGES)
+    assert shares[STAGE_COPY] == 0.75
+    assert list(metrics.timed(STAGE_WALK, range(3))) == [0, 1, 2]
+    # 每取一项算一次，结束时再算一次
+    assert metrics.snapshot()["stages"][STAGE_WALK]["calls"] == 5
+
+
+def test_queue_depth_and_stat_calls():
+    metrics = RunMetrics()
+    for depth in (1, 5, 3):
+        metrics.sample_queue(depth)
+    metrics.count_stat(4)
+    data = metrics.snapshot(files=2, bytes_done=100, include_slowest=False)
+    assert data["queue_depth"] == {"max": 5, "avg": 3.0}
+    assert data["stat_calls"] == 4
+    assert "slowest_files" not in data
+
+
+def test_cli_writes_metrics_json(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"abc")
+    path = str(tmp_path / "stats" / "run.json")
+    assert main([src, dest, "-e", "jpg", "--metrics-json", path, "-q"]) == 0
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data["files"] == 1 and data["bytes"] == 3
+    assert data["processed"] == 1
+    assert set(data["stages"]) == set(STAGES)
+    assert data["slowest_files"][0]["bytes"] == 3
@@ -0,0 +1,74 @@
+# 作者：AleOsh
+# 复制顺序：各排序方式只改变顺序、不丢文件，FIEMAP 不可用时退回到 inode
+
+import os
+
+import pytest
+
+from organizer import ordering
+from organizer.engine import OrganizeEngine, MODE_SCAN_FIRST
+from organizer.ordering import (order_files, ORDERS, ORDER_SCAN, ORDER_INODE, ORDER_SMALL_FIRST,
+                                ORDER_DIRECTORY, ORDER_EXTENT)
+from organizer.plan import ScanPlan
+
+from conftest import write_file
+
+RECORDS = [("/d1", "c.jpg", 30, 7), ("/d2", "a.jpg", 10, 9), ("/d1", "b.jpg", 10, 1),
+           ("/d3", "e.jpg", 20, 4)]
+
+
+@pytest.fixture
+def plan():
+    plan = ScanPlan()
+    for folder, name, size, inode in RECORDS:
+        plan.add(folder, name, ".jpg", size, inode)
+    yield plan
+    plan.close()
+
+
+def names(items):
+    return [os.path.basename(path) for path, _ext, _size in items]
+
+
+def test_scan_inode_and_small_first(plan):
+    assert names(order_files(plan, ORDER_SCAN)) == ["c.jpg", "a.jpg", "b.jpg", "e.jpg"]
+    assert names(order_files(plan, ORDER_INODE)) == ["b.jpg", "e.jpg", "c.jpg", "a.jpg"]
+    # 同样大小时保持扫描顺序
+    assert names(order_files(plan, ORDER_SMALL_FIRST)) == ["a.jpg", "b.jpg", "e.jpg", "c.jpg"]
+
+
+def test_directory_order_keeps_folders_together(tmp_path):
+    plan = ScanPlan()
+    for folder in ("x", "y"):
+        os.makedirs(str(tmp_path / folder))
+    for folder, name in (("x", "1.jpg"), ("y", "2.jpg"), ("x", "3.jpg")):
+        plan.add(str(tmp_path / folder), name, ".jpg", 1)
+    result = [os.path.basename(os.path.dirname(path)) for path, _e, _s in
+              order_files(plan, ORDER_DIRECTORY)]
+    assert result in (["x", "x", "y"], ["y", "x", "x"])
+    plan.close()
+
+
+def test_extent_falls_back_to_inode(plan, monkeypatch):
+    def unsupported(path):
+        raise OSError("当前系统不支持 FIEMAP")
+
+    monkeypatch.setattr(ordering, "physical_offset", unsupported)
+    errors = []
+    assert names(order_files(plan, ORDER_EXTENT, errors.append)) == \
+        names(order_files(plan, ORDER_INODE))
+    assert len(errors) == 1
+
+
+def test_unknown_order(plan):
+    with pytest.raises(ValueError):
+        list(order_files(plan, "random"))
+
+
+@pytest.mark.parametrize("order", ORDERS)
+def test_engine_copies_everything_in_any_order(src, dest, order):
+    for i in range(10):
+        write_file(os.path.join(src, f"d{i % 3}", f"{i}.jpg"), b"x" * i)
+    summary = OrganizeEngine(src, dest, ["jpg"], mode=MODE_SCAN_FIRST, order=order).run()
+    assert summary["processed"] == 10 and summary["failed"] == 0
+    assert len(os.listdir(os.path.join(dest, "JPG"))) == 10
@@ -0,0 +1,112 @@
+# 作者：AleOsh
+# 源文件夹中的归档：识别格式、建立索引、按顺序读出成员、索引缓存、引擎取出匹配的文件
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from organizer.engine import OrganizeEngine
+from organizer.packed import (packed_format, packed_path, index_archive, PackedIndexCache,
+                              PackedReader, FORMAT_ZIP, FORMAT_TAR, FORMAT_TGZ, FORMAT_TBZ,
+                              FORMAT_TXZ)
+
+from conftest import write_file, read_file
+
+MEMBERS = {"photos/a.jpg": b"a" * 3000, "b.jpg": b"bb", "notes/c.txt": b"c"}
+TAR_MODES = {FORMAT_TAR: "w", FORMAT_TGZ: "w:gz", FORMAT_TBZ: "w:bz2", FORMAT_TXZ: "w:xz"}
+SUFFIXES = {FORMAT_ZIP: ".zip", FORMAT_TAR: ".tar", FORMAT_TGZ: ".tar.gz",
+            FORMAT_TBZ: ".tar.bz2", FORMAT_TXZ: ".tar.xz"}
+
+
+def make_archive(path, fmt, members=MEMBERS):
+    if fmt == FORMAT_ZIP:
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("photos/", b"")
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return path
+    with tarfile.open(path, TAR_MODES[fmt]) as tf:
+        folder = tarfile.TarInfo("photos")
+        folder.type = tarfile.DIRTYPE
+        tf.addfile(folder)
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1_700_000_000
+            tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo("link.jpg")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "b.jpg"
+        tf.addfile(link)
+    return path
+
+
+def test_packed_format():
+    assert packed_format("A.TGZ") == FORMAT_TGZ
+    assert packed_format("x.tar.bz2") == FORMAT_TBZ
+    assert packed_format("x.zip") == FORMAT_ZIP
+    assert packed_format("x.gz") is None
+    assert packed_path(os.path.join("s", "p.zip"), "./a//b.jpg") == \
+        os.path.join("s", "p.zip", "a", "b.jpg")
+
+
+@pytest.mark.parametrize("fmt", sorted(SUFFIXES))
+def test_index_and_read_members(tmp_path, fmt):
+    path = make_archive(str(tmp_path / ("p" + SUFFIXES[fmt])), fmt)
+    files = index_archive(path, fmt)
+    # 只列出普通文件，按在归档中的位置排列
+    assert sorted(packed.name for packed in files) == sorted(MEMBERS)
+    assert [packed.offset for packed in files] == sorted(packed.offset for packed in files)
+    assert {packed.basename for packed in files} == {"a.jpg", "b.jpg", "c.txt"}
+    with PackedReader(path, fmt) as reader:
+        for packed in files:
+            assert packed.stat().st_size == len(MEMBERS[packed.name])
+            with reader.open(packed) as f:
+                assert f.read() == MEMBERS[packed.name]
+
+
+def test_index_cache(tmp_path):
+    path = make_archive(str(tmp_path / "p.zip"), FORMAT_ZIP)
+    st = os.stat(path)
+    files = index_archive(path, FORMAT_ZIP)
+    db_path = str(tmp_path / "index.db")
+    cache = PackedIndexCache(db_path)
+    assert cache.get(path, st, FORMAT_ZIP) is None
+    cache.put(path, st, FORMAT_ZIP, files)
+    cache.close()
+
+    cache = PackedIndexCache(db_path, readonly=True)
+    assert cache.get(path, st, FORMAT_ZIP) == files
+    # 归档变化后缓存失效
+    make_archive(path, FORMAT_ZIP, {"z.jpg": b"changed!"})
+    assert cache.get(path, os.stat(path), FORMAT_ZIP) is None
+    cache.close()
+
+
+@pytest.mark.parametrize("fmt", [FORMAT_ZIP, FORMAT_TGZ])
+def test_engine_extracts_matching_members(src, dest, fmt):
+    write_file(os.path.join(src, "loose.jpg"), b"loose")
+    make_archive(os.path.join(src, "p" + SUFFIXES[fmt]), fmt)
+    summary = OrganizeEngine(src, dest, ["jpg"], scan_archives=True).run()
+    assert summary["processed"] == 3 and summary["failed"] == 0
+    folder = os.path.join(dest, "JPG")
+    assert sorted(os.listdir(folder)) == ["a.jpg", "b.jpg", "loose.jpg"]
+    assert read_file(os.path.join(folder, "a.jpg")) == MEMBERS["photos/a.jpg"]
+    # 归档本身不被当作普通文件处理，也没有被改动
+    assert os.path.exists(os.path.join(src, "p" + SUFFIXES[fmt]))
+
+
+def test_engine_without_scan_archives_ignores_them(src, dest):
+    make_archive(os.path.join(src, "p.zip"), FORMAT_ZIP)
+    assert OrganizeEngine(src, dest, ["jpg"]).run()["processed"] == 0
+
+
+def test_broken_archive_is_reported(src, dest):
+    write_file(os.path.join(src, "broken.zip"), b"not a zip")
+    write_file(os.path.join(src, "a.jpg"), b"a")
+    summary = OrganizeEngine(src, dest, ["jpg"], scan_archives=True).run()
+    assert summary["processed"] == 1
+    assert summary["error"] is None
@@ -0,0 +1,156 @@
+# 作者：AleOsh
+# 演练计划：导出、读回，按计划执行
+
+import os
+import zipfile
+
+import pytest
+
+from organizer.cli import main
+from organizer.dryrun import DryRunPlan
+from organizer.engine import OrganizeEngine
+
+from conftest import write_file, read_file
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+
+def test_plan_round_trip(tmp_path, src, dest):
+    plan = DryRunPlan(src, dest, ["jpg"], "move", scan_archives=True)
+    plan.add(os.path.join(src, "a.jpg"), os.path.join(dest, "JPG", "a.jpg"), "jpg", 3)
+    path = str(tmp_path / "plan.json")
+    plan.write_json(path)
+
+    loaded = DryRunPlan.load(path)
+    assert loaded.transfer == "move"
+    assert loaded.scan_archives is True
+    assert loaded.entries == plan.entries
+    assert loaded.required_bytes == plan.required_bytes
+
+
+def test_run_plan_without_scanning(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"a")
+    plan = str(tmp_path / "plan.json")
+    assert main([src, dest, "-e", "jpg", "--dry-run", "--export-plan", plan, "-q"]) == 0
+    assert os.listdir(dest) == []
+    # 计划生成后新加的文件不在计划中
+    write_file(os.path.join(src, "b.jpg"), b"b")
+
+    assert main(["--run-plan", plan, "-q"]) == 0
+    assert sorted(os.listdir(os.path.join(dest, "JPG"))) == ["a.jpg"]
+
+
+def test_run_plan_with_archive_members(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"loose")
+    make_zip(os.path.join(src, "photos.zip"), {"b.jpg": b"packed", "notes.txt": b"x"})
+    plan = str(tmp_path / "plan.json")
+    assert main([src, dest, "-e", "jpg", "--scan-archives", "--dry-run",
+                 "--export-plan", plan, "-q"]) == 0
+    assert DryRunPlan.load(plan).scan_archives
+
+    # 执行时不再指定 --scan-archives，按计划中的设置读取归档内的文件
+    assert main(["--run-plan", plan, "-q"]) == 0
+    folder = os.path.join(dest, "JPG")
+    assert sorted(os.listdir(folder)) == ["a.jpg", "b.jpg"]
+    assert read_file(os.path.join(folder, "a.jpg")) == b"loose"
+    assert read_file(os.path.join(folder, "b.jpg")) == b"packed"
+
+
+def test_run_plan_writes_archive(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"a")
+    write_file(os.path.join(src, "sub", "a.jpg"), b"sub")
+    plan = str(tmp_path / "plan.json")
+    assert main([src, dest, "-e", "jpg", "--archive", "zip", "--volume-size", "1M",
+                 "--dry-run", "--export-plan", plan, "-q"]) == 0
+    loaded = DryRunPlan.load(plan)
+    assert (loaded.archive, loaded.volume_size) == ("zip", 1024 * 1024)
+
+    # 计划中的虚拟路径只用作归档内的成员名，不在输出文件夹中创建文件夹
+    assert main(["--run-plan", plan, "-q"]) == 0
+    names = os.listdir(dest)
+    assert len(names) == 1 and names[0].endswith("_001.zip")
+    with zipfile.ZipFile(os.path.join(dest, names[0])) as zf:
+        assert sorted(zf.namelist()) == ["JPG/a.jpg", "JPG/a_1.jpg"]
+        assert sorted([zf.read("JPG/a.jpg"), zf.read("JPG/a_1.jpg")]) == [b"a", b"sub"]
+
+
+def test_plan_archive_setting_must_match(tmp_path, src, dest):
+    plan = DryRunPlan(src, dest, ["jpg"], archive="zip", archive_root=os.path.join(dest, "x"))
+    with pytest.raises(ValueError):
+        OrganizeEngine(src, dest, ["jpg"], plan=plan)
+
+
+def test_dry_run_writes_nothing_and_counts(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"12345")
+    write_file(os.path.join(src, "sub", "a.jpg"), b"123")
+    write_file(os.path.join(src, "b.png"), b"1")
+    engine = OrganizeEngine(src, dest, ["jpg", "png"], dry_run=True)
+    summary = engine.run()
+    assert summary["error"] is None
+    assert os.listdir(dest) == []
+
+    plan = engine.dry_run_plan
+    assert len(plan) == 3
+    assert plan.by_ext == {".jpg": [2, 8], ".png": [1, 1]}
+    assert plan.total_bytes == 9
+    # 按块大小向上取整
+    assert plan.required_bytes >= 3 * 512
+    assert plan.fits
+    assert sorted(os.path.basename(dst) for _src, dst, _ext, _size in plan.entries) == \
+        ["a.jpg", "a_1.jpg", "b.png"]
+
+
+def test_same_disk_moves_need_no_space(src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"12345")
+    engine = OrganizeEngine(src, dest, ["jpg"], dry_run=True, transfer="move")
+    engine.run()
+    assert engine.dry_run_plan.required_bytes == 0
+    assert os.path.exists(os.path.join(src, "a.jpg"))
+
+
+def test_not_enough_space(tmp_path, src, dest, monkeypatch):
+    import shutil
+    write_file(os.path.join(src, "a.jpg"), b"12345")
+    real = shutil.disk_usage
+    monkeypatch.setattr(shutil, "disk_usage", lambda path: real(path)._replace(free=0))
+    assert main([src, dest, "-e", "jpg", "--dry-run", "-q"]) == 1
+
+    plan = str(tmp_path / "plan.json")
+    monkeypatch.setattr(shutil, "disk_usage", real)
+    assert main([src, dest, "-e", "jpg", "--dry-run", "--export-plan", plan, "-q"]) == 0
+    # 执行前再次检查剩余空间，不够时什么都不复制
+    monkeypatch.setattr(shutil, "disk_usage", lambda path: real(path)._replace(free=0))
+    assert main(["--run-plan", plan, "-q"]) == 1
+    assert not os.listdir(os.path.join(dest, "JPG"))
+
+
+def test_export_csv(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"12345")
+    path = str(tmp_path / "out" / "plan.csv")
+    assert main([src, dest, "-e", "jpg", "--dry-run", "--export-plan", path, "-q"]) == 0
+    with open(path, encoding='utf-8-sig') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "source,dest,ext,size"
+    assert lines[1].endswith(",.jpg,5")
+
+
+def test_planned_name_taken_since_dry_run(tmp_path, src, dest):
+    write_file(os.path.join(src, "a.jpg"), b"new")
+    plan = str(tmp_path / "plan.json")
+    assert main([src, dest, "-e", "jpg", "--dry-run", "--export-plan", plan, "-q"]) == 0
+    write_file(os.path.join(dest, "JPG", "a.jpg"), b"other")
+    assert main(["--run-plan", plan, "-q"]) == 0
+    assert read_file(os.path.join(dest, "JPG", "a.jpg")) == b"other"
+    assert read_file(os.path.join(dest, "JPG", "a_1.jpg")) == b"new"
+
+
+def test_run_plan_rejects_unknown_version(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text('{"version": 99}', encoding='utf-8')
+    with pytest.raises(SystemExit) as exc:
+        main(["--run-plan", str(path)])
+    assert exc.value.code == 2
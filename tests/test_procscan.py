@@ -0,0 +1,68 @@
+# 作者：AleOsh
+# 多进程扫描：结果与单进程遍历的顺序相同，跳过输出目录
+
+import os
+
+from organizer.engine import OrganizeEngine, MODE_SCAN_FIRST
+from organizer.matcher import FileMatcher
+from organizer.procscan import match_files, scan_processes, scan_tree
+from organizer.walker import TreeWalker
+
+from conftest import write_file
+
+
+def make_tree(src):
+    for top in range(5):
+        for sub in range(3):
+            for i in range(4):
+                write_file(os.path.join(src, f"t{top}", f"s{sub}", f"{i}.jpg"), b"x" * i)
+        write_file(os.path.join(src, f"t{top}", "skip.txt"))
+    write_file(os.path.join(src, "root.jpg"))
+    write_file(os.path.join(src, "pack.zip"))
+
+
+def test_match_files(src):
+    make_tree(src)
+    entries = list(os.scandir(src))
+    matches = match_files(entries, FileMatcher(["jpg"]), want_archives=False)
+    assert [(name, ext, size) for name, ext, size, _mtime, _ino in matches] == \
+        [("root.jpg", ".jpg", 1)]
+    names = {name: ext for name, ext, *_rest in match_files(entries, FileMatcher(["jpg"]), True)}
+    # 看起来是归档的文件也列出，扩展名为 None
+    assert names == {"root.jpg": ".jpg", "pack.zip": None}
+
+
+def test_scan_tree_skips_output_folder(src):
+    make_tree(src)
+    dest = os.path.join(src, "t0", "out")
+    write_file(os.path.join(dest, "JPG", "old.jpg"))
+    records = scan_tree((src, FileMatcher(["jpg"]), dest, False, False))
+    paths = [path for path, _key, _matches, _skipped in records]
+    assert not any(path.startswith(dest) for path in paths)
+    assert [dest] in [skipped for _path, _key, _matches, skipped in records]
+
+
+def test_same_order_as_single_process(src):
+    make_tree(src)
+    matcher = FileMatcher(["jpg"])
+    expected = [(path, sorted(entry.name for entry in files if matcher.match(entry.name)))
+                for path, files in TreeWalker().walk(src)]
+    dest = os.path.join(os.path.dirname(src), "elsewhere")
+    found = [(path, sorted(name for name, ext, *_rest in matches if ext))
+             for path, matches, _skipped in scan_processes(src, matcher, dest, 2)]
+    assert found == expected
+
+
+def test_engine_with_scan_processes(src, dest):
+    make_tree(src)
+    plans = []
+    for processes in (1, 3):
+        engine = OrganizeEngine(src, dest, ["jpg"], mode=MODE_SCAN_FIRST, dry_run=True,
+                                scan_processes=processes)
+        engine.run()
+        plans.append(engine.dry_run_plan.entries)
+    assert plans[0] == plans[1]
+    assert len(plans[0]) == 5 * 3 * 4 + 1
+
+    summary = OrganizeEngine(src, dest, ["jpg"], mode=MODE_SCAN_FIRST, scan_processes=3).run()
+    assert summary["processed"] == 61 and summary["failed"] == 0
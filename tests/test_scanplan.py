@@ -0,0 +1,63 @@
+# 作者：AleOsh
+# 先搜索后复制的待复制列表：保持顺序、转存到临时文件后仍可遍历
+
+import os
+
+from organizer.engine import OrganizeEngine, MODE_SCAN_FIRST
+from organizer.plan import ScanPlan
+
+from conftest import write_file
+
+
+def sample_records():
+    records = []
+    for d in range(20):
+        folder = os.path.join("/data", f"dir{d}", "名字")
+        for i in range(d % 4 + 1):
+            records.append((folder, f"f{i}.jpg" if i % 2 else f"f{i}.tar.gz",
+                            ".jpg" if i % 2 else ".tar.gz", d * 1000 + i, d * 10 + i))
+    return records
+
+
+def fill(plan, records):
+    for folder, name, ext, size, inode in records:
+        plan.add(folder, name, ext, size, inode)
+
+
+def expected(records):
+    return [(os.path.join(folder, name), ext, size, inode)
+            for folder, name, ext, size, inode in records]
+
+
+def test_records_in_memory():
+    records = sample_records()
+    plan = ScanPlan()
+    fill(plan, records)
+    assert not plan.spilled
+    assert len(plan) == len(records)
+    assert plan.total_bytes == sum(r[3] for r in records)
+    assert list(plan.records()) == expected(records)
+    assert list(plan) == [r[:3] for r in expected(records)]
+    plan.close()
+
+
+def test_records_after_spilling(tmp_path):
+    records = sample_records()
+    plan = ScanPlan(spill_bytes=64, tmp_dir=str(tmp_path))
+    fill(plan, records)
+    assert plan.spilled
+    assert list(plan.records()) == expected(records)
+    # 可以遍历多次，遍历后还能继续追加
+    assert list(plan.records()) == expected(records)
+    plan.add("/data/last", "z.jpg", ".jpg", 1)
+    assert list(plan)[-1] == (os.path.join("/data/last", "z.jpg"), ".jpg", 1)
+    plan.close()
+
+
+def test_scan_first_mode_with_tiny_spill_threshold(src, dest):
+    for i in range(50):
+        write_file(os.path.join(src, f"d{i % 5}", f"{i}.jpg"), b"x")
+    engine = OrganizeEngine(src, dest, ["jpg"], mode=MODE_SCAN_FIRST, spill_bytes=128)
+    summary = engine.run()
+    assert summary["processed"] == summary["total"] == 50
+    assert len(os.listdir(os.path.join(dest, "JPG"))) == 50
@@ -0,0 +1,113 @@
+# 作者：AleOsh
+# 多任务调度：优先级、每块磁盘的并发上限、取消、失败、任务列表
+
+import json
+import os
+import threading
+
+import pytest
+
+from organizer.cli import main
+from organizer.events import EVENT_JOB
+from organizer.scheduler import (JobScheduler, device_key, JOB_CANCELLED, JOB_DONE, JOB_FAILED,
+                                 JOB_RUNNING)
+
+from conftest import write_file
+
+
+def make_sources(tmp_path, count):
+    """生成 count 个各有一个文件的源文件夹，并建好对应的输出文件夹 out<i>"""
+    sources = []
+    for i in range(count):
+        folder = str(tmp_path / f"src{i}")
+        write_file(os.path.join(folder, f"{i}.jpg"), b"x")
+        os.makedirs(str(tmp_path / f"out{i}"), exist_ok=True)
+        sources.append(folder)
+    return sources
+
+
+class Recorder:
+    """记录任务开始的顺序和同时运行的最大任务数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = set()
+        self.max_running = 0
+
+    def __call__(self, job, event):
+        if event.kind != EVENT_JOB:
+            return
+        with self.lock:
+            if event.data["status"] == JOB_RUNNING and job.id not in self.running:
+                self.started.append(job.id)
+                self.running.add(job.id)
+                self.max_running = max(self.max_running, len(self.running))
+            elif event.data["status"] != JOB_RUNNING:
+                self.running.discard(job.id)
+
+
+def test_device_key_of_missing_path_uses_parent(tmp_path):
+    assert device_key(str(tmp_path / "missing" / "deeper")) == device_key(str(tmp_path))
+
+
+def test_priority_order_on_one_disk(tmp_path):
+    recorder = Recorder()
+    scheduler = JobScheduler(per_device=1, on_event=recorder, autostart=False)
+    jobs = [scheduler.submit(source, str(tmp_path / f"out{i}"), ["jpg"], priority=priority)
+            for i, (source, priority) in enumerate(zip(make_sources(tmp_path, 4), [0, 5, 1, 5]))]
+    scheduler.start()
+    assert scheduler.wait(30)
+    assert all(job.status == JOB_DONE for job in jobs)
+    assert all(job.summary["processed"] == 1 for job in jobs)
+    # 优先级高的先运行，相同时先提交的先运行
+    assert recorder.started == [jobs[1].id, jobs[3].id, jobs[2].id, jobs[0].id]
+    assert recorder.max_running == 1
+
+
+def test_per_device_limit(tmp_path):
+    recorder = Recorder()
+    scheduler = JobScheduler(per_device=2, on_event=recorder, autostart=False)
+    for i, source in enumerate(make_sources(tmp_path, 6)):
+        scheduler.submit(source, str(tmp_path / f"out{i}"), ["jpg"])
+    scheduler.start()
+    assert scheduler.wait(30)
+    assert len(recorder.started) == 6
+    assert recorder.max_running <= 2
+
+
+def test_cancel_queued_job(tmp_path):
+    scheduler = JobScheduler(autostart=False)
+    first, second = [scheduler.submit(source, str(tmp_path / f"out{i}"), ["jpg"])
+                     for i, source in enumerate(make_sources(tmp_path, 2))]
+    scheduler.cancel(second.id)
+    assert second.status == JOB_CANCELLED and second.wait(0)
+    scheduler.start()
+    scheduler.shutdown()
+    assert first.status == JOB_DONE
+    assert second.summary is None
+    with pytest.raises(RuntimeError):
+        scheduler.submit(str(tmp_path), str(tmp_path / "out0"), ["jpg"])
+
+
+def test_failed_job_and_bad_options(tmp_path):
+    scheduler = JobScheduler()
+    job = scheduler.submit(str(tmp_path / "missing"), str(tmp_path), ["jpg"])
+    assert job.wait(30)
+    assert job.status == JOB_FAILED and job.error
+    # 参数有误的任务在提交时就报错
+    with pytest.raises(ValueError):
+        scheduler.submit(str(tmp_path), str(tmp_path), ["jpg"], mode="teleport")
+    scheduler.shutdown()
+
+
+def test_cli_jobs_file(tmp_path):
+    sources = make_sources(tmp_path, 2)
+    path = str(tmp_path / "jobs.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{"source": sources[0], "dest": str(tmp_path / "out0"), "ext": "jpg"},
+                   {"source": sources[1], "dest": str(tmp_path / "out1"), "ext": ["jpg"],
+                    "priority": 3, "mode": "pipeline"}], f)
+    assert main(["--jobs", path, "-q"]) == 0
+    assert os.listdir(str(tmp_path / "out0" / "JPG")) == ["0.jpg"]
+    assert os.listdir(str(tmp_path / "out1" / "JPG")) == ["1.jpg"]
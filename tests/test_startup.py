@@ -0,0 +1,41 @@
+# 作者：AleOsh
+# 快速启动：导入图形界面模块和 organizer 包时不加载处理时才用到的模块
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from startup import FORBIDDEN_AT_STARTUP  # noqa: E402
+
+
+def loaded_after(code):
+    code += "; import sys; print('\\n'.join(sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR,
+                          capture_output=True, text=True, check=True)
+    return set(proc.stdout.split())
+
+
+def test_gui_import_is_lazy():
+    pytest.importorskip("tkinter")
+    loaded = loaded_after("import file_organizer")
+    assert loaded.isdisjoint(FORBIDDEN_AT_STARTUP)
+
+
+def test_package_exports_are_lazy():
+    loaded = loaded_after("import organizer")
+    assert "organizer.engine" not in loaded
+    assert "sqlite3" not in loaded
+    loaded = loaded_after("from organizer import OrganizeEngine")
+    assert "organizer.engine" in loaded
+
+
+def test_cli_help():
+    proc = subprocess.run([sys.executable, "-m", "file_organizer", "--help"], cwd=REPO_DIR,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0
+    assert "--run-plan" in proc.stdout
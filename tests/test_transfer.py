@@ -0,0 +1,104 @@
+# 作者：AleOsh
+# 输出方式：复制、移动、硬链接、reflink 及其退回
+
+import errno
+import os
+
+import pytest
+
+from organizer import transfer
+from organizer.engine import OrganizeEngine
+from organizer.transfer import (transfer_file, TRANSFER_COPY, TRANSFER_MOVE, TRANSFER_HARDLINK,
+                                TRANSFER_REFLINK, METHOD_COPY, METHOD_RENAME, METHOD_COPY_DELETE,
+                                METHOD_LINK, METHOD_REFLINK)
+
+from conftest import write_file, read_file
+
+
+@pytest.fixture
+def pair(src, dest):
+    return write_file(os.path.join(src, "a.jpg"), b"data"), os.path.join(dest, "a.jpg")
+
+
+def test_copy(pair):
+    src_path, dst_path = pair
+    assert transfer_file(src_path, dst_path, TRANSFER_COPY) == (METHOD_COPY, False)
+    assert read_file(dst_path) == b"data"
+    assert not os.path.samefile(src_path, dst_path)
+
+
+def test_move_renames_on_same_device(pair):
+    src_path, dst_path = pair
+    ino = os.stat(src_path).st_ino
+    assert transfer_file(src_path, dst_path, TRANSFER_MOVE) == (METHOD_RENAME, False)
+    assert not os.path.exists(src_path)
+    assert os.stat(dst_path).st_ino == ino
+
+
+def test_move_across_devices_copies_then_deletes(pair, monkeypatch):
+    src_path, dst_path = pair
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(transfer.os, "replace", cross_device)
+    assert transfer_file(src_path, dst_path, TRANSFER_MOVE) == (METHOD_COPY_DELETE, False)
+    assert not os.path.exists(src_path)
+    assert read_file(dst_path) == b"data"
+
+
+def test_hardlink(pair):
+    src_path, dst_path = pair
+    assert transfer_file(src_path, dst_path, TRANSFER_HARDLINK) == (METHOD_LINK, False)
+    assert os.path.samefile(src_path, dst_path)
+    # 已经是同一个文件时什么也不做
+    assert transfer_file(src_path, dst_path, TRANSFER_HARDLINK) == (METHOD_LINK, False)
+
+
+def test_hardlink_replaces_other_file_without_touching_it(pair):
+    src_path, dst_path = pair
+    other = write_file(dst_path, b"old")
+    keep = dst_path + ".keep"
+    os.link(other, keep)
+    transfer_file(src_path, dst_path, TRANSFER_HARDLINK)
+    assert os.path.samefile(src_path, dst_path)
+    assert read_file(keep) == b"old"
+
+
+def test_hardlink_falls_back_to_copy(pair, monkeypatch):
+    src_path, dst_path = pair
+
+    def no_links(src, dst):
+        raise OSError(errno.EPERM, "links not supported")
+
+    monkeypatch.setattr(transfer.os, "link", no_links)
+    assert transfer_file(src_path, dst_path, TRANSFER_HARDLINK) == (METHOD_COPY, True)
+    assert read_file(dst_path) == b"data"
+
+
+def test_reflink_or_fallback(pair):
+    # 大多数测试环境的文件系统不支持 FICLONE，此时退回到普通复制
+    src_path, dst_path = pair
+    method, fell_back = transfer_file(src_path, dst_path, TRANSFER_REFLINK)
+    assert (method, fell_back) in ((METHOD_REFLINK, False), (METHOD_COPY, True))
+    assert read_file(dst_path) == b"data"
+    assert not os.path.samefile(src_path, dst_path)
+    assert os.listdir(os.path.dirname(dst_path)) == ["a.jpg"]
+
+
+def test_unknown_mode(pair):
+    with pytest.raises(ValueError):
+        transfer_file(*pair, mode="teleport")
+
+
+@pytest.mark.parametrize("mode", [TRANSFER_MOVE, TRANSFER_HARDLINK])
+def test_engine_transfer_modes(src, dest, mode):
+    path = write_file(os.path.join(src, "a.jpg"), b"data")
+    summary = OrganizeEngine(src, dest, ["jpg"], transfer=mode).run()
+    assert summary["processed"] == 1 and summary["failed"] == 0
+    out = os.path.join(dest, "JPG", "a.jpg")
+    assert read_file(out) == b"data"
+    if mode == TRANSFER_MOVE:
+        assert not os.path.exists(path)
+    else:
+        assert os.path.samefile(path, out)
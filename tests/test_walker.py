@@ -0,0 +1,65 @@
+# 作者：AleOsh
+# 目录遍历：与 os.walk 结果一致，并行遍历、跳过目录、符号链接环
+
+import os
+
+import pytest
+
+from organizer.walker import TreeWalker
+
+from conftest import write_file
+
+
+def make_tree(src):
+    for path in ("a.jpg", "x/b.jpg", "x/y/c.jpg", "x/y/z/d.jpg", "w/e.jpg", "w/f.png"):
+        write_file(os.path.join(src, path))
+    os.makedirs(os.path.join(src, "empty"))
+
+
+def collect(walker, top):
+    return {path: sorted(entry.name for entry in files) for path, files in walker.walk(top)}
+
+
+def test_serial_walk_matches_os_walk(src):
+    make_tree(src)
+    expected = [(root, sorted(files)) for root, _dirs, files in os.walk(src)]
+    walked = [(path, sorted(entry.name for entry in files))
+              for path, files in TreeWalker().walk(src)]
+    assert walked == expected
+
+
+def test_parallel_walk_finds_the_same_files(src):
+    make_tree(src)
+    assert collect(TreeWalker(workers=4), src) == collect(TreeWalker(), src)
+
+
+def test_entries_are_dir_entries(src):
+    make_tree(src)
+    for path, files in TreeWalker().walk(src):
+        for entry in files:
+            assert entry.path == os.path.join(path, entry.name)
+            assert entry.stat().st_size == 1
+
+
+def test_skip_dir(src):
+    make_tree(src)
+    skipped = os.path.join(src, "x")
+    found = collect(TreeWalker(skip_dir=lambda path: path == skipped), src)
+    assert not any(path == skipped or path.startswith(skipped + os.sep) for path in found)
+    assert os.path.join(src, "w") in found
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="需要符号链接")
+@pytest.mark.parametrize("workers", [1, 4])
+def test_symlink_loop_is_walked_once(src, workers):
+    make_tree(src)
+    os.symlink(src, os.path.join(src, "x", "loop"))
+    found = collect(TreeWalker(workers=workers, follow_symlinks=True), src)
+    assert sorted(found) == sorted(root for root, _dirs, _files in os.walk(src))
+
+
+def test_missing_top_reports_error(tmp_path):
+    errors = []
+    walker = TreeWalker(on_error=errors.append)
+    assert list(walker.walk(str(tmp_path / "missing"))) == []
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
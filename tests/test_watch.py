@@ -0,0 +1,103 @@
+# 作者：AleOsh
+# 监视模式：等文件写完再处理、轮询和 inotify 监视器、引擎持续整理新文件
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from organizer.engine import OrganizeEngine
+from organizer.watch import Debouncer, InotifyWatcher, PollingWatcher
+
+from conftest import write_file, read_file
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_debouncer_waits_until_file_is_unchanged(src):
+    path = write_file(os.path.join(src, "a.jpg"), b"1")
+    debouncer = Debouncer(settle=0)
+    debouncer.add(path)
+    debouncer.add(path)
+    assert len(debouncer) == 1
+    # 第一次检查只记下大小和修改时间
+    assert debouncer.ready() == []
+    with open(path, 'ab') as f:
+        f.write(b"2")
+    assert debouncer.ready() == []
+    assert debouncer.ready() == [path]
+    assert len(debouncer) == 0
+
+
+def test_debouncer_drops_removed_files(src):
+    path = write_file(os.path.join(src, "a.jpg"))
+    debouncer = Debouncer(settle=0)
+    debouncer.add(path)
+    os.remove(path)
+    assert debouncer.ready() == []
+    assert len(debouncer) == 0
+
+
+def test_polling_watcher_reports_new_files_and_folders(src):
+    old = write_file(os.path.join(src, "old.jpg"))
+    watcher = PollingWatcher(src, sleep=lambda seconds: True)
+    assert watcher.start() == []
+    assert watcher.start(since=0) == [old]
+
+    new = write_file(os.path.join(src, "new.jpg"))
+    nested = write_file(os.path.join(src, "sub", "deep", "n.jpg"))
+    assert sorted(watcher.poll(0)) == sorted([new, nested])
+    assert watcher.poll(0) == []
+    # 取消时本轮不检查
+    watcher.sleep = lambda seconds: False
+    write_file(os.path.join(src, "later.jpg"))
+    assert watcher.poll(0) == []
+    watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify 只在 Linux 上可用")
+def test_inotify_watcher_reports_new_files_and_folders(src):
+    try:
+        watcher = InotifyWatcher(src)
+    except OSError as e:
+        pytest.skip(f"inotify 不可用: {e}")
+    try:
+        watcher.start()
+        new = write_file(os.path.join(src, "new.jpg"))
+        os.makedirs(os.path.join(src, "sub"))
+        changed = set()
+        assert wait_for(lambda: changed.update(watcher.poll(0.1)) or new in changed)
+        nested = write_file(os.path.join(src, "sub", "n.jpg"))
+        assert wait_for(lambda: changed.update(watcher.poll(0.1)) or nested in changed)
+    finally:
+        watcher.close()
+
+
+def test_engine_watch_organizes_new_files(src, dest):
+    write_file(os.path.join(src, "first.jpg"), b"first")
+    engine = OrganizeEngine(src, dest, ["jpg"], watch=True, settle_seconds=0.1,
+                            poll_interval=0.05)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(engine.run()))
+    thread.start()
+    try:
+        folder = os.path.join(dest, "JPG")
+        assert wait_for(lambda: os.path.exists(os.path.join(folder, "first.jpg")))
+        write_file(os.path.join(src, "sub", "second.jpg"), b"second")
+        assert wait_for(lambda: os.path.exists(os.path.join(folder, "second.jpg")))
+        assert read_file(os.path.join(folder, "second.jpg")) == b"second"
+    finally:
+        engine.stop()
+        thread.join(10)
+    assert not thread.is_alive()
+    assert result["cancelled"]
+    assert result["processed"] == 2